@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Stapel-Ablage
+Legt viele Rechnungen auf einmal in Steuer-YYYY/KWXX/ ab: alle Ziele werden
+im Speicher aus einer einmal gelesenen Ordnerliste geplant (Namenskollisionen,
+steuer.dateien_pro_ordner), danach per os.replace verschoben. Ein Journal
+erlaubt das Zurückrollen eines abgebrochenen Stapels.
+"""
+
+import os
+import json
+import errno
+import time
+import shutil
+from pathlib import Path
+from datetime import datetime
+
+JOURNAL_FILENAME = ".ablage-journal.jsonl"
+
+
+class AblageFehler(Exception):
+    """Stapel konnte nicht abgelegt werden (bereits verschobene Dateien sind zurückgerollt)"""
+
+
+def dateiname(jahr: int, kw: int, betrag) -> str:
+    """Dateiname ohne Endung, z.B. 2024_KW01_0042,50_EUR"""
+    if betrag is not None and betrag > 0:
+        return f"{jahr}_KW{kw:02d}_{betrag:07.2f}_EUR".replace(".", ",")
+    return f"{jahr}_KW{kw:02d}_OHNE_BETRAG"
+
+
+def _verschiebe(quelle: Path, ziel: Path):
+    """os.replace, über Dateisystemgrenzen hinweg kopieren und löschen"""
+    try:
+        os.replace(quelle, ziel)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(str(quelle), str(ziel))
+
+
+class StapelAblage:
+    """
+    Ablage-Planer mit Ordner-Cache
+
+    Jeder Zielordner wird höchstens einmal gelesen; danach kennt der Cache
+    alle Namen, auch die im selben Lauf vergebenen. Während der Ablage
+    sollte niemand sonst in den Steuer-Ordner schreiben.
+    """
+
+    def __init__(self, steuer_dir, dateien_pro_ordner: int = 100, max_alter: float = None):
+        """
+        Args:
+            steuer_dir: Basisordner mit Steuer-YYYY/
+            dateien_pro_ordner: Ab dieser Anzahl geht es in KWXX_2, KWXX_3, ... weiter (0 = unbegrenzt)
+            max_alter: Ordnerliste nach so vielen Sekunden neu lesen (None = nie, z.B. im
+                       Dauerbetrieb setzen, falls jemand nebenbei im Steuer-Ordner aufräumt)
+        """
+        self.steuer_dir = Path(steuer_dir).expanduser()
+        self.dateien_pro_ordner = dateien_pro_ordner or 0
+        self.max_alter = max_alter
+        self.journal = self.steuer_dir / JOURNAL_FILENAME
+        self._ordner = {}     # Ordner → (Menge der Dateinamen, Lesezeitpunkt)
+        self.statistik = {"abgelegt": 0, "ordner_gelesen": 0, "zurueckgerollt": 0}
+        self.wiederherstellen()
+
+    def _inhalt(self, ordner: Path):
+        """Dateinamen eines Ordners (einmal von der Platte, danach aus dem Cache)"""
+        namen, gelesen = self._ordner.get(ordner, (None, 0))
+        if namen is None or (self.max_alter is not None and time.monotonic() - gelesen > self.max_alter):
+            try:
+                with os.scandir(ordner) as eintraege:
+                    namen = {e.name for e in eintraege}
+            except FileNotFoundError:
+                namen = set()
+            self.statistik["ordner_gelesen"] += 1
+            self._ordner[ordner] = (namen, time.monotonic())
+        return namen
+
+    def _kw_ordner(self, jahr: int, kw: int):
+        """Erster KW-Ordner (KWXX, KWXX_2, ...) mit freiem Platz"""
+        jahr_dir = self.steuer_dir / f"Steuer-{jahr}"
+        teil = 1
+        while True:
+            name = f"KW{kw:02d}" if teil == 1 else f"KW{kw:02d}_{teil}"
+            ordner = jahr_dir / name
+            pdfs = sum(1 for n in self._inhalt(ordner) if n.lower().endswith(".pdf"))
+            if not self.dateien_pro_ordner or pdfs < self.dateien_pro_ordner:
+                return ordner
+            teil += 1
+
+    def plane(self, ergebnisse, datum: datetime = None):
+        """
+        Ziele für [(pdf_path, betrag), ...] festlegen (ohne etwas zu verschieben)
+
+        Die Namen werden im Cache reserviert, ein zweiter Aufruf plant also
+        nicht auf dieselben Ziele.
+
+        Returns:
+            Liste von (quelle, ziel)
+        """
+        jahr, kw, _ = (datum or datetime.now()).isocalendar()
+        plan = []
+        for pdf_path, betrag in ergebnisse:
+            quelle = Path(pdf_path)
+            ordner = self._kw_ordner(jahr, kw)
+            namen = self._inhalt(ordner)
+            stamm = dateiname(jahr, kw, betrag)
+            name = f"{stamm}{quelle.suffix.lower() or '.pdf'}"
+            zaehler = 1
+            while name in namen:
+                name = f"{stamm}_{zaehler}{quelle.suffix.lower() or '.pdf'}"
+                zaehler += 1
+            namen.add(name)
+            plan.append((quelle, ordner / name))
+        return plan
+
+    def _freigeben(self, plan):
+        """Reservierte Namen eines nicht ausgeführten Plans wieder freigeben"""
+        for _, ziel in plan:
+            self._ordner.get(ziel.parent, (set(), 0))[0].discard(ziel.name)
+
+    def ausfuehren(self, plan):
+        """
+        Plan verschieben; bei einem Fehler wird der ganze Stapel zurückgerollt
+
+        Raises:
+            AblageFehler: mit dem ursprünglichen Fehler als __cause__
+        """
+        if not plan:
+            return plan
+
+        # Journal vor der ersten Bewegung auf die Platte bringen
+        self.steuer_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.journal, "w", encoding="utf-8") as f:
+            for quelle, ziel in plan:
+                f.write(json.dumps({"quelle": str(quelle), "ziel": str(ziel)}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        erledigt = []
+        try:
+            for ordner in {ziel.parent for _, ziel in plan}:
+                ordner.mkdir(parents=True, exist_ok=True)
+            for quelle, ziel in plan:
+                _verschiebe(quelle, ziel)
+                erledigt.append((quelle, ziel))
+        except OSError as e:
+            self._zurueckrollen(erledigt)
+            self._freigeben(plan)
+            self.journal.unlink(missing_ok=True)
+            raise AblageFehler(f"Stapel mit {len(plan)} Dateien nicht abgelegt: {e}") from e
+
+        self.journal.unlink(missing_ok=True)
+        self.statistik["abgelegt"] += len(plan)
+        return plan
+
+    def lege_ab(self, ergebnisse, datum: datetime = None):
+        """Planen und ausführen; liefert [(quelle, ziel)]"""
+        return self.ausfuehren(self.plane(ergebnisse, datum))
+
+    def _zurueckrollen(self, erledigt):
+        for quelle, ziel in reversed(erledigt):
+            if ziel.exists() and not quelle.exists():
+                _verschiebe(ziel, quelle)
+                self.statistik["zurueckgerollt"] += 1
+
+    def wiederherstellen(self):
+        """Stapel eines abgebrochenen Laufs zurückrollen (Journal noch vorhanden)"""
+        if not self.journal.exists():
+            return 0
+        erledigt = []
+        with open(self.journal, encoding="utf-8") as f:
+            for zeile in f:
+                try:
+                    eintrag = json.loads(zeile)
+                except ValueError:
+                    # Unvollständige letzte Zeile: für diese Datei gab es noch keine Bewegung
+                    continue
+                erledigt.append((Path(eintrag["quelle"]), Path(eintrag["ziel"])))
+        vorher = self.statistik["zurueckgerollt"]
+        self._zurueckrollen(erledigt)
+        self.journal.unlink()
+        # Verzeichnisinhalt hat sich geändert
+        self._ordner.clear()
+        return self.statistik["zurueckgerollt"] - vorher
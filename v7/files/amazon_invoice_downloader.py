@@ -6,25 +6,214 @@ Erstellt für: Danny (yDh-embedded)
 """
 
 import os
+import re
 import sys
+import json
+import html
 import time
+import random
+import shutil
 import argparse
+import threading
 import yaml
 from pathlib import Path
-from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from urllib.parse import urljoin, urlparse, parse_qs, urlencode
+from datetime import datetime, timedelta
+from download_pool import DownloadPool, TokenBucket, AdaptiverTokenBucket, ThrottledError, zusammenfassung
+from download_watcher import DownloadWatcher
+from order_index import OrderIndex, parse_order_date, file_sha256, NEU, HERUNTERGELADEN, ABGELEGT, FEHLER
+from messung import Messung
+from checkpoint import Checkpoint, ERLEDIGT
+from crawl_browser import (crawl_optionen, crawl_argumente, blockierte_muster,
+                           blockiere_ressourcen, wegwerf_profil, schreibe_einstellungen, WarmerBrowser)
+
+# Liest alle Bestellkarten einer Seite im Browser aus: Bestellnummer,
+# Bestelldatum (Rohtext) und Rechnungslink (null falls keiner vorhanden)
+EXTRACT_ORDERS_JS = r"""
+function extractOrders(root) {
+    const cards = Array.from(root.querySelectorAll('.order-card, .order'));
+    return {
+        cards: cards.map(card => {
+            const text = card.innerText || card.textContent || '';
+            const id = text.match(/Bestell(?:nummer|nr\.)[:\s]*([A-Z0-9]{3}-\d{7}-\d{7})/);
+            const date = text.match(/Bestellung aufgegeben\s*(\d{1,2}\.\s*\S+\s+\d{4})/);
+            const link = card.querySelector("a[href*='invoice']");
+            return {
+                id: id ? id[1] : null,
+                date: date ? date[1] : null,
+                invoice_url: link ? link.href : null
+            };
+        }),
+        captcha: root.querySelector("form[action*='validateCaptcha'], #captchacharacters") !== null
+            || /robot check/i.test(root.title || ''),
+        has_next: root.querySelector('.a-pagination .a-last:not(.a-disabled)') !== null,
+        next_url: (root.querySelector('.a-pagination .a-last:not(.a-disabled) a') || {}).href || null
+    };
+}
+"""
+ORDER_CARDS_JS = EXTRACT_ORDERS_JS + "return extractOrders(document);"
+
+# Lädt Bestellseiten per fetch() im Browser (Cookies der Session) und wertet
+# sie per DOMParser aus, ohne zu navigieren. arguments[0] = [gesuchte URL,
+# vorzuladende URLs...]; alle werden gestartet, gewartet wird nur auf die erste.
+ORDER_PAGE_JS = EXTRACT_ORDERS_JS + r"""
+const fertig = arguments[arguments.length - 1];
+const seiten = window.__bestellseiten = window.__bestellseiten || {};
+for (const url of arguments[0]) {
+    if (!seiten[url]) {
+        seiten[url] = fetch(url, {credentials: 'include'}).then(async antwort => {
+            const ergebnis = {status: antwort.status, url: antwort.url};
+            if (!antwort.ok) return ergebnis;
+            const doc = new DOMParser().parseFromString(await antwort.text(), 'text/html');
+            return Object.assign(extractOrders(doc), ergebnis);
+        }).catch(fehler => ({status: 0, url: url, fehler: String(fehler)}));
+    }
+}
+const url = arguments[0][0];
+seiten[url].then(seite => { delete seiten[url]; fertig(seite); });
+"""
+
+# Zeichen, dass Amazon bremst, obwohl die Antwort kein 429/503 ist
+CAPTCHA_MUSTER = re.compile(r"validateCaptcha|captchacharacters|robot check", re.IGNORECASE)
+LOGIN_MUSTER = "ap/signin"
+
+
+def drosselsignal(url, inhalt=""):
+    """'Captcha' oder 'Login-Umleitung' falls Amazon bremst, sonst None"""
+    if LOGIN_MUSTER in (url or ""):
+        return "Login-Umleitung"
+    if CAPTCHA_MUSTER.search(url or "") or CAPTCHA_MUSTER.search(inhalt or ""):
+        return "Captcha"
+    return None
+
+
+# ChromeDriver-Pfad wird pro Prozess nur einmal aufgelöst und auf der
+# Platte zwischengespeichert (webdriver-manager fragt sonst jedes Mal online nach)
+_driver_path = None
+_driver_lock = threading.Lock()
+DRIVER_CACHE = Path("~/.cache/amazon-invoice-downloader/chromedriver.json")
+
+
+def start_index(url):
+    """startIndex einer Bestellseiten-URL (0 ohne Parameter)"""
+    werte = parse_qs(urlparse(url).query).get('startIndex')
+    try:
+        return int(werte[0]) if werte else 0
+    except ValueError:
+        return None
+
+
+def mit_start_index(url, index):
+    """Gleiche Bestellseiten-URL mit anderem startIndex"""
+    teile = urlparse(url)
+    query = parse_qs(teile.query)
+    query['startIndex'] = [str(index)]
+    return teile._replace(query=urlencode(query, doseq=True)).geturl()
+
+
+def _lies_driver_cache(cache_file, browser, max_alter):
+    """Gespeicherter ChromeDriver-Pfad oder None (fehlt, veraltet, anderer Browser)"""
+    try:
+        eintrag = json.loads(cache_file.read_text(encoding="utf-8"))
+        erstellt = datetime.fromisoformat(eintrag['erstellt'])
+    except (OSError, ValueError, KeyError):
+        return None
+    if eintrag.get('browser') != browser or datetime.now() - erstellt > max_alter:
+        return None
+    if not Path(eintrag['pfad']).exists():
+        return None
+    return eintrag['pfad']
+
+
+def resolve_driver_path(config, neu=False):
+    """
+    Ermittle den ChromeDriver einmalig (Config-Pfad oder webdriver-manager)
+    
+    Das Ergebnis von webdriver-manager wird `browser.driver_cache_tage`
+    Tage auf der Platte gespeichert; neu=True erzwingt eine neue Auflösung
+    (z.B. wenn der Browser inzwischen aktualisiert wurde).
+    """
+    global _driver_path
+    with _driver_lock:
+        if _driver_path is None or neu:
+            browser_config = config['browser']
+            configured = browser_config.get('driver_path')
+            if configured:
+                _driver_path = str(Path(configured).expanduser())
+                return _driver_path
+            
+            cache_file = Path(browser_config.get('driver_cache') or DRIVER_CACHE).expanduser()
+            max_alter = timedelta(days=browser_config.get('driver_cache_tage', 7))
+            browser = browser_config.get('brave_path')
+            _driver_path = None if neu else _lies_driver_cache(cache_file, browser, max_alter)
+            
+            if _driver_path is None:
+                from webdriver_manager.chrome import ChromeDriverManager
+                _driver_path = ChromeDriverManager().install()
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                cache_file.write_text(json.dumps({
+                    'pfad': _driver_path,
+                    'browser': browser,
+                    'erstellt': datetime.now().isoformat(timespec='seconds'),
+                }), encoding="utf-8")
+        return _driver_path
+
 
 class AmazonInvoiceDownloader:
-    def __init__(self, config_path):
-        """Initialisiere den Downloader mit Konfiguration"""
+    def __init__(self, config_path, account=None):
+        """
+        Initialisiere den Downloader mit Konfiguration
+        
+        Args:
+            config_path: Pfad zur amazon_config.yaml
+            account: Konto aus `accounts:` (dict mit name, profile_path, profile_name),
+                     Standard ist das Profil aus `browser:`
+        """
         self.config = self.load_config(config_path)
+        self.account = account or {
+            'name': 'default',
+            'profile_path': self.config['browser'].get('profile_path'),
+            'profile_name': self.config['browser'].get('profile_name', 'Default')
+        }
+        # Eigenes user-data-dir (z.B. isolierte Kopie im Session-Pool)
+        self.user_data_dir = None
+        # Wegwerf-Profil des Crawl-Modus (wird in close() gelöscht)
+        self.wegwerf_dir = None
+        # True = angehängter warmer Browser, der nach dem Lauf weiterläuft
+        self.warm = False
+        # False = nie an den geteilten warmen Browser hängen (Session-Pool)
+        self.warm_erlaubt = True
         self.driver = None
+        # Bestellseiten werden im Hauptthread gelesen, während Worker laden
+        self.driver_lock = threading.RLock()
+        self.session = None
+        self.watcher = None
+        # Optionaler Callback(order, pfad) nach jedem fertigen Download
+        self.on_downloaded = None
+        # Zeitmessung pro Stufe (SteuerAutomation setzt ihre eigene ein)
+        self.messung = Messung()
+        # Checkpoint-Journal des laufenden Syncs (None = kein Journal)
+        self.checkpoint = None
+        # Token-Bucket für Seiten und Downloads (in sync() erstellt oder übergeben)
+        self.limiter = None
+        # Gesetzt = nach der laufenden Seite bzw. den laufenden Downloads aufhören
+        # (z.B. Strg+C in der Pipeline); der Checkpoint bleibt für --resume offen
+        self.stopp = threading.Event()
         self.download_dir = Path(self.config['download']['directory']).expanduser()
         self.download_dir.mkdir(parents=True, exist_ok=True)
+        # Hierhin speichert der Browser; fertige Rechnungen landen umbenannt im download_dir
+        # (der Session-Pool gibt jeder Session einen eigenen Ordner)
+        self.browser_download_dir = self.download_dir
+        # Bestell-Index für inkrementelle Läufe
+        index_path = self.config['download'].get('index_path')
+        if index_path:
+            self.index = OrderIndex(Path(index_path).expanduser())
+        else:
+            self.index = OrderIndex.for_directory(self.download_dir)
+        # Amazon-Shop (für Benchmarks auf einen lokalen Stub umstellbar)
+        self.base_url = self.config.get('amazon', {}).get('base_url', 'https://www.amazon.de').rstrip('/')
+        # "http" = PDFs direkt per HTTP laden, "browser" = Seitenaufruf im Browser
+        self.fetch_mode = self.config['download'].get('mode', 'browser')
         
     def load_config(self, config_path):
         """Lade YAML-Konfiguration"""
@@ -33,6 +222,11 @@ class AmazonInvoiceDownloader:
     
     def setup_driver(self):
         """Konfiguriere Selenium mit Brave Browser"""
+        # Selenium erst hier laden: Modi ohne Browser zahlen den Import nicht
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.common.exceptions import SessionNotCreatedException
+        
         options = webdriver.ChromeOptions()
         
         # Brave Binary Pfad
@@ -42,44 +236,95 @@ class AmazonInvoiceDownloader:
         
         options.binary_location = brave_path
         
-        # Brave Profil verwenden (mit gespeicherten Login-Daten)
-        if self.config['browser']['use_profile']:
-            profile_path = Path(self.config['browser']['profile_path']).expanduser()
-            options.add_argument(f"--user-data-dir={profile_path}")
-            options.add_argument(f"--profile-directory={self.config['browser']['profile_name']}")
+        # Crawl-Modus: schlanker Browser, nur Cookies aus dem Profil
+        crawl_config = self.config['browser'].get('crawl') or {}
+        crawl = crawl_config.get('enabled', False)
+        use_profile = self.config['browser']['use_profile']
+        headless = self.config['browser'].get('headless', False)
+        # Parallele Sessions dürfen sich keinen Browser (Tab, Download-Ordner) teilen
+        self.warm = crawl and crawl_config.get('warm', False) and self.warm_erlaubt
         
         # Download-Einstellungen
         prefs = {
-            "download.default_directory": str(self.download_dir.absolute()),
+            "download.default_directory": str(self.browser_download_dir.absolute()),
             "download.prompt_for_download": False,
             "download.directory_upgrade": True,
             "safebrowsing.enabled": True,
             "plugins.always_open_pdf_externally": True
         }
-        options.add_experimental_option("prefs", prefs)
         
-        # Optional: Headless Mode
-        if self.config['browser'].get('headless', False):
-            options.add_argument('--headless=new')
+        if self.warm:
+            browser = WarmerBrowser(brave_path, crawl_config.get('debug_port', 9222), headless=headless)
+            if browser.laeuft():
+                print("✓ Warmer Browser gefunden")
+            else:
+                if use_profile:
+                    wegwerf_profil(self.account['profile_path'], self.account['profile_name'],
+                                   browser.user_data_dir)
+                schreibe_einstellungen(browser.user_data_dir, self.account['profile_name'], prefs)
+                browser.starte([f"--profile-directory={self.account['profile_name']}",
+                                *crawl_argumente(crawl_config)])
+            options.add_experimental_option("debuggerAddress", browser.debugger_address)
+            options.page_load_strategy = 'eager'
+        else:
+            # Brave Profil verwenden (mit gespeicherten Login-Daten)
+            if self.user_data_dir:
+                options.add_argument(f"--user-data-dir={self.user_data_dir}")
+                options.add_argument(f"--profile-directory={self.account['profile_name']}")
+            elif crawl and use_profile:
+                self.wegwerf_dir = wegwerf_profil(self.account['profile_path'], self.account['profile_name'])
+                options.add_argument(f"--user-data-dir={self.wegwerf_dir}")
+                options.add_argument(f"--profile-directory={self.account['profile_name']}")
+            elif use_profile:
+                profile_path = Path(self.account['profile_path']).expanduser()
+                options.add_argument(f"--user-data-dir={profile_path}")
+                options.add_argument(f"--profile-directory={self.account['profile_name']}")
+            
+            options.add_experimental_option("prefs", prefs)
+            
+            if crawl:
+                crawl_optionen(options, crawl_config)
+            
+            # Optional: Headless Mode
+            if headless:
+                options.add_argument('--headless=new')
         
         # Chrome Service (nutzt system chromedriver)
         # self.driver = webdriver.Chrome(options=options) alte Variante
-        # ✅ NEU (mit webdriver-manager)
-        from webdriver_manager.chrome import ChromeDriverManager
-        from selenium.webdriver.chrome.service import Service
-
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=options)
+        # ✅ NEU (mit webdriver-manager, Pfad zwischengespeichert)
+        try:
+            service = Service(resolve_driver_path(self.config))
+            self.driver = webdriver.Chrome(service=service, options=options)
+        except SessionNotCreatedException:
+            if self.config['browser'].get('driver_path'):
+                raise
+            # Gespeicherter Driver passt nicht mehr zur Browserversion
+            print("⚠ ChromeDriver passt nicht zum Browser, ermittle neu...")
+            service = Service(resolve_driver_path(self.config, neu=True))
+            self.driver = webdriver.Chrome(service=service, options=options)
         # self.driver.set_page_load_timeout(30)
         # ✅ BESSER (mit Timeout)
         self.driver.set_page_load_timeout(60)       # Seite lädt max 30 Sekunden
         self.driver.implicitly_wait(30)             # Elemente suchen max 10 Sekunden
         
+        if crawl:
+            blockiere_ressourcen(self.driver, blockierte_muster(crawl_config))
+        if self.warm:
+            # Ein bereits laufender Browser kennt evtl. einen anderen Download-Ordner
+            self.driver.execute_cdp_cmd('Browser.setDownloadBehavior', {
+                'behavior': 'allow',
+                'downloadPath': str(self.browser_download_dir.absolute())
+            })
+        
         print("✓ Browser gestartet")
     
     def login_check(self):
         """Prüfe ob bereits eingeloggt, sonst warte auf manuellen Login"""
-        self.driver.get("https://www.amazon.de/gp/your-account/order-history")
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        
+        self.driver.get(f"{self.base_url}/gp/your-account/order-history")
         
         try:
             # Warte auf Login-Seite oder Order-Seite
@@ -104,153 +349,576 @@ class AmazonInvoiceDownloader:
             print("❌ Timeout beim Login")
             raise
     
-    def get_orders(self, year=None):
-        """Hole Liste aller Bestellungen"""
-        orders = []
+    def setup_http_session(self):
+        """Übernimm die Cookies des eingeloggten Browsers in eine HTTP-Session"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        pool_size = self.config['download'].get('pool_size', 4)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        
+        # Gleicher User-Agent wie der Browser, sonst verwirft Amazon die Session
+        session.headers['User-Agent'] = self.driver.execute_script("return navigator.userAgent")
+        
+        for cookie in self.driver.get_cookies():
+            session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain'),
+                path=cookie.get('path', '/')
+            )
+        
+        self.session = session
+        print(f"✓ HTTP-Session übernommen ({len(session.cookies)} Cookies)")
+    
+    def iter_pages(self, year=None, fortsetzen=None):
+        """
+        Bestellseiten als Strom: (Seitennummer, Daten) mit cards, has_next, next_url
         
-        # Filtere nach Jahr falls angegeben
-        if year:
-            filter_url = f"https://www.amazon.de/gp/your-account/order-history?orderFilter=year-{year}"
-            self.driver.get(filter_url)
+        Die Seiten werden über startIndex adressiert und per fetch() im
+        Browser geladen; die nächsten `download.prefetch_seiten` Seiten
+        laufen schon, während die aktuelle verarbeitet wird.
+        """
+        download_config = self.config['download']
+        tiefe = download_config.get('prefetch_seiten', 2)
+        groesse = download_config.get('seitengroesse', 10)
+        timeout = download_config.get('timeout_seconds', 30)
+        
+        if fortsetzen:
+            page = fortsetzen['seiten'] + 1
+            url = fortsetzen['naechste_url']
+            print(f"\n↻ Setze Scan bei Seite {page} fort")
         else:
-            self.driver.get("https://www.amazon.de/gp/your-account/order-history")
+            page = 1
+            url = f"{self.base_url}/gp/your-account/order-history"
+            if year:
+                # Filtere nach Jahr falls angegeben
+                url += f"?orderFilter=year-{year}"
+        
+        with self.driver_lock:
+            self.driver.set_script_timeout(timeout)
+        
+        try:
+            while url:
+                start = start_index(url)
+                vorladen = [url]
+                if start is not None:
+                    vorladen += [mit_start_index(url, start + groesse * i) for i in range(1, tiefe + 1)]
+                
+                page_data = self._lade_seite_gebremst(page, vorladen)
+                
+                yield page, page_data
+                
+                next_url = page_data.get('next_url') if page_data['has_next'] else None
+                if next_url and start is not None and start_index(next_url) is not None:
+                    # Seitengröße aus dem Weiter-Link lernen und die vorgeladene URL treffen
+                    if start_index(next_url) > start:
+                        groesse = start_index(next_url) - start
+                    next_url = mit_start_index(url, start_index(next_url))
+                url = next_url
+                page += 1
+        finally:
+            # Nicht mehr benötigte vorgeladene Seiten verwerfen
+            with self.driver_lock:
+                try:
+                    self.driver.execute_script("delete window.__bestellseiten;")
+                except Exception:
+                    pass
+    
+    def _lade_seite_gebremst(self, page, vorladen):
+        """
+        Bestellseite im Takt des Limiters laden
         
-        time.sleep(2)
+        Bei 503 oder Captcha wird die Rate gesenkt und die Seite nach
+        Backoff erneut geladen; eine Login-Umleitung bricht den Scan ab.
+        """
+        download_config = self.config['download']
+        max_retries = download_config.get('max_retries', 4)
+        backoff = download_config.get('backoff_seconds', 2)
         
-        page = 1
-        while True:
-            print(f"\n📄 Verarbeite Seite {page}...")
+        for versuch in range(max_retries + 1):
+            if self.limiter:
+                self.limiter.acquire()
+            start = time.monotonic()
+            with self.messung.span('seite_laden'):
+                page_data = self._lade_seite(vorladen)
             
-            try:
-                # Finde alle Bestellkarten
-                order_cards = self.driver.find_elements(By.CSS_SELECTOR, ".order-card, .order")
+            if page_data['status'] in (429, 503):
+                signal = f"HTTP {page_data['status']}"
+            elif page_data.get('captcha'):
+                signal = "Captcha"
+            else:
+                signal = drosselsignal(page_data.get('url'))
+            
+            if signal is None:
+                if page_data['status'] != 200:
+                    raise RuntimeError(
+                        f"Seite {page}: HTTP {page_data['status']} {page_data.get('fehler') or ''}".strip()
+                    )
+                if self.limiter:
+                    self.limiter.erfolg(time.monotonic() - start)
+                return page_data
+            
+            if self.limiter:
+                self.limiter.gedrosselt(signal)
+            if signal == "Login-Umleitung":
+                raise RuntimeError("Session abgelaufen oder von Amazon abgemeldet, bitte neu einloggen")
+            if versuch < max_retries:
+                wartezeit = backoff * (2 ** versuch) + random.uniform(0, backoff)
+                print(f"  ⚠ Seite {page}: {signal}, neuer Versuch in {wartezeit:.1f}s")
+                time.sleep(wartezeit)
+        
+        raise RuntimeError(f"Seite {page}: {signal} nach {max_retries + 1} Versuchen")
+    
+    def _lade_seite(self, vorladen):
+        """Erste URL aus `vorladen` lesen, die übrigen im Browser vorladen"""
+        with self.driver_lock:
+            page_data = self.driver.execute_async_script(ORDER_PAGE_JS, vorladen)
+            if page_data['status'] == 0:
+                # fetch() nicht möglich (z.B. aktuelle Seite ist ein PDF): klassisch navigieren
+                self.driver.get(vorladen[0])
+                page_data = self.driver.execute_script(ORDER_CARDS_JS)
+                page_data.update(status=200, url=self.driver.current_url)
+        return page_data
+    
+    def iter_orders(self, year=None, incremental=True, fortsetzen=None):
+        """
+        Neue Bestellungen als Strom, Seite für Seite
+        
+        Bei incremental=True wird beim ersten bereits indizierten
+        Auftrag aufgehört (Amazon listet neueste Bestellungen zuerst),
+        sobald die Übersicht einmal bis zur letzten Seite gescannt wurde.
+        Mit `fortsetzen` (Stand aus dem Checkpoint) geht es nach der
+        zuletzt vollständig gescannten Seite weiter. Jede Seite landet
+        im Index und im Checkpoint, bevor ihre Bestellungen geliefert werden.
+        """
+        if fortsetzen and (fortsetzen['scan_fertig'] or not fortsetzen['naechste_url']):
+            print(f"\n↻ Bestellübersicht bereits vollständig gescannt ({len(fortsetzen['orders'])} Bestellungen)")
+            if self.checkpoint:
+                self.checkpoint.scan_fertig()
+            return
+        
+        # Ohne vollständigen Erstscan liegen hinter bekannten Bestellungen
+        # womöglich noch nie gesehene Seiten (abgebrochener Erstlauf)
+        konto = self.account['name']
+        bei_bekannt_stoppen = incremental and self.index.voll_gescannt(konto, year)
+        if incremental and not bei_bekannt_stoppen:
+            print("ℹ️  Noch kein vollständiger Scan im Index, lese alle Seiten")
+        
+        try:
+            for page, page_data in self.iter_pages(year, fortsetzen):
+                if self.stopp.is_set():
+                    print(f"\n⚠ Abgebrochen, Suche endet vor Seite {page}")
+                    return
+                print(f"\n📄 Seite {page}: {len(page_data['cards'])} Bestellkarten")
                 
-                for card in order_cards:
-                    try:
-                        # Order-ID extrahieren
-                        order_id_element = card.find_element(By.XPATH, ".//span[contains(text(), 'Bestellung aufgegeben')]/../..//span[contains(text(), 'Bestellnummer:')]")
-                        order_id = order_id_element.text.replace("Bestellnummer:", "").strip()
-                        
-                        # Rechnung-Link finden
-                        try:
-                            invoice_link = card.find_element(By.XPATH, ".//a[contains(@href, 'invoice')]")
-                            invoice_url = invoice_link.get_attribute('href')
-                            
-                            orders.append({
-                                'id': order_id,
-                                'invoice_url': invoice_url
-                            })
-                            print(f"  ✓ Gefunden: {order_id}")
-                            
-                        except NoSuchElementException:
-                            # Keine Rechnung verfügbar (z.B. Marketplace-Seller)
-                            pass
-                            
-                    except Exception as e:
-                        print(f"  ⚠ Fehler beim Verarbeiten einer Bestellung: {e}")
+                reached_known = False
+                page_orders = []
+                for card in page_data['cards']:
+                    order_id = card['id']
+                    if not order_id:
+                        print("  ⚠ Bestellkarte ohne Bestellnummer übersprungen")
+                        continue
+                    
+                    if incremental and self.index.knows(order_id):
+                        if bei_bekannt_stoppen:
+                            reached_known = True
+                            break
+                        continue
+                    
+                    if not card['invoice_url']:
+                        # Keine Rechnung verfügbar (z.B. Marketplace-Seller)
                         continue
+                    
+                    page_orders.append({
+                        'id': order_id,
+                        'date': parse_order_date(card['date']),
+                        'invoice_url': card['invoice_url']
+                    })
                 
-                # Prüfe ob "Nächste Seite" existiert
-                try:
-                    next_button = self.driver.find_element(By.CSS_SELECTOR, ".a-pagination .a-last:not(.a-disabled)")
-                    next_button.click()
-                    time.sleep(2)
-                    page += 1
-                except NoSuchElementException:
+                has_next = page_data['has_next'] and not reached_known
+                self.index.add_orders(page_orders, account=konto)
+                if self.checkpoint:
+                    self.checkpoint.seite(page, page_orders, page_data.get('next_url') if has_next else None)
+                yield from page_orders
+                
+                if reached_known:
+                    print("\n✓ Bekannte Bestellung erreicht, Rest ist bereits im Index")
+                    break
+                if not has_next:
                     print("\n✓ Alle Seiten verarbeitet")
+                    self.index.scan_vollstaendig(konto, year)
                     break
-                    
-            except Exception as e:
-                print(f"❌ Fehler beim Laden der Seite: {e}")
-                break
+        except Exception as e:
+            # Ohne scan_fertig setzt --resume nach der letzten gescannten Seite fort
+            print(f"❌ Fehler beim Laden der Seite: {e}")
+            return
         
+        if self.checkpoint:
+            self.checkpoint.scan_fertig()
+    
+    def get_orders(self, year=None, incremental=True, fortsetzen=None):
+        """Hole Liste aller neuen Bestellungen (iter_orders als Liste)"""
+        orders = list(fortsetzen['orders']) if fortsetzen else []
+        orders.extend(self.iter_orders(year, incremental, fortsetzen))
         return orders
     
     def download_invoice(self, order):
         """Lade einzelne Rechnung herunter"""
+        if self.session is not None:
+            return self.fetch_invoice(order)
+        
         try:
-            self.driver.get(order['invoice_url'])
-            time.sleep(2)
-            
-            # Warte auf PDF-Download oder PDF-Anzeige
-            # Amazon zeigt manchmal PDFs direkt an oder lädt sie herunter
-            
             filename = f"Amazon_Rechnung_{order['id']}.pdf"
             expected_file = self.download_dir / filename
             
-            # Warte kurz auf Download
-            time.sleep(3)
+            if self.watcher is None:
+                self.watcher = DownloadWatcher(self.browser_download_dir)
+            # Alles was vor diesem Aufruf da war, gehört nicht zu dieser Bestellung
+            self.watcher.drain()
             
-            # Suche nach heruntergeladener Datei
-            downloads = list(self.download_dir.glob("*.pdf"))
-            if downloads:
-                # Neueste PDF umbenennen
-                latest_pdf = max(downloads, key=lambda p: p.stat().st_mtime)
-                if not expected_file.exists():
-                    latest_pdf.rename(expected_file)
-                return True
+            # Amazon zeigt manchmal PDFs direkt an oder lädt sie herunter
+            with self.messung.span('seite_laden'), self.driver_lock:
+                self.driver.get(order['invoice_url'])
+                signal = drosselsignal(self.driver.current_url, self.driver.title)
+            if signal == "Captcha":
+                raise ThrottledError(200, grund=signal)
+            if signal:
+                # Login-Umleitung mitten im Lauf: ebenfalls langsamer werden
+                if self.limiter:
+                    self.limiter.gedrosselt(signal)
+                print("  ❌ Session abgelaufen, bitte neu einloggen")
+                return False
             
-            return False
+            # Warte genau bis die neue Datei fertig geschrieben ist
+            timeout = self.config['download'].get('wait_timeout_seconds', 30)
+            with self.messung.span('download_warten'):
+                new_pdf = self.watcher.wait_for_new(timeout)
+            if new_pdf is None:
+                return False
+            
+            if new_pdf != expected_file:
+                with self.messung.span('datei_verschieben'):
+                    if expected_file.exists() and file_sha256(expected_file) == file_sha256(new_pdf):
+                        # Dieselbe Rechnung liegt schon da: Chromes Kopie nicht liegen lassen
+                        new_pdf.unlink()
+                    else:
+                        os.replace(new_pdf, expected_file)
+                self.watcher.mark_known(filename)
+            return True
             
+        except ThrottledError:
+            # Retry übernimmt der Download-Pool
+            raise
         except Exception as e:
             print(f"  ❌ Fehler beim Download {order['id']}: {e}")
             return False
     
-    def download_all(self, year=None):
-        """Hauptfunktion: Alle Rechnungen herunterladen"""
+    def fetch_invoice(self, order):
+        """Lade Rechnung direkt per HTTP als Byte-Stream (ohne Browser)"""
+        expected_file = self.download_dir / f"Amazon_Rechnung_{order['id']}.pdf"
+        # Erst in Teildatei schreiben, dann atomar umbenennen
+        partial_file = expected_file.with_name(expected_file.name + ".part")
+        timeout = self.config['download'].get('timeout_seconds', 30)
+        
         try:
+            with self.messung.span('seite_laden'):
+                response = self.session.get(order['invoice_url'], stream=True, timeout=timeout)
+            self._check_throttled(response)
+            response.raise_for_status()
+            
+            if drosselsignal(response.url) == "Login-Umleitung":
+                # Login-Umleitung mitten im Lauf: ebenfalls langsamer werden
+                if self.limiter:
+                    self.limiter.gedrosselt("Login-Umleitung")
+                print("  ❌ Session abgelaufen, bitte neu einloggen")
+                return False
+            
+            if not self._is_pdf(response):
+                # Amazon liefert meist erst ein Popover mit Links zu den PDFs
+                if drosselsignal(response.url, response.text) == "Captcha":
+                    raise ThrottledError(response.status_code, grund="Captcha")
+                pdf_url = self._find_pdf_link(response.text, response.url)
+                if not pdf_url:
+                    print("  ⚠ Kein PDF-Link gefunden")
+                    return False
+                
+                with self.messung.span('seite_laden'):
+                    response = self.session.get(pdf_url, stream=True, timeout=timeout)
+                self._check_throttled(response)
+                response.raise_for_status()
+                if not self._is_pdf(response):
+                    if drosselsignal(response.url, response.text) == "Captcha":
+                        raise ThrottledError(response.status_code, grund="Captcha")
+                    print(f"  ⚠ Antwort ist kein PDF: {response.headers.get('Content-Type')}")
+                    return False
+            
+            with self.messung.span('download_warten'):
+                with open(partial_file, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+            with self.messung.span('datei_verschieben'):
+                os.replace(partial_file, expected_file)
+            return True
+            
+        except ThrottledError:
+            # Retry übernimmt der Download-Pool
+            raise
+        except Exception as e:
+            # Abgebrochene Übertragung: keine halbe Teildatei liegen lassen
+            partial_file.unlink(missing_ok=True)
+            print(f"  ❌ Fehler beim Download {order['id']}: {e}")
+            return False
+    
+    @staticmethod
+    def _check_throttled(response):
+        """Wirf ThrottledError bei HTTP 429/503"""
+        if response.status_code in (429, 503):
+            retry_after = response.headers.get('Retry-After')
+            raise ThrottledError(
+                response.status_code,
+                float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+    
+    @staticmethod
+    def _is_pdf(response):
+        """Prüfe ob eine HTTP-Antwort ein PDF enthält"""
+        content_type = response.headers.get('Content-Type', '').lower()
+        return 'pdf' in content_type or 'octet-stream' in content_type
+    
+    @staticmethod
+    def _find_pdf_link(page, base_url):
+        """Suche den ersten Rechnungs-PDF-Link in einer HTML-Seite"""
+        for href in re.findall(r'href="([^"]+)"', page):
+            href = html.unescape(href)
+            if '.pdf' in href or '/documents/download/' in href:
+                return urljoin(base_url, href)
+        return None
+    
+    def download_order(self, order):
+        """Worker für den Download-Pool: lade eine Bestellung und protokolliere den Status"""
+        status = self._download_order(order)
+        if self.checkpoint:
+            self.checkpoint.download(order['id'], status)
+        return status
+    
+    def _download_order(self, order):
+        entry = self.index.get(order['id'])
+        if entry and entry['status'] in (HERUNTERGELADEN, ABGELEGT):
+            return 'vorhanden'
+        
+        # Dateien aus Läufen vor dem Index übernehmen
+        target = self.download_dir / f"Amazon_Rechnung_{order['id']}.pdf"
+        if target.exists():
+            self.index.set_status(order['id'], HERUNTERGELADEN, file_sha256(target))
+            return 'vorhanden'
+        
+        with self.messung.span('rechnung_download'):
+            erfolgreich = self.download_invoice(order)
+        if erfolgreich:
+            try:
+                sha256 = file_sha256(target)
+            except FileNotFoundError:
+                # --watch hat die Datei schon abgelegt (Hash steht im Manifest)
+                self.index.set_status(order['id'], HERUNTERGELADEN)
+                return 'ok'
+            self.index.set_status(order['id'], HERUNTERGELADEN, sha256)
+            if self.on_downloaded:
+                self.on_downloaded(order, target)
+            return 'ok'
+        
+        self.index.set_status(order['id'], FEHLER)
+        return 'fehler'
+    
+    def create_limiter(self):
+        """Token-Bucket gemäß Konfiguration (adaptiv oder mit fester Rate)"""
+        download_config = self.config['download']
+        
+        # Standardrate aus der alten Pause zwischen Downloads ableiten
+        rate = download_config.get('rate_per_second')
+        if not rate:
+            rate = 1.0 / max(download_config.get('delay_seconds', 2), 0.1)
+        
+        if not download_config.get('adaptiv', True):
+            return TokenBucket(rate, download_config.get('burst', 2))
+        
+        limiter = AdaptiverTokenBucket(
+            rate,
+            download_config.get('burst', 2),
+            rate_min=download_config.get('rate_min', 0.2),
+            rate_max=download_config.get('rate_max', max(rate, 5.0)),
+            schritt=download_config.get('rate_schritt', 0.1),
+            ziel_latenz=download_config.get('ziel_latenz_seconds', 2.0)
+        )
+        print(f"⚙ Adaptive Rate: Start {limiter.rate:.2f} Req/s "
+              f"({limiter.rate_min:g}-{limiter.rate_max:g} Req/s)")
+        return limiter
+    
+    def create_pool(self, limiter=None):
+        """Erstelle Download-Pool gemäß Konfiguration"""
+        download_config = self.config['download']
+        
+        # Im Browser-Modus gibt es nur einen Driver, also keine Parallelität
+        concurrency = download_config.get('concurrency', 4) if self.session else 1
+        
+        return DownloadPool(
+            self.download_order,
+            concurrency=concurrency,
+            limiter=limiter or self.create_limiter(),
+            max_retries=download_config.get('max_retries', 4),
+            backoff_seconds=download_config.get('backoff_seconds', 2)
+        )
+    
+    def start_session(self):
+        """Browser starten, Login prüfen und ggf. HTTP-Session übernehmen"""
+        with self.messung.span('browser_start'):
             self.setup_driver()
+        with self.messung.span('login'):
             self.login_check()
+        
+        if self.fetch_mode == 'http':
+            self.setup_http_session()
+    
+    def download_pending(self, year=None, limiter=None, erledigt=(), neue=()):
+        """
+        Lade neu gefundene und alle übrigen offenen Rechnungen dieses Kontos
+        
+        `neue` darf die laufende Suche sein (iter_orders): die ersten
+        Downloads starten, während weitere Seiten noch gelesen werden.
+        """
+        def offene():
+            gesehen = set()
+            for order in neue:
+                if self.stopp.is_set():
+                    return
+                gesehen.add(order['id'])
+                eintrag = self.index.get(order['id'])
+                if order['id'] not in erledigt and (eintrag is None or eintrag['status'] in (NEU, FEHLER)):
+                    yield order
+            # Früher fehlgeschlagene Bestellungen (ohne die laut Checkpoint erledigten)
+            for order in self.index.pending(year, account=self.account['name']):
+                if self.stopp.is_set():
+                    return
+                if order['id'] not in gesehen and order['id'] not in erledigt:
+                    yield order
+        
+        print(f"\n📥 Starte Download nach: {self.download_dir}")
+        results = self.create_pool(limiter or self.limiter).run(offene())
+        if not results:
+            print("\n⚠ Keine offenen Rechnungen")
+        return results
+    
+    def sync(self, year=None, incremental=True, resume=False, limiter=None):
+        """
+        Bestellungen suchen und offene Rechnungen laden, mit Checkpoint-Journal
+        
+        Suche und Download laufen als Strom: jede gefundene Bestellung geht
+        sofort an den Download-Pool. Liegt ein unvollständiges Journal vor,
+        wird der abgebrochene Lauf fortgesetzt (bereits gescannte Seiten und
+        erledigte Downloads werden übersprungen), auch ohne resume=True;
+        resume=True meldet zusätzlich, wenn es nichts fortzusetzen gibt.
+        
+        Returns:
+            (Anzahl neuer Bestellungen, Download-Ergebnisse)
+        """
+        checkpoint = Checkpoint.fuer_lauf(self.download_dir, self.account['name'], year)
+        # Ein offenes Journal ist die einzige Spur eines abgebrochenen Laufs
+        # und wird nie stillschweigend überschrieben
+        stand = checkpoint.lade()
+        if resume and stand is None:
+            print("\n⚠ Kein abgebrochener Lauf gefunden, starte neu")
+        elif stand:
+            if not resume:
+                print(f"\n⚠ Unvollständiger Lauf in {checkpoint.pfad.name} gefunden, setze ihn automatisch fort")
+            erledigte = sum(1 for status in stand['downloads'].values() if status in ERLEDIGT)
+            print(f"\n↻ Setze Lauf fort: {stand['seiten']} Seiten, "
+                  f"{len(stand['orders'])} Bestellungen, {erledigte} Downloads erledigt")
+        
+        checkpoint.beginne(fortsetzen=stand is not None, jahr=year, inkrementell=incremental)
+        self.checkpoint = checkpoint
+        # Seiten und Downloads teilen sich den Limiter (im Session-Pool auch kontenübergreifend)
+        self.limiter = limiter or self.limiter or self.create_limiter()
+        try:
+            neue = len(stand['orders']) if stand else 0
             
-            print(f"\n🔍 Suche Bestellungen{f' für {year}' if year else ''}...")
-            orders = self.get_orders(year)
-            
-            if not orders:
-                print("\n⚠ Keine Bestellungen mit Rechnungen gefunden")
-                return
+            def gefunden():
+                nonlocal neue
+                for order in self.iter_orders(year, incremental=incremental, fortsetzen=stand):
+                    neue += 1
+                    yield order
             
-            print(f"\n✓ {len(orders)} Bestellungen mit Rechnungen gefunden")
-            print(f"\n📥 Starte Download nach: {self.download_dir}")
+            erledigt = {
+                order_id for order_id, status in (stand or {}).get('downloads', {}).items()
+                if status in ERLEDIGT
+            }
+            results = self.download_pending(year, limiter=self.limiter, erledigt=erledigt, neue=gefunden())
+            print(f"\n✓ {neue} neue Bestellungen mit Rechnungen gefunden")
             
-            successful = 0
-            failed = 0
+            # Nur ein vollständiger Lauf ohne Fehler braucht keinen Checkpoint mehr
+            if checkpoint.gescannt and all(r['status'] != 'fehler' for r in results):
+                checkpoint.abschliessen()
+            return neue, results
+        finally:
+            checkpoint.close()
+            self.checkpoint = None
+    
+    def close(self):
+        """Browser, HTTP-Session und Index schließen"""
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
+        if self.session:
+            self.session.close()
+            self.session = None
+        self.index.close()
+        if self.driver:
+            if self.warm:
+                # Nur den ChromeDriver beenden, der Browser bleibt für den nächsten Lauf warm
+                self.driver.service.stop()
+                print("\n✓ Browser bleibt für den nächsten Lauf aktiv")
+            else:
+                self.driver.quit()
+                print("\n✓ Browser geschlossen")
+            self.driver = None
+        if self.wegwerf_dir:
+            shutil.rmtree(self.wegwerf_dir, ignore_errors=True)
+            self.wegwerf_dir = None
+    
+    def download_all(self, year=None, full_scan=False, resume=False):
+        """Hauptfunktion: Alle Rechnungen herunterladen"""
+        try:
+            self.start_session()
             
-            for i, order in enumerate(orders, 1):
-                print(f"\n[{i}/{len(orders)}] {order['id']}")
-                
-                # Prüfe ob bereits vorhanden
-                filename = f"Amazon_Rechnung_{order['id']}.pdf"
-                if (self.download_dir / filename).exists():
-                    print(f"  ⏭ Bereits vorhanden")
-                    successful += 1
-                    continue
-                
-                if self.download_invoice(order):
-                    print(f"  ✓ Heruntergeladen")
-                    successful += 1
-                else:
-                    print(f"  ❌ Fehlgeschlagen")
-                    failed += 1
-                
-                # Pause zwischen Downloads
-                if i < len(orders):
-                    time.sleep(self.config['download'].get('delay_seconds', 2))
+            print(f"\n🔍 Suche Bestellungen{f' für {year}' if year else ''}...")
+            _, results = self.sync(year, incremental=not full_scan, resume=resume)
+            counts = zusammenfassung(results)
             
             print(f"\n{'='*50}")
-            print(f"✓ Erfolgreich: {successful}")
-            print(f"❌ Fehlgeschlagen: {failed}")
+            print(f"✓ Heruntergeladen: {counts['ok']}")
+            print(f"⏭ Bereits vorhanden: {counts['vorhanden']}")
+            print(f"❌ Fehlgeschlagen: {counts['fehler']}")
             print(f"📁 Speicherort: {self.download_dir}")
+            if isinstance(self.limiter, AdaptiverTokenBucket):
+                statistik = self.limiter.statistik
+                print(f"⚙ Rate am Ende: {self.limiter.rate:.2f} Req/s "
+                      f"({statistik['drosselsignale']} Drosselsignale, {statistik['gesenkt']}x gesenkt)")
+            for stufe, werte in sorted(self.messung.zusammenfassung().items()):
+                print(f"⏱ {stufe:<18} p50 {werte['p50_ms']:>8.1f} ms  p95 {werte['p95_ms']:>8.1f} ms  ({werte['anzahl']}x)")
             print(f"{'='*50}")
             
+            return results
+            
         except KeyboardInterrupt:
             print("\n\n⚠ Abbruch durch Benutzer")
         except Exception as e:
             print(f"\n❌ Fehler: {e}")
             raise
         finally:
-            if self.driver:
-                self.driver.quit()
-                print("\n✓ Browser geschlossen")
+            self.close()
 
 def main():
     parser = argparse.ArgumentParser(
@@ -270,6 +938,38 @@ def main():
         help='Alle verfügbaren Rechnungen herunterladen'
     )
     
+    parser.add_argument(
+        '--years',
+        type=int,
+        nargs='+',
+        help='Mehrere Jahre parallel nachladen (z.B. --years 2022 2023 2024)'
+    )
+    
+    parser.add_argument(
+        '--accounts',
+        nargs='+',
+        help='Nur diese Konten aus accounts: verwenden (Standard: alle)'
+    )
+    
+    parser.add_argument(
+        '--sessions',
+        type=int,
+        default=2,
+        help='Anzahl paralleler Browser-Sessions für --years (Standard: 2)'
+    )
+    
+    parser.add_argument(
+        '--full-scan',
+        action='store_true',
+        help='Alle Seiten der Bestellübersicht durchsuchen (Index ignorieren)'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Abgebrochenen Lauf aus dem Checkpoint fortsetzen'
+    )
+    
     parser.add_argument(
         '--config',
         default=Path(__file__).parent / 'config.yaml',
@@ -278,7 +978,7 @@ def main():
     
     args = parser.parse_args()
     
-    if not args.download_all and not args.year:
+    if not args.download_all and not args.year and not args.years:
         parser.print_help()
         sys.exit(1)
     
@@ -287,9 +987,24 @@ def main():
     print("Amazon Invoice Downloader")
     print("="*50)
     
+    # Mehrere Jahre/Konten über den Session-Pool
+    if args.years or args.accounts:
+        from session_pool import SessionPool
+        
+        pool = SessionPool(args.config, sessions=args.sessions, full_scan=args.full_scan,
+                           resume=args.resume)
+        results = pool.run(args.years or [args.year], account_names=args.accounts)
+        counts = zusammenfassung(results)
+        print(f"\n{'='*50}")
+        print(f"✓ Heruntergeladen: {counts['ok']}")
+        print(f"⏭ Bereits vorhanden: {counts['vorhanden']}")
+        print(f"❌ Fehlgeschlagen: {counts['fehler']}")
+        print(f"{'='*50}")
+        return
+    
     # Initialisiere und starte
     downloader = AmazonInvoiceDownloader(args.config)
-    downloader.download_all(year=args.year)
+    downloader.download_all(year=args.year, full_scan=args.full_scan, resume=args.resume)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
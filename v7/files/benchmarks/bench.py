@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Benchmark
+Misst Durchsatz, Latenz pro Rechnung (p50/p95) und Spitzen-RSS für den
+Download (AmazonInvoiceDownloader) und den Gesamtlauf (SteuerAutomation)
+gegen den lokalen Amazon-Stub - ohne Amazon-Konto und offline
+
+Verwendung (im files/ Ordner, Chromium/Chrome und src/ müssen vorhanden sein):
+    python3 benchmarks/bench.py                           # 50, 1.000 und 10.000 Rechnungen
+    python3 benchmarks/bench.py --groessen 50 --latenz-ms 80
+    python3 benchmarks/bench.py --drossel-rate 5          # Amazon-Drosselung simulieren
+    python3 benchmarks/bench.py --drossel-rate 5 --drossel-art captcha
+    python3 benchmarks/bench.py --vergleich benchmarks/ergebnisse/alt.json
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from pathlib import Path
+from datetime import datetime
+
+import yaml
+
+BENCH_DIR = Path(__file__).resolve().parent
+FILES_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(FILES_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from stub_server import AmazonStub, DROSSEL_ARTEN
+from messung import perzentil
+
+SZENARIEN = ("download", "ausfuehren", "pipeline")
+
+
+def peak_rss_mb():
+    """Spitzen-RSS dieses Prozesses und seiner beendeten Kindprozesse (Browser, Worker)"""
+    # Linux liefert KiB, macOS Bytes
+    faktor = 1024 if sys.platform.startswith("linux") else 1
+    selbst = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * faktor
+    kinder = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * faktor
+    return round(selbst / 2**20, 1), round(kinder / 2**20, 1)
+
+
+def schreibe_configs(arbeitsordner: Path, base_url: str, rate: float):
+    """Erzeuge amazon_config.yaml und config.yaml für einen isolierten Lauf"""
+    with open(FILES_DIR / "amazon_config.yaml", encoding="utf-8") as f:
+        amazon = yaml.safe_load(f)
+    amazon["amazon"] = {"base_url": base_url}
+    amazon["browser"].update({"use_profile": False, "headless": True})
+    amazon["download"]["directory"] = str(arbeitsordner / "amazon_downloads")
+    amazon["download"]["rate_per_second"] = rate
+    # Adaptive Rate darf bis zur vorgegebenen Rate steigen
+    amazon["download"]["rate_max"] = rate
+    amazon.pop("accounts", None)
+    amazon_pfad = arbeitsordner / "amazon_config.yaml"
+    amazon_pfad.write_text(yaml.safe_dump(amazon, allow_unicode=True), encoding="utf-8")
+
+    with open(FILES_DIR / "config.yaml", encoding="utf-8") as f:
+        steuer = yaml.safe_load(f)
+    steuer["paths"] = {
+        "download_dir": str(arbeitsordner / "amazon_downloads"),
+        "temp_dir": str(arbeitsordner / "temp"),
+        "steuer_dir": str(arbeitsordner / "steuer"),
+        "log_dir": str(arbeitsordner / "logs"),
+    }
+    steuer["amazon"] = {
+        "script_path": str(FILES_DIR / "amazon_invoice_downloader.py"),
+        "config_path": str(amazon_pfad),
+    }
+    steuer["notifications"]["telegram"]["enabled"] = False
+    steuer_pfad = arbeitsordner / "config.yaml"
+    steuer_pfad.write_text(yaml.safe_dump(steuer, allow_unicode=True), encoding="utf-8")
+
+    return amazon_pfad, steuer_pfad
+
+
+def lauf_download(stub, amazon_pfad, steuer_pfad):
+    """AmazonInvoiceDownloader.get_orders + download_all; Latenz = Downloaddauer pro Rechnung"""
+    from amazon_invoice_downloader import AmazonInvoiceDownloader
+
+    downloader = AmazonInvoiceDownloader(str(amazon_pfad))
+    ergebnisse = downloader.download_all(year=stub.jahr, full_scan=True) or []
+    latenzen = [r["dauer"] for r in ergebnisse if r["status"] == "ok"]
+    return len(latenzen), latenzen
+
+
+def lauf_ausfuehren(stub, amazon_pfad, steuer_pfad, pipeline=False):
+    """SteuerAutomation.ausfuehren; Latenz = PDF ausgeliefert → abgelegt"""
+    import ablage
+    from main import SteuerAutomation
+
+    abgelegt = {}
+
+    class ZeitAblage:
+        """Stellvertreter für FileManager (verarbeitung.stapel_ablage: false), der den Ablagezeitpunkt misst"""
+
+        def __init__(self, file_mgr):
+            self.file_mgr = file_mgr
+
+        def verarbeite_pdf(self, pdf_path, betrag):
+            ziel = self.file_mgr.verarbeite_pdf(pdf_path, betrag)
+            abgelegt[pdf_path.name] = time.perf_counter()
+            return ziel
+
+        def __getattr__(self, name):
+            return getattr(self.file_mgr, name)
+
+    class ZeitStapelAblage(ablage.StapelAblage):
+        """Stapel-Ablage, die den Ablagezeitpunkt jeder Datei misst"""
+
+        def ausfuehren(self, plan):
+            plan = super().ausfuehren(plan)
+            jetzt = time.perf_counter()
+            for quelle, _ in plan:
+                abgelegt[quelle.name] = jetzt
+            return plan
+
+    class BenchAutomation(SteuerAutomation):
+        def _verarbeite_pdfs(self, pdfs, processor, file_mgr, stapel=None):
+            return super()._verarbeite_pdfs(pdfs, processor, ZeitAblage(file_mgr), stapel)
+
+    # main importiert die Ablage erst beim Verarbeiten (eigener Prozess pro Szenario)
+    ablage.StapelAblage = ZeitStapelAblage
+
+    os.chdir(steuer_pfad.parent)
+    app = BenchAutomation(str(steuer_pfad))
+    app.ausfuehren(pipeline=pipeline, year=stub.jahr)
+
+    latenzen = []
+    for order_id, ausgeliefert in stub.ausgeliefert.items():
+        fertig = abgelegt.get(f"Amazon_Rechnung_{order_id}.pdf")
+        if fertig is not None:
+            latenzen.append(fertig - ausgeliefert)
+    return len(abgelegt), latenzen
+
+
+def szenario(name, groesse, latenz_ms, drossel_rate, rate, rueckgabe, drossel_art="503"):
+    """Ein Szenario in einem eigenen Prozess (damit Spitzen-RSS getrennt gemessen wird)"""
+    arbeitsordner = Path(tempfile.mkdtemp(prefix=f"bench-{name}-{groesse}-"))
+    stub = AmazonStub(groesse, latenz_ms=latenz_ms, drossel_rate=drossel_rate, drossel_art=drossel_art)
+    try:
+        amazon_pfad, steuer_pfad = schreibe_configs(arbeitsordner, stub.start(), rate)
+
+        start = time.perf_counter()
+        if name == "download":
+            anzahl, latenzen = lauf_download(stub, amazon_pfad, steuer_pfad)
+        else:
+            anzahl, latenzen = lauf_ausfuehren(stub, amazon_pfad, steuer_pfad,
+                                               pipeline=(name == "pipeline"))
+        dauer = time.perf_counter() - start
+
+        rss_selbst, rss_kinder = peak_rss_mb()
+        rueckgabe.put({
+            "szenario": name,
+            "groesse": groesse,
+            "rechnungen_erwartet": stub.rechnungen,
+            "rechnungen_fertig": anzahl,
+            "latenz_ms_stub": latenz_ms,
+            "drossel_rate": drossel_rate,
+            "drossel_art": drossel_art,
+            "anfragen": stub.anfragen,
+            "gedrosselt": stub.gedrosselt,
+            "dauer_s": round(dauer, 3),
+            "durchsatz_pro_s": round(anzahl / dauer, 3) if dauer else None,
+            "p50_ms": round(perzentil(latenzen, 50) * 1000, 1) if latenzen else None,
+            "p95_ms": round(perzentil(latenzen, 95) * 1000, 1) if latenzen else None,
+            "peak_rss_mb": rss_selbst,
+            "peak_rss_kinder_mb": rss_kinder,
+        })
+    except Exception as e:
+        rueckgabe.put({"szenario": name, "groesse": groesse, "fehler": str(e)})
+    finally:
+        stub.stop()
+        shutil.rmtree(arbeitsordner, ignore_errors=True)
+
+
+def git_version():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=FILES_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def vergleiche(alt_pfad, neu):
+    """Abweichungen zu einem früheren Ergebnis ausgeben"""
+    with open(alt_pfad, encoding="utf-8") as f:
+        alt = {(e["szenario"], e["groesse"]): e for e in json.load(f)["ergebnisse"]}
+
+    print(f"\n📊 Vergleich mit {alt_pfad}")
+    for eintrag in neu:
+        vorher = alt.get((eintrag["szenario"], eintrag["groesse"]))
+        if not vorher or "fehler" in eintrag or "fehler" in vorher:
+            continue
+        teile = []
+        for feld in ("durchsatz_pro_s", "p50_ms", "p95_ms", "peak_rss_mb"):
+            a, b = vorher.get(feld), eintrag.get(feld)
+            if a and b:
+                teile.append(f"{feld} {(b - a) / a:+.1%}")
+        print(f"  {eintrag['szenario']:<10} {eintrag['groesse']:>6}: " + ", ".join(teile))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark gegen den lokalen Amazon-Stub",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--groessen", type=int, nargs="+", default=[50, 1000, 10000],
+                        help="Anzahl Bestellungen pro Lauf (Standard: 50 1000 10000)")
+    parser.add_argument("--szenarien", nargs="+", choices=SZENARIEN, default=list(SZENARIEN),
+                        help="Welche Läufe gemessen werden")
+    parser.add_argument("--latenz-ms", type=float, default=50,
+                        help="Künstliche Antwortzeit des Stubs pro Request (Standard: 50)")
+    parser.add_argument("--drossel-rate", type=float,
+                        help="Max. Requests/s, darüber drosselt der Stub")
+    parser.add_argument("--drossel-art", choices=DROSSEL_ARTEN, default="503",
+                        help="Antwort des Stubs bei Drosselung: 503, captcha oder signin (Standard: 503)")
+    parser.add_argument("--rate", type=float, default=50,
+                        help="download.rate_per_second des Downloaders im Benchmark (Standard: 50)")
+    parser.add_argument("--ausgabe", type=Path,
+                        help="JSON-Datei (Standard: benchmarks/ergebnisse/bench_<zeit>.json)")
+    parser.add_argument("--vergleich", type=Path, help="Früheres Ergebnis zum Vergleich")
+    args = parser.parse_args()
+
+    kontext = multiprocessing.get_context("spawn")
+    ergebnisse = []
+
+    for groesse in args.groessen:
+        for name in args.szenarien:
+            print(f"\n⏱ {name} mit {groesse} Rechnungen...")
+            rueckgabe = kontext.Queue()
+            prozess = kontext.Process(
+                target=szenario,
+                args=(name, groesse, args.latenz_ms, args.drossel_rate, args.rate, rueckgabe,
+                      args.drossel_art)
+            )
+            prozess.start()
+            while True:
+                try:
+                    ergebnis = rueckgabe.get(timeout=1)
+                    break
+                except queue.Empty:
+                    if not prozess.is_alive():
+                        ergebnis = {"szenario": name, "groesse": groesse,
+                                    "fehler": f"Prozess beendet (Exit-Code {prozess.exitcode})"}
+                        break
+            prozess.join()
+            ergebnisse.append(ergebnis)
+
+            if "fehler" in ergebnis:
+                print(f"  ❌ {ergebnis['fehler']}")
+            else:
+                print(
+                    f"  ✓ {ergebnis['rechnungen_fertig']}/{ergebnis['rechnungen_erwartet']} in "
+                    f"{ergebnis['dauer_s']}s, {ergebnis['durchsatz_pro_s']}/s, "
+                    f"p50 {ergebnis['p50_ms']} ms, p95 {ergebnis['p95_ms']} ms, "
+                    f"RSS {ergebnis['peak_rss_mb']} MB (+{ergebnis['peak_rss_kinder_mb']} MB Kinder)"
+                )
+
+    ausgabe = args.ausgabe or (
+        BENCH_DIR / "ergebnisse" / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    ausgabe.parent.mkdir(parents=True, exist_ok=True)
+    with open(ausgabe, "w", encoding="utf-8") as f:
+        json.dump({
+            "zeitpunkt": datetime.now().isoformat(timespec="seconds"),
+            "version": git_version(),
+            "python": platform.python_version(),
+            "plattform": platform.platform(),
+            "ergebnisse": ergebnisse,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\n✓ Ergebnisse gespeichert: {ausgabe}")
+
+    if args.vergleich:
+        vergleiche(args.vergleich, ergebnisse)
+
+
+if __name__ == "__main__":
+    main()
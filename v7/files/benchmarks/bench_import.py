@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Import-Benchmark
+Misst die Startkosten jedes Unterkommandos von main.py mit `python -X importtime`:
+Importzeit gesamt, Wanduhrzeit und die teuersten Pakete - damit z.B. --check
+nicht unbemerkt wieder Selenium oder pdfplumber lädt
+
+Verwendung (im files/ Ordner, src/ muss vorhanden sein):
+    python3 benchmarks/bench_import.py
+    python3 benchmarks/bench_import.py --kommandos check only-process --wiederholungen 10
+    python3 benchmarks/bench_import.py --vergleich benchmarks/ergebnisse/import_alt.json
+"""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+BENCH_DIR = Path(__file__).resolve().parent
+FILES_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from bench import schreibe_configs, git_version
+
+# Unterkommando → Argumente für main.py (None = nur Modul importieren)
+KOMMANDOS = {
+    "hilfe": ["main.py", "--help"],
+    "check": ["main.py", "--check"],
+    "reindex": ["main.py", "--reindex"],
+    "bericht": ["main.py", "--bericht", "--format", "csv", "json"],
+    "dedup": ["main.py", "--dedup"],
+    "only-process": ["main.py", "--only-process"],
+    "downloader": ["-c", "import amazon_invoice_downloader"],
+}
+
+# Pakete, die in Modi ohne Browser bzw. ohne PDFs nicht auftauchen sollten
+SCHWER = ("selenium", "webdriver_manager", "pdfplumber", "pdfminer", "requests")
+
+
+def lies_importtime(stderr):
+    """
+    Ausgabe von -X importtime auswerten
+
+    Returns:
+        (Gesamtzeit in ms, {Paket der obersten Ebene: kumulierte ms})
+    """
+    pakete = {}
+    for zeile in stderr.splitlines():
+        if not zeile.startswith("import time:") or "cumulative" in zeile:
+            continue
+        _, kumuliert, name = zeile[len("import time:"):].split("|")
+        # Oberste Ebene: genau ein Leerzeichen vor dem Namen
+        if name.startswith(" ") and not name.startswith("  "):
+            wurzel = name.strip().split(".")[0]
+            pakete[wurzel] = pakete.get(wurzel, 0) + int(kumuliert) / 1000
+    return sum(pakete.values()), pakete
+
+
+def miss(argumente, config_pfad, wiederholungen):
+    """Ein Unterkommando mehrfach starten, Median von Importzeit und Wanduhr"""
+    importzeiten, wanduhr, pakete = [], [], {}
+    for _ in range(wiederholungen):
+        befehl = [sys.executable, "-X", "importtime", *argumente]
+        if argumente[0] == "main.py" and "--help" not in argumente:
+            befehl += ["--config", str(config_pfad)]
+        start = time.perf_counter()
+        lauf = subprocess.run(befehl, cwd=FILES_DIR, capture_output=True, text=True)
+        wanduhr.append((time.perf_counter() - start) * 1000)
+        gesamt, pakete = lies_importtime(lauf.stderr)
+        importzeiten.append(gesamt)
+        if lauf.returncode != 0:
+            letzte = (lauf.stderr.strip().splitlines() or ["?"])[-1]
+            return {"fehler": f"Exit-Code {lauf.returncode}: {letzte}"}
+
+    return {
+        "import_ms": round(statistics.median(importzeiten), 1),
+        "wanduhr_ms": round(statistics.median(wanduhr), 1),
+        "module_top": {
+            name: round(ms, 1)
+            for name, ms in sorted(pakete.items(), key=lambda p: -p[1])[:8]
+        },
+        "schwer": sorted(name for name in pakete if name in SCHWER),
+    }
+
+
+def vergleiche(alt_pfad, neu):
+    """Abweichungen zu einem früheren Ergebnis ausgeben"""
+    with open(alt_pfad, encoding="utf-8") as f:
+        alt = {e["kommando"]: e for e in json.load(f)["ergebnisse"]}
+
+    print(f"\n📊 Vergleich mit {alt_pfad}")
+    for eintrag in neu:
+        vorher = alt.get(eintrag["kommando"])
+        if not vorher or "fehler" in eintrag or "fehler" in vorher:
+            continue
+        teile = []
+        for feld in ("import_ms", "wanduhr_ms"):
+            a, b = vorher.get(feld), eintrag.get(feld)
+            if a and b:
+                teile.append(f"{feld} {(b - a) / a:+.1%}")
+        print(f"  {eintrag['kommando']:<14}: " + ", ".join(teile))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Startkosten (Imports) der Unterkommandos von main.py",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--kommandos", nargs="+", choices=KOMMANDOS, default=list(KOMMANDOS),
+                        help="Welche Unterkommandos gemessen werden")
+    parser.add_argument("--wiederholungen", type=int, default=5,
+                        help="Starts pro Unterkommando, gemeldet wird der Median (Standard: 5)")
+    parser.add_argument("--ausgabe", type=Path,
+                        help="JSON-Datei (Standard: benchmarks/ergebnisse/import_<zeit>.json)")
+    parser.add_argument("--vergleich", type=Path, help="Früheres Ergebnis zum Vergleich")
+    args = parser.parse_args()
+
+    # Leere Ordner: gemessen wird der Start, nicht die Arbeit
+    arbeitsordner = Path(tempfile.mkdtemp(prefix="bench-import-"))
+    ergebnisse = []
+    try:
+        _, config_pfad = schreibe_configs(arbeitsordner, "http://127.0.0.1:9", rate=1)
+        basis, _ = lies_importtime(subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True
+        ).stderr)
+        print(f"⏱ Interpreter ohne eigene Imports: {basis:.1f} ms")
+
+        for name in args.kommandos:
+            ergebnis = {"kommando": name, **miss(KOMMANDOS[name], config_pfad, args.wiederholungen)}
+            ergebnisse.append(ergebnis)
+
+            if "fehler" in ergebnis:
+                print(f"  ❌ {name:<14} {ergebnis['fehler']}")
+                continue
+            teuerste = ", ".join(f"{n} {ms:.0f}" for n, ms in list(ergebnis["module_top"].items())[:4])
+            warnung = f"  ⚠ lädt {', '.join(ergebnis['schwer'])}" if ergebnis["schwer"] else ""
+            print(f"  ✓ {name:<14} Imports {ergebnis['import_ms']:>7.1f} ms, "
+                  f"Start {ergebnis['wanduhr_ms']:>7.1f} ms  ({teuerste}){warnung}")
+    finally:
+        shutil.rmtree(arbeitsordner, ignore_errors=True)
+
+    ausgabe = args.ausgabe or (
+        BENCH_DIR / "ergebnisse" / f"import_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    ausgabe.parent.mkdir(parents=True, exist_ok=True)
+    with open(ausgabe, "w", encoding="utf-8") as f:
+        json.dump({
+            "zeitpunkt": datetime.now().isoformat(timespec="seconds"),
+            "version": git_version(),
+            "python": platform.python_version(),
+            "plattform": platform.platform(),
+            "basis_ms": round(basis, 1),
+            "ergebnisse": ergebnisse,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\n✓ Ergebnisse gespeichert: {ausgabe}")
+
+    if args.vergleich:
+        vergleiche(args.vergleich, ergebnisse)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Verhaltensprüfung
+Prüft gegen die lokalen Stubs, was die Benchmarks nur messen: die AIMD-Regelung
+des Downloaders (Erhöhung, Halbierung, Abklingzeit, Reaktion auf 503, Captcha
+und Login-Umleitung, erkannt vom echten Download-Pfad des Downloaders) und den
+Telegram-Versand (Stapel, 429, Leeren der Queue beim Beenden). Endet mit
+Exit-Code 1, sobald eine Prüfung fehlschlägt.
+
+Der HTTP-Download (fetch_invoice) braucht `requests`; ohne wird er übersprungen.
+
+Verwendung (im files/ Ordner, ohne Browser und ohne Amazon-Konto):
+    python3 benchmarks/pruefen.py
+    python3 benchmarks/pruefen.py --nur aimd
+"""
+
+import io
+import sys
+import time
+import tempfile
+import argparse
+import contextlib
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+FILES_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(FILES_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from stub_server import AmazonStub, TelegramStub, DROSSEL_ARTEN
+from download_pool import AdaptiverTokenBucket, zusammenfassung
+from telegram_versand import TelegramVersand
+from amazon_invoice_downloader import AmazonInvoiceDownloader, drosselsignal
+from bench import schreibe_configs
+
+
+class PruefFehler(AssertionError):
+    pass
+
+
+class Uebersprungen(Exception):
+    """Prüfung braucht etwas, das hier fehlt (z.B. requests)"""
+
+
+def erwarte(bedingung, text):
+    if not bedingung:
+        raise PruefFehler(text)
+
+
+def pruefe_aimd_regel():
+    """Additive Erhöhung, multiplikative Senkung, Grenzen und Abklingzeit"""
+    bucket = AdaptiverTokenBucket(1.0, rate_min=0.5, rate_max=2.0, schritt=0.1, ausgabe=None)
+    for _ in range(5):
+        bucket.erfolg(0.05)
+    erwarte(abs(bucket.rate - 1.5) < 1e-9, f"5 Erfolge: Rate 1.5 erwartet, ist {bucket.rate:.2f}")
+
+    for _ in range(20):
+        bucket.erfolg(0.05)
+    erwarte(bucket.rate == 2.0, f"rate_max 2.0 überschritten: {bucket.rate:.2f}")
+
+    bucket.gedrosselt("HTTP 503")
+    erwarte(bucket.rate == 1.0, f"Drosselung: Rate 1.0 erwartet, ist {bucket.rate:.2f}")
+    erwarte(bucket.tokens == 0.0, "Angesparte Tokens nach der Drosselung nicht verfallen")
+
+    # Parallele Signale derselben Drosselung zählen nur einmal
+    bucket.gedrosselt("HTTP 503")
+    erwarte(bucket.rate == 1.0, f"Zweites Signal in der Abklingzeit senkt erneut: {bucket.rate:.2f}")
+    erwarte(bucket.statistik["drosselsignale"] == 2, "Drosselsignale werden nicht gezählt")
+
+    for _ in range(3):
+        bucket._letzte_senkung = 0.0
+        bucket.gedrosselt("Captcha")
+    erwarte(bucket.rate == 0.5, f"rate_min 0.5 unterschritten: {bucket.rate:.2f}")
+
+    # Zu langsame Antworten erhöhen nicht weiter
+    langsam = AdaptiverTokenBucket(1.0, schritt=0.1, ziel_latenz=1.0, ausgabe=None)
+    for _ in range(5):
+        langsam.erfolg(3.0)
+    erwarte(langsam.rate < 1.0, f"Antwortzeit über Ziel: Rate sinkt nicht ({langsam.rate:.2f})")
+    return f"1.0 → 1.5 → 2.0 (max) → 1.0 → 0.5 (min), langsam {langsam.rate:.2f}"
+
+
+def _abrufen(url):
+    """(Status, End-URL, Text) eines GET, Umleitungen werden verfolgt"""
+    try:
+        with urllib.request.urlopen(url, timeout=10) as antwort:
+            return antwort.status, antwort.geturl(), antwort.read().decode("utf-8", "replace")
+    except urllib.error.HTTPError as e:
+        return e.code, url, ""
+
+
+def pruefe_aimd_stub(drossel_art, anfragen=40, drossel_rate=5):
+    """Rate pendelt sich unter der Drosselgrenze des Stubs ein (Signale per drosselsignal)"""
+    stub = AmazonStub(50, drossel_rate=drossel_rate, drossel_art=drossel_art)
+    basis = stub.start()
+    bucket = AdaptiverTokenBucket(2.0, rate_min=0.5, rate_max=4 * drossel_rate, schritt=0.5, ausgabe=None)
+    signale = 0
+    try:
+        for _ in range(anfragen):
+            bucket.acquire()
+            start = time.perf_counter()
+            status, end_url, text = _abrufen(f"{basis}/gp/your-account/order-history?startIndex=0")
+            if status in (429, 503) or drosselsignal(end_url, text):
+                signale += 1
+                bucket.gedrosselt(drossel_art)
+            else:
+                bucket.erfolg(time.perf_counter() - start)
+    finally:
+        stub.stop()
+
+    erwarte(bucket.statistik["erhoeht"] > 0, "Rate wurde nie erhöht")
+    erwarte(signale > 0, f"Stub hat nie gedrosselt ({drossel_art})")
+    erwarte(bucket.statistik["gesenkt"] > 0, f"{drossel_art}: Drosselung senkt die Rate nicht")
+    erwarte(signale < anfragen / 2, f"{drossel_art}: {signale}/{anfragen} Anfragen gedrosselt")
+    return (f"{signale}/{anfragen} gedrosselt, {bucket.statistik['erhoeht']}× erhöht, "
+            f"{bucket.statistik['gesenkt']}× gesenkt, Rate {bucket.rate:.2f} Req/s")
+
+
+def pruefe_download_stub(drossel_art, anzahl=20, drossel_rate=5):
+    """
+    Echter HTTP-Download (download_pending → DownloadPool → fetch_invoice) gegen den Stub
+
+    503 und Captcha werden erkannt, senken die Rate und werden wiederholt, bis
+    alle Rechnungen da sind; eine Login-Umleitung senkt die Rate und meldet
+    die Bestellung als Fehler.
+    """
+    try:
+        import requests
+    except ImportError:
+        raise Uebersprungen("requests nicht installiert")
+
+    stub = AmazonStub(anzahl, drossel_rate=drossel_rate, drossel_art=drossel_art, ohne_rechnung_jede=0)
+    basis = stub.start()
+    with tempfile.TemporaryDirectory() as ordner:
+        amazon_pfad, _ = schreibe_configs(Path(ordner), basis, rate=4 * drossel_rate)
+        downloader = AmazonInvoiceDownloader(str(amazon_pfad))
+        downloader.config['download'].update({'backoff_seconds': 0.2, 'max_retries': 8})
+        # Ohne Browser: die Stub-Seiten brauchen keine Cookies
+        downloader.session = requests.Session()
+        downloader.limiter = AdaptiverTokenBucket(2.0, rate_min=0.5, rate_max=4 * drossel_rate,
+                                                  schritt=0.5, ausgabe=None)
+        orders = [
+            {'id': b['id'], 'date': None,
+             'invoice_url': f"{basis}/gp/shared-cs/ajax/invoice/invoice.html?orderId={b['id']}"}
+            for b in stub.bestellungen
+        ]
+        downloader.index.add_orders(orders, account='default')
+        try:
+            # Fortschritt pro Rechnung und abgebrochene Verbindungen im Stub nicht ausgeben
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                ergebnisse = downloader.download_pending(neue=orders)
+        finally:
+            downloader.close()
+            stub.stop()
+
+    zaehler = zusammenfassung(ergebnisse)
+    statistik = downloader.limiter.statistik
+    erwarte(stub.gedrosselt > 0, f"Stub hat nie gedrosselt ({drossel_art})")
+    erwarte(statistik["drosselsignale"] > 0, f"{drossel_art}: Downloader erkennt die Drosselung nicht")
+    erwarte(statistik["gesenkt"] > 0, f"{drossel_art}: Drosselung senkt die Rate nicht")
+    if drossel_art == "signin":
+        erwarte(zaehler["fehler"] > 0, "Login-Umleitung wird als Download gezählt")
+    else:
+        erwarte(zaehler["ok"] == anzahl, f"{drossel_art}: nur {zaehler['ok']}/{anzahl} Rechnungen geladen")
+    return (f"{zaehler['ok']}/{anzahl} geladen, {statistik['drosselsignale']} Drosselsignale, "
+            f"{statistik['gesenkt']}× gesenkt")
+
+
+def pruefe_telegram_beenden():
+    """close() verschickt die Queue sofort, als ein Stapel über eine Verbindung"""
+    stub = TelegramStub(latenz_ms=50)
+    basis = stub.start()
+    try:
+        versand = TelegramVersand("TOKEN", "42", base_url=basis, sammeln_sekunden=30)
+        texte = [f"Rechnung {i}" for i in range(5)]
+        for text in texte:
+            versand.sende(text)
+        start = time.perf_counter()
+        versand.close()
+        dauer = time.perf_counter() - start
+    finally:
+        stub.stop()
+
+    erwarte(dauer < 5, f"close() wartet die Sammelzeit ab ({dauer:.1f}s)")
+    erwarte(len(stub.nachrichten) == 1, f"1 Stapel erwartet, {len(stub.nachrichten)} verschickt")
+    erwarte(stub.nachrichten[0] == ("42", "\n".join(texte)), "Stapel unvollständig oder falsch sortiert")
+    return f"5 Nachrichten in 1 Stapel, close() nach {dauer:.2f}s"
+
+
+def pruefe_telegram_drosselung():
+    """HTTP 429 wird nach retry_after wiederholt, die Verbindung bleibt dieselbe"""
+    stub = TelegramStub(drossel_jede=2)
+    basis = stub.start()
+    try:
+        versand = TelegramVersand("TOKEN", "42", base_url=basis, sammeln_sekunden=0)
+        for i in range(3):
+            versand.sende(f"Fehler {i}")
+            # Jede Nachricht als eigener Stapel
+            time.sleep(0.2)
+        versand.close()
+    finally:
+        stub.stop()
+
+    zeilen = [zeile for _, text in stub.nachrichten for zeile in text.split("\n")]
+    erwarte(sorted(zeilen) == ["Fehler 0", "Fehler 1", "Fehler 2"], f"Nach 429 fehlen Nachrichten: {zeilen}")
+    erwarte(versand.statistik["fehler"] == 0, f"{versand.statistik['fehler']} Stapel verloren")
+    erwarte(len(stub.verbindungen) == 1, f"{len(stub.verbindungen)} Verbindungen statt 1")
+    return f"{stub.anfragen} Requests für {len(stub.nachrichten)} Stapel, 1 Verbindung"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verhalten von AIMD-Drossel und Telegram-Versand gegen Stubs prüfen")
+    parser.add_argument("--nur", choices=("aimd", "telegram"), help="Nur eine Gruppe prüfen")
+    args = parser.parse_args()
+
+    pruefungen = []
+    if args.nur in (None, "aimd"):
+        pruefungen.append(("AIMD-Regel", pruefe_aimd_regel))
+        for art in DROSSEL_ARTEN:
+            pruefungen.append((f"AIMD gegen Stub ({art})", lambda art=art: pruefe_aimd_stub(art)))
+            pruefungen.append((f"Download gegen Stub ({art})", lambda art=art: pruefe_download_stub(art)))
+    if args.nur in (None, "telegram"):
+        pruefungen.append(("Telegram: Queue beim Beenden", pruefe_telegram_beenden))
+        pruefungen.append(("Telegram: HTTP 429", pruefe_telegram_drosselung))
+
+    fehlgeschlagen = uebersprungen = 0
+    for name, pruefung in pruefungen:
+        try:
+            print(f"✓ {name}: {pruefung()}")
+        except Uebersprungen as e:
+            uebersprungen += 1
+            print(f"⏭ {name}: übersprungen ({e})")
+        except PruefFehler as e:
+            fehlgeschlagen += 1
+            print(f"❌ {name}: {e}")
+
+    bestanden = len(pruefungen) - fehlgeschlagen - uebersprungen
+    print(f"\n{bestanden}/{len(pruefungen)} Prüfungen bestanden"
+          + (f", {uebersprungen} übersprungen" if uebersprungen else ""))
+    return 1 if fehlgeschlagen else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
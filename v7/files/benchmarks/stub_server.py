@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Amazon-Stub
+Lokaler HTTP-Server als Ersatz für die Amazon-Bestellübersicht:
+Bestellseiten mit Paginierung, Rechnungs-Popover und synthetische PDFs,
+mit einstellbarer Latenz und Drosselung (HTTP 503, Captcha-Seite oder
+Umleitung zum Login), dazu ein Telegram-Stub
+für den Benachrichtigungsversand
+"""
+
+import json
+import time
+import threading
+from datetime import date, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+MONATE = [
+    "Januar", "Februar", "März", "April", "Mai", "Juni", "Juli",
+    "August", "September", "Oktober", "November", "Dezember"
+]
+
+# Aufbau wie die aufgezeichnete Amazon-Bestellübersicht (nur die Teile, die der Scraper liest)
+SEITE = """<!DOCTYPE html>
+<html lang="de"><head><meta charset="utf-8"><title>Meine Bestellungen</title></head>
+<body>
+<div id="ordersContainer">
+{karten}
+</div>
+<ul class="a-pagination">
+  <li class="{weiter_klasse}"><a href="{weiter_url}">Weiter</a></li>
+</ul>
+</body></html>
+"""
+
+KARTE = """<div class="order-card">
+  <div class="order-header">
+    <div><span>Bestellung aufgegeben</span><br><span>{datum}</span></div>
+    <div><span>Summe</span><br><span>{betrag} €</span></div>
+    <div class="yohtmlc-order-id"><span>Bestellnr.</span> <span dir="ltr">{order_id}</span></div>
+  </div>
+  <div class="order-body">{link}</div>
+</div>"""
+
+RECHNUNGS_LINK = '<a href="/gp/shared-cs/ajax/invoice/invoice.html?orderId={order_id}">Rechnung</a>'
+
+POPOVER = """<html><body><ul class="invoice-list">
+<li><a href="/documents/download/{order_id}/invoice.pdf">Rechnung 1</a></li>
+</ul></body></html>"""
+
+
+# Amazons "Robot Check" (Aufbau wie die echte Seite, soweit der Downloader sie erkennt)
+CAPTCHA = """<!DOCTYPE html>
+<html lang="de"><head><meta charset="utf-8"><title>Robot Check</title></head>
+<body><form method="get" action="/errors/validateCaptcha">
+<p>Geben Sie die angezeigten Zeichen ein</p>
+<input type="text" id="captchacharacters" name="field-keywords">
+</form></body></html>
+"""
+
+ANMELDUNG = """<!DOCTYPE html>
+<html lang="de"><head><meta charset="utf-8"><title>Amazon Anmelden</title></head>
+<body><form name="signIn" method="post" action="/ap/signin"></form></body></html>
+"""
+
+# Antworten bei Überschreiten der Drosselrate
+DROSSEL_ARTEN = ("503", "captcha", "signin")
+
+
+def formatiere_betrag(betrag):
+    """12345.6 → '12.345,60'"""
+    return f"{betrag:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def synthetische_pdf(order_id, betrag):
+    """Minimale, gültige einseitige PDF mit Textlayer im Stil einer Amazon-Rechnung"""
+    zeilen = [
+        "Amazon EU S.a r.l.",
+        f"Rechnung zur Bestellung {order_id}",
+        f"Gesamtbetrag EUR {formatiere_betrag(betrag)}",
+        f"Zahlbetrag EUR {formatiere_betrag(betrag)}",
+    ]
+    text = "BT /F1 11 Tf 50 800 Td 14 TL " + " ".join(f"({z}) Tj T*" for z in zeilen) + " ET"
+    inhalt = text.encode("latin-1")
+
+    objekte = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(inhalt) + inhalt + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for nummer, objekt in enumerate(objekte, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % nummer + objekt + b"\nendobj\n"
+
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objekte) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objekte) + 1, xref)
+    return bytes(pdf)
+
+
+class AmazonStub:
+    """Simulierte Bestellhistorie mit `anzahl` Bestellungen (neueste zuerst)"""
+
+    def __init__(self, anzahl, jahr=2024, seitengroesse=10, latenz_ms=0,
+                 drossel_rate=None, ohne_rechnung_jede=7, port=0, drossel_art="503"):
+        """
+        Args:
+            anzahl: Anzahl Bestellungen in der Historie
+            jahr: Bestelljahr aller Bestellungen
+            seitengroesse: Bestellungen pro Seite (Amazon: 10)
+            latenz_ms: Künstliche Antwortzeit pro Request
+            drossel_rate: Max. Requests/s, darüber wird gedrosselt (None = keine Drosselung)
+            ohne_rechnung_jede: Jede n-te Bestellung hat keinen Rechnungslink (0 = alle haben einen)
+            port: TCP-Port (0 = freier Port)
+            drossel_art: Antwort bei Drosselung: "503" (mit Retry-After),
+                         "captcha" (Robot Check mit HTTP 200) oder "signin"
+                         (Umleitung auf /ap/signin)
+        """
+        if drossel_art not in DROSSEL_ARTEN:
+            raise ValueError(f"drossel_art muss eine von {DROSSEL_ARTEN} sein")
+        self.jahr = jahr
+        self.seitengroesse = seitengroesse
+        self.latenz = latenz_ms / 1000
+        self.drossel_rate = drossel_rate
+        self.drossel_art = drossel_art
+        self.port = port
+
+        start = date(jahr, 12, 31)
+        self.bestellungen = []
+        for i in range(anzahl):
+            tag = start - timedelta(days=(i * 365) // max(anzahl, 1))
+            self.bestellungen.append({
+                "id": f"302-{i:07d}-{jahr}{i % 1000:03d}",
+                "datum": f"{tag.day}. {MONATE[tag.month - 1]} {tag.year}",
+                "betrag": round(1 + (i * 3779) % 50000 / 100, 2),
+                "rechnung": not (ohne_rechnung_jede and i % ohne_rechnung_jede == ohne_rechnung_jede - 1),
+            })
+        self.nach_id = {b["id"]: b for b in self.bestellungen}
+
+        # Messwerte
+        self.lock = threading.Lock()
+        self.anfragen = 0
+        self.gedrosselt = 0
+        self.ausgeliefert = {}   # Bestellnummer → time.perf_counter() bei PDF-Auslieferung
+        self._fenster = []
+
+        self.server = None
+        self.thread = None
+
+    @property
+    def rechnungen(self):
+        """Anzahl Bestellungen mit Rechnung"""
+        return sum(1 for b in self.bestellungen if b["rechnung"])
+
+    def _drosseln(self):
+        """True falls die Anfrage die erlaubte Rate überschreitet"""
+        if not self.drossel_rate:
+            return False
+        jetzt = time.monotonic()
+        with self.lock:
+            self._fenster = [t for t in self._fenster if jetzt - t < 1.0]
+            if len(self._fenster) >= self.drossel_rate:
+                self.gedrosselt += 1
+                return True
+            self._fenster.append(jetzt)
+        return False
+
+    def seite(self, start_index):
+        """HTML einer Bestellseite ab `start_index`"""
+        bestellungen = self.bestellungen[start_index:start_index + self.seitengroesse]
+        karten = "\n".join(
+            KARTE.format(
+                datum=b["datum"],
+                betrag=formatiere_betrag(b["betrag"]),
+                order_id=b["id"],
+                link=RECHNUNGS_LINK.format(order_id=b["id"]) if b["rechnung"] else ""
+            )
+            for b in bestellungen
+        )
+        naechste = start_index + self.seitengroesse
+        hat_weitere = naechste < len(self.bestellungen)
+        return SEITE.format(
+            karten=karten,
+            weiter_klasse="a-last" if hat_weitere else "a-last a-disabled",
+            weiter_url=(
+                f"/gp/your-account/order-history?orderFilter=year-{self.jahr}&startIndex={naechste}"
+                if hat_weitere else "#"
+            )
+        )
+
+    def start(self):
+        """Server im Hintergrund starten, liefert die Basis-URL"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _antwort(self, status, inhalt, content_type, header=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(inhalt)))
+                for name, wert in (header or {}).items():
+                    self.send_header(name, wert)
+                self.end_headers()
+                self.wfile.write(inhalt)
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.anfragen += 1
+                if stub.latenz:
+                    time.sleep(stub.latenz)
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+
+                if url.path == "/ap/signin":
+                    self._antwort(200, ANMELDUNG.encode("utf-8"), "text/html; charset=utf-8")
+                    return
+                if stub._drosseln():
+                    if stub.drossel_art == "captcha":
+                        self._antwort(200, CAPTCHA.encode("utf-8"), "text/html; charset=utf-8")
+                    elif stub.drossel_art == "signin":
+                        ziel = f"/ap/signin?openid.return_to={self.path}"
+                        self._antwort(302, b"", "text/plain", {"Location": ziel})
+                    else:
+                        self._antwort(503, b"Service Unavailable", "text/plain", {"Retry-After": "1"})
+                    return
+
+                if url.path == "/gp/your-account/order-history":
+                    start_index = int(query.get("startIndex", ["0"])[0])
+                    html = stub.seite(start_index).encode("utf-8")
+                    self._antwort(200, html, "text/html; charset=utf-8")
+                elif url.path == "/gp/shared-cs/ajax/invoice/invoice.html":
+                    order_id = query.get("orderId", [""])[0]
+                    html = POPOVER.format(order_id=order_id).encode("utf-8")
+                    self._antwort(200, html, "text/html; charset=utf-8")
+                elif url.path.startswith("/documents/download/"):
+                    order_id = url.path.split("/")[3]
+                    bestellung = stub.nach_id.get(order_id)
+                    if not bestellung:
+                        self._antwort(404, b"Not Found", "text/plain")
+                        return
+                    pdf = synthetische_pdf(order_id, bestellung["betrag"])
+                    self._antwort(200, pdf, "application/pdf")
+                    with stub.lock:
+                        stub.ausgeliefert[order_id] = time.perf_counter()
+                else:
+                    self._antwort(404, b"Not Found", "text/plain")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class TelegramStub:
+    """Bot-API-Ersatz: nimmt sendMessage an und merkt sich Nachrichten und Verbindungen"""
+
+    def __init__(self, latenz_ms=0, drossel_jede=0, port=0):
+        """
+        Args:
+            latenz_ms: Künstliche Antwortzeit pro Request
+            drossel_jede: Jeder n-te Request bekommt HTTP 429 mit retry_after=1 (0 = nie)
+            port: TCP-Port (0 = freier Port)
+        """
+        self.latenz = latenz_ms / 1000
+        self.drossel_jede = drossel_jede
+        self.port = port
+        self.lock = threading.Lock()
+        self.nachrichten = []   # (chat_id, text)
+        self.anfragen = 0
+        self.verbindungen = set()
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """Server im Hintergrund starten, liefert die Basis-URL"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _antwort(self, status, daten):
+                inhalt = json.dumps(daten).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(inhalt)))
+                self.end_headers()
+                self.wfile.write(inhalt)
+
+            def do_POST(self):
+                laenge = int(self.headers.get("Content-Length", 0))
+                formular = parse_qs(self.rfile.read(laenge).decode("utf-8"))
+                with stub.lock:
+                    stub.anfragen += 1
+                    stub.verbindungen.add(self.client_address)
+                    nummer = stub.anfragen
+                if stub.latenz:
+                    time.sleep(stub.latenz)
+                if not urlparse(self.path).path.endswith("/sendMessage"):
+                    self._antwort(404, {"ok": False, "description": "Not Found"})
+                    return
+                if stub.drossel_jede and nummer % stub.drossel_jede == 0:
+                    self._antwort(429, {"ok": False, "parameters": {"retry_after": 1}})
+                    return
+                with stub.lock:
+                    stub.nachrichten.append((formular["chat_id"][0], formular["text"][0]))
+                self._antwort(200, {"ok": True, "result": {"message_id": nummer}})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Amazon-Stub für Benchmarks und Tests")
+    parser.add_argument("--anzahl", type=int, default=50, help="Anzahl Bestellungen")
+    parser.add_argument("--latenz-ms", type=float, default=0, help="Antwortzeit pro Request")
+    parser.add_argument("--drossel-rate", type=float, help="Max. Requests/s vor der Drosselung")
+    parser.add_argument("--drossel-art", choices=DROSSEL_ARTEN, default="503",
+                        help="Antwort bei Drosselung (Standard: 503)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    stub = AmazonStub(args.anzahl, latenz_ms=args.latenz_ms, drossel_rate=args.drossel_rate,
+                      port=args.port, drossel_art=args.drossel_art)
+    print(f"✓ Amazon-Stub läuft auf {stub.start()} ({stub.rechnungen} Rechnungen)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub.stop()
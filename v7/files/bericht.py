@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Steuerbericht
+Wochen- und Jahressummen aus den laufenden Summen des Steuer-Manifests
+als CSV (Excel, deutsches Format) oder JSON für den Steuerberater
+"""
+
+import csv
+import json
+from pathlib import Path
+from datetime import date, datetime
+
+
+def kw_zeitraum(jahr: int, kw: int):
+    """Montag und Sonntag einer ISO-Kalenderwoche"""
+    try:
+        return date.fromisocalendar(jahr, kw, 1), date.fromisocalendar(jahr, kw, 7)
+    except ValueError:
+        return None, None
+
+
+def erstelle_bericht(manifest, jahr: int):
+    """Bericht eines Steuerjahres (liest nur die Wochensummen, nicht die Dateien)"""
+    wochen = []
+    for woche in manifest.summen_pro_kw(jahr):
+        von, bis = kw_zeitraum(jahr, woche["kw"])
+        wochen.append({
+            **woche,
+            "von": von.isoformat() if von else None,
+            "bis": bis.isoformat() if bis else None,
+        })
+
+    return {
+        "jahr": jahr,
+        "erstellt": datetime.now().isoformat(timespec="seconds"),
+        "anzahl": sum(w["anzahl"] for w in wochen),
+        "ohne_betrag": sum(w["ohne_betrag"] for w in wochen),
+        "summe": round(sum(w["summe"] for w in wochen), 2),
+        "wochen": wochen,
+    }
+
+
+def _euro(betrag: float) -> str:
+    """1234.5 → '1234,50' (Dezimalkomma für deutsches Excel)"""
+    return f"{betrag:.2f}".replace(".", ",")
+
+
+def schreibe_csv(bericht, pfad):
+    """CSV mit Semikolon und Dezimalkomma, letzte Zeile = Jahressumme"""
+    with open(pfad, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["Jahr", "KW", "Von", "Bis", "Rechnungen", "Ohne Betrag", "Summe EUR"])
+        for woche in bericht["wochen"]:
+            writer.writerow([
+                bericht["jahr"], f"KW{woche['kw']:02d}", woche["von"] or "", woche["bis"] or "",
+                woche["anzahl"], woche["ohne_betrag"], _euro(woche["summe"])
+            ])
+        writer.writerow([
+            bericht["jahr"], "Gesamt", "", "",
+            bericht["anzahl"], bericht["ohne_betrag"], _euro(bericht["summe"])
+        ])
+
+
+def schreibe_json(bericht, pfad):
+    Path(pfad).write_text(json.dumps(bericht, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def exportiere(manifest, jahre, ausgabe_dir, formate=("csv",)):
+    """
+    Berichte für `jahre` schreiben (Steuerbericht_YYYY.csv/.json)
+
+    Returns:
+        Liste (bericht, [pfade])
+    """
+    ausgabe_dir = Path(ausgabe_dir).expanduser()
+    ausgabe_dir.mkdir(parents=True, exist_ok=True)
+
+    ergebnis = []
+    for jahr in jahre:
+        bericht = erstelle_bericht(manifest, jahr)
+        pfade = []
+        for fmt in formate:
+            pfad = ausgabe_dir / f"Steuerbericht_{jahr}.{fmt}"
+            (schreibe_csv if fmt == "csv" else schreibe_json)(bericht, pfad)
+            pfade.append(pfad)
+        ergebnis.append((bericht, pfade))
+    return ergebnis
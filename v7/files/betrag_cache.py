@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Betrags-Cache
+Speichert extrahierte Beträge pro PDF-Inhalt (SHA-256 + Extraktor-Version),
+damit unveränderte oder doppelte PDFs nicht erneut geparst werden
+"""
+
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+CACHE_FILENAME = ".betrag_cache.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    schluessel TEXT PRIMARY KEY,
+    betrag     REAL,
+    methode    TEXT,
+    zuletzt    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_zuletzt ON cache(zuletzt);
+"""
+
+
+class BetragCache:
+    """LRU-begrenzter Cache: (SHA-256, Version) → (Betrag, Methode)"""
+
+    def __init__(self, pfad, version: str, max_eintraege: int = 50000):
+        self.pfad = Path(pfad)
+        self.pfad.parent.mkdir(parents=True, exist_ok=True)
+        self.version = version
+        self.max_eintraege = max_eintraege
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.pfad), timeout=30, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        # Laufende Zählung, damit speichere() nicht jedes Mal COUNT(*) braucht
+        self.anzahl = self._zaehle()
+
+    def _zaehle(self):
+        return self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _schluessel(self, sha256):
+        return f"{sha256}:{self.version}"
+
+    def hole(self, sha256):
+        """
+        Liefere (betrag, methode) oder None falls nicht im Cache
+
+        Ein Treffer mit betrag=None heißt: PDF bekannt, kein Betrag gefunden.
+        """
+        schluessel = self._schluessel(sha256)
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT betrag, methode FROM cache WHERE schluessel = ?", (schluessel,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE cache SET zuletzt = ? WHERE schluessel = ?", (time.time(), schluessel)
+            )
+        return row[0], row[1]
+
+    def speichere(self, sha256, betrag, methode=None):
+        """Ergebnis speichern und bei Bedarf die ältesten Einträge verdrängen"""
+        schluessel = self._schluessel(sha256)
+        jetzt = time.time()
+        with self.lock, self.conn:
+            neu = self.conn.execute(
+                "INSERT OR IGNORE INTO cache (schluessel, betrag, methode, zuletzt) VALUES (?, ?, ?, ?)",
+                (schluessel, betrag, methode, jetzt)
+            ).rowcount
+            if not neu:
+                self.conn.execute(
+                    "UPDATE cache SET betrag = ?, methode = ?, zuletzt = ? WHERE schluessel = ?",
+                    (betrag, methode, jetzt, schluessel)
+                )
+                return
+            self.anzahl += 1
+            if self.anzahl <= self.max_eintraege:
+                return
+            # Nur beim Verdrängen genau zählen (andere Prozesse teilen sich die Datei)
+            anzahl = self._zaehle()
+            if anzahl > self.max_eintraege:
+                self.conn.execute(
+                    """
+                    DELETE FROM cache WHERE schluessel IN (
+                        SELECT schluessel FROM cache ORDER BY zuletzt ASC LIMIT ?
+                    )
+                    """,
+                    (anzahl - self.max_eintraege,)
+                )
+            self.anzahl = min(anzahl, self.max_eintraege)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Stufen-Extraktor
+Schneller Textlayer-Pfad für bekannte Amazon-Rechnungsvorlagen vor der
+vollständigen pdfplumber-Layoutanalyse im PDFProcessor
+"""
+
+import re
+import time
+from collections import Counter
+
+# Betrag im deutschen Format: 1.234,56 / 1 234,56 / 12,34
+_BETRAG = r"(-?\d{1,3}(?:[.\s]\d{3})*,\d{2})"
+
+# Bekannte Vorlagen, in Prioritätsreihenfolge (Zahlbetrag ist der tatsächlich gezahlte Betrag)
+VORLAGEN = [
+    (name, re.compile(rf"{schluesselwort}[^\d\n]{{0,40}}?(?:EUR|€)?\s*{_BETRAG}", re.IGNORECASE))
+    for name, schluesselwort in (
+        ("zahlbetrag", r"Zahlbetrag"),
+        ("gesamtbetrag", r"Gesamtbetrag"),
+        ("rechnungsbetrag", r"Rechnungsbetrag"),
+        ("gesamtpreis", r"Gesamtpreis"),
+    )
+]
+
+
+def parse_betrag(text: str) -> float:
+    """Wandle '1.234,56' in 1234.56 um"""
+    return float(re.sub(r"[.\s]", "", text).replace(",", "."))
+
+
+def lies_textlayer(pdf_path) -> str:
+    """Lies nur den Text der letzten Seite (ohne Tabellen-/Layoutanalyse)"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        PdfReader = None
+
+    if PdfReader is not None:
+        reader = PdfReader(str(pdf_path))
+        return reader.pages[-1].extract_text() or ""
+
+    import pdfplumber
+
+    with pdfplumber.open(str(pdf_path)) as pdf:
+        return pdf.pages[-1].extract_text() or ""
+
+
+def suche_in_text(text: str):
+    """Liefere (betrag, vorlage) der ersten passenden Vorlage oder (None, None)"""
+    for name, muster in VORLAGEN:
+        treffer = muster.findall(text)
+        if treffer:
+            # Summen stehen am Ende der Rechnung
+            return parse_betrag(treffer[-1]), name
+    return None, None
+
+
+class StufenExtraktor:
+    """
+    Stufe 1: Regex auf dem Textlayer der letzten Seite
+    Stufe 2: PDFProcessor (Tabellen, Position, Keywords) nur falls Stufe 1 nichts findet
+
+    Bietet dieselbe Schnittstelle wie PDFProcessor.extrahiere_betrag und meldet
+    die Fundstelle in `letzte_methode` ("text:<vorlage>" oder die des PDFProcessor)
+    sowie die Dauer der einzelnen Schritte der letzten PDF in `letzte_zeiten`.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+        self.letzte_methode = None
+        self.letzte_zeiten = {}
+        self.treffer = Counter()
+
+    def extrahiere_betrag(self, pdf_path):
+        self.letzte_zeiten = zeiten = {}
+        start = time.perf_counter()
+        try:
+            text = lies_textlayer(pdf_path)
+            zeiten["pdf_textlayer"] = time.perf_counter() - start
+            start = time.perf_counter()
+            betrag, vorlage = suche_in_text(text)
+            zeiten["methode_text"] = time.perf_counter() - start
+        except Exception:
+            # Defekter Textlayer: Layoutanalyse entscheidet
+            # (ExtraktionsTimeout ist keine Exception und bricht weiterhin ab)
+            betrag, vorlage = None, None
+
+        if betrag is not None and betrag > 0:
+            self.letzte_methode = f"text:{vorlage}"
+            self.treffer["text"] += 1
+            return betrag
+
+        start = time.perf_counter()
+        betrag = self.processor.extrahiere_betrag(pdf_path)
+        zeiten["methode_layout"] = time.perf_counter() - start
+        if betrag:
+            self.letzte_methode = getattr(self.processor, "letzte_methode", None) or "layout"
+        else:
+            self.letzte_methode = None
+        self.treffer[stufe(self.letzte_methode)] += 1
+        return betrag
+
+
+def stufe(methode) -> str:
+    """Ordne eine gemeldete Methode ihrer Stufe zu (für die Trefferquote)"""
+    if not methode:
+        return "keiner"
+    return "text" if methode.startswith("text:") else "layout"
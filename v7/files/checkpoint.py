@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Checkpoint-Journal
+Append-only Protokoll eines Download-Laufs (JSON Lines): gescannte Seiten,
+gefundene Bestellungen und Download-Status pro Bestellung, damit ein
+abgebrochener Lauf mit --resume genau dort weitermacht
+"""
+
+import os
+import re
+import json
+import threading
+from pathlib import Path
+from datetime import datetime
+
+# Zeilentypen im Journal
+LAUF = "lauf"
+SEITE = "seite"
+SCAN_FERTIG = "scan_fertig"
+DOWNLOAD = "download"
+FERTIG = "fertig"
+
+# Download-Status, die beim Fortsetzen nicht wiederholt werden
+ERLEDIGT = ("ok", "vorhanden")
+
+
+class Checkpoint:
+    """Journal für einen (Konto, Jahr)-Lauf; wird nach erfolgreichem Ende gelöscht"""
+
+    def __init__(self, pfad):
+        self.pfad = Path(pfad)
+        self.lock = threading.Lock()
+        self._datei = None
+        # True sobald die Bestellübersicht in diesem Lauf vollständig gescannt ist
+        self.gescannt = False
+
+    @classmethod
+    def fuer_lauf(cls, verzeichnis, account, year=None):
+        """Journal im Download-Ordner, z.B. .checkpoint_default_2024.jsonl"""
+        name = re.sub(r"[^\w.-]", "_", str(account))
+        return cls(Path(verzeichnis) / f".checkpoint_{name}_{year or 'alle'}.jsonl")
+
+    def lade(self):
+        """
+        Lies den Stand eines unterbrochenen Laufs
+
+        Returns:
+            None falls kein offener Lauf existiert, sonst dict mit
+            seiten, naechste_url, scan_fertig, orders und downloads (id → status)
+        """
+        if not self.pfad.exists():
+            return None
+
+        zustand = {
+            "seiten": 0,
+            "naechste_url": None,
+            "scan_fertig": False,
+            "orders": [],
+            "downloads": {},
+        }
+        with open(self.pfad, encoding="utf-8") as f:
+            for zeile in f:
+                try:
+                    eintrag = json.loads(zeile)
+                except json.JSONDecodeError:
+                    # Abgeschnittene letzte Zeile nach einem Absturz
+                    continue
+
+                typ = eintrag.get("typ")
+                if typ == SEITE:
+                    zustand["seiten"] = eintrag["seite"]
+                    zustand["naechste_url"] = eintrag.get("naechste_url")
+                    zustand["orders"].extend(eintrag.get("orders", []))
+                elif typ == SCAN_FERTIG:
+                    zustand["scan_fertig"] = True
+                elif typ == DOWNLOAD:
+                    zustand["downloads"][eintrag["id"]] = eintrag["status"]
+                elif typ == FERTIG:
+                    return None
+
+        return zustand
+
+    def beginne(self, fortsetzen: bool = False, **details):
+        """Journal öffnen; ohne `fortsetzen` wird ein alter Stand verworfen"""
+        self.pfad.parent.mkdir(parents=True, exist_ok=True)
+        self._datei = open(self.pfad, "a" if fortsetzen else "w", encoding="utf-8")
+        if fortsetzen and self._datei.tell() > 0:
+            # Eine abgeschnittene letzte Zeile nicht mit der nächsten verschmelzen
+            with open(self.pfad, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._datei.write("\n")
+        self.schreibe(LAUF, fortgesetzt=fortsetzen, **details)
+
+    def schreibe(self, typ: str, **eintrag):
+        """Eine Zeile anhängen und sofort flushen (übersteht einen Prozessabbruch)"""
+        if self._datei is None:
+            return
+        eintrag = {"typ": typ, "zeit": datetime.now().isoformat(timespec="seconds"), **eintrag}
+        with self.lock:
+            self._datei.write(json.dumps(eintrag, ensure_ascii=False) + "\n")
+            self._datei.flush()
+
+    def seite(self, nummer: int, orders, naechste_url=None):
+        self.schreibe(SEITE, seite=nummer, orders=orders, naechste_url=naechste_url)
+
+    def scan_fertig(self):
+        self.gescannt = True
+        self.schreibe(SCAN_FERTIG)
+
+    def download(self, order_id: str, status: str):
+        self.schreibe(DOWNLOAD, id=order_id, status=status)
+
+    def abschliessen(self):
+        """Lauf vollständig: nichts mehr fortzusetzen"""
+        self.schreibe(FERTIG)
+        self.close()
+        try:
+            os.remove(self.pfad)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        with self.lock:
+            if self._datei:
+                self._datei.close()
+                self._datei = None
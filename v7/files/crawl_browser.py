@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Crawl-Modus
+Schlanker Browser für die Bestellübersicht: keine Bilder, Medien und
+Drittanbieter-Skripte, Wegwerf-Profil nur mit Cookies und optional ein
+warmer Browser, der zwischen Läufen weiterläuft
+"""
+
+import os
+import json
+import stat
+import time
+import tempfile
+import subprocess
+import urllib.request
+from pathlib import Path
+
+# Profil des warmen Browsers (enthält die kopierten Amazon-Cookies)
+WARM_DIR = Path("~/.cache/amazon-invoice-downloader")
+
+# Dateien aus dem Profil, die für die eingeloggte Session reichen
+COOKIE_FILES = ("Cookies", "Network/Cookies")
+
+# Bilder, Medien und Schriften (die Bestellübersicht wird nur als DOM gelesen)
+MEDIEN_MUSTER = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.m3u8",
+]
+
+# Werbung und Tracking von Drittanbietern bzw. Amazon-Werbenetz
+DRITTANBIETER_MUSTER = [
+    "*amazon-adsystem.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*facebook.net*",
+    "*fls-eu.amazon.*",
+    "*unagi*.amazon.*",
+]
+
+
+def crawl_argumente(crawl_config):
+    """Kommandozeilen-Argumente des Browsers im Crawl-Modus"""
+    argumente = [
+        '--disable-extensions',
+        '--disable-background-networking',
+        '--disable-component-update',
+        '--no-first-run',
+        '--no-default-browser-check',
+    ]
+    if crawl_config.get('block_media', True):
+        argumente.append('--blink-settings=imagesEnabled=false')
+    return argumente
+
+
+def crawl_optionen(options, crawl_config):
+    """ChromeOptions für den Crawl-Modus ergänzen"""
+    # DOMContentLoaded reicht, Bestellkarten stehen im HTML
+    options.page_load_strategy = 'eager'
+    for argument in crawl_argumente(crawl_config):
+        options.add_argument(argument)
+
+
+def blockierte_muster(crawl_config):
+    """URL-Muster für Network.setBlockedURLs gemäß Konfiguration"""
+    muster = list(DRITTANBIETER_MUSTER)
+    if crawl_config.get('block_media', True):
+        muster += MEDIEN_MUSTER
+    muster += crawl_config.get('blocked_urls') or []
+    return muster
+
+
+def blockiere_ressourcen(driver, muster):
+    """Requests auf die Muster im Browser selbst abbrechen (Chrome DevTools Protocol)"""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': muster})
+
+
+def wegwerf_profil(profile_path, profile_name, target_dir=None):
+    """Neues user-data-dir, das nur die Cookies des echten Profils enthält"""
+    from session_pool import clone_profile
+
+    target_dir = target_dir or tempfile.mkdtemp(prefix="amazon-crawl-")
+    return clone_profile(profile_path, profile_name, target_dir, files=COOKIE_FILES)
+
+
+def schreibe_einstellungen(user_data_dir, profile_name, prefs):
+    """
+    Browser-Einstellungen (z.B. Download-Ordner) direkt in die Preferences
+    eines frischen Profils schreiben - ein per debuggerAddress angehängter
+    Browser übernimmt keine ChromeOptions-prefs
+    """
+    einstellungen = {}
+    for schluessel, wert in prefs.items():
+        ziel = einstellungen
+        *pfad, name = schluessel.split('.')
+        for teil in pfad:
+            ziel = ziel.setdefault(teil, {})
+        ziel[name] = wert
+
+    datei = Path(user_data_dir) / profile_name / "Preferences"
+    datei.parent.mkdir(parents=True, exist_ok=True)
+    datei.write_text(json.dumps(einstellungen), encoding="utf-8")
+
+
+def privates_verzeichnis(pfad):
+    """
+    Verzeichnis nur für den aktuellen Benutzer (0700) anlegen bzw. prüfen
+
+    Raises:
+        PermissionError: falls es ein Symlink ist oder einem anderen Benutzer gehört
+    """
+    pfad = Path(pfad).expanduser()
+    pfad.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        pfad.mkdir(mode=0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(pfad)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{pfad} ist kein Verzeichnis (Symlink?)")
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"{pfad} gehört nicht dem aktuellen Benutzer")
+    os.chmod(pfad, 0o700)
+    return pfad
+
+
+class WarmerBrowser:
+    """
+    Browser mit --remote-debugging-port, der nach dem Lauf weiterläuft
+
+    Der nächste Lauf hängt sich per debuggerAddress an dieselbe Instanz
+    (Cookies, DNS- und HTTP-Cache bleiben warm) statt neu zu starten.
+    """
+
+    def __init__(self, binary, port: int = 9222, user_data_dir=None, headless: bool = True):
+        self.binary = binary
+        self.port = port
+        # Cookies der Session: nie in einem vorhersagbaren, fremd beschreibbaren Ordner
+        self.user_data_dir = privates_verzeichnis(user_data_dir or WARM_DIR / f"warm-{port}")
+        self.headless = headless
+
+    @property
+    def debugger_address(self):
+        return f"127.0.0.1:{self.port}"
+
+    def laeuft(self) -> bool:
+        """Antwortet ein Browser auf dem Debug-Port?"""
+        try:
+            with urllib.request.urlopen(f"http://{self.debugger_address}/json/version", timeout=1) as r:
+                return 'Browser' in json.load(r)
+        except (OSError, ValueError):
+            return False
+
+    def starte(self, extra_args=(), timeout: float = 15):
+        """Browser losgelöst vom aktuellen Prozess starten und auf den Debug-Port warten"""
+        args = [
+            str(self.binary),
+            f"--remote-debugging-port={self.port}",
+            f"--user-data-dir={self.user_data_dir}",
+            *extra_args,
+        ]
+        if self.headless:
+            args.append('--headless=new')
+
+        subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+
+        ende = time.monotonic() + timeout
+        while time.monotonic() < ende:
+            if self.laeuft():
+                return
+            time.sleep(0.2)
+        raise TimeoutError(f"Browser antwortet nicht auf Port {self.port}")
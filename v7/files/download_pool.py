@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Download-Pool
+Paralleler Rechnungsdownload mit Token-Bucket-Ratenbegrenzung und Retry;
+die Rate passt sich auf Wunsch an die Antwortzeiten und Drosselsignale an (AIMD)
+"""
+
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class ThrottledError(Exception):
+    """Amazon drosselt (HTTP 429/503, Captcha) - Request später wiederholen"""
+
+    def __init__(self, status, retry_after=None, grund=None):
+        self.grund = grund or f"HTTP {status}"
+        super().__init__(f"{self.grund} (gedrosselt)")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-sicherer Token-Bucket: max. `rate` Requests/s, Bursts bis `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Blockiere bis ein Token verfügbar ist"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wartezeit = (1 - self.tokens) / self.rate
+            time.sleep(wartezeit)
+
+    def erfolg(self, latenz: float):
+        """Rückmeldung nach einem erfolgreichen Request (feste Rate: ignoriert)"""
+
+    def gedrosselt(self, grund: str = None):
+        """Rückmeldung bei Drosselung, Captcha oder Login-Umleitung (feste Rate: ignoriert)"""
+
+
+class AdaptiverTokenBucket(TokenBucket):
+    """
+    Token-Bucket mit AIMD-Regelung der Rate
+
+    Jeder zügig beantwortete Request erhöht die Rate um `schritt` (additiv),
+    jedes Drosselsignal halbiert sie (multiplikativ). Liegt die geglättete
+    Antwortzeit über `ziel_latenz`, wird nicht weiter erhöht, sondern leicht
+    gesenkt. Signale parallel laufender Requests zählen innerhalb einer
+    Abklingzeit nur einmal.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, rate_min: float = 0.2, rate_max: float = 5.0,
+                 schritt: float = 0.1, faktor: float = 0.5, ziel_latenz: float = 2.0, ausgabe=print):
+        """
+        Args:
+            rate: Startrate in Requests/s
+            burst: Kurzzeitig erlaubte Requests auf einmal
+            rate_min / rate_max: Grenzen der Regelung
+            schritt: Erhöhung pro erfolgreichem Request
+            faktor: Multiplikator bei Drosselung
+            ziel_latenz: Geglättete Antwortzeit (s), ab der nicht mehr erhöht wird
+            ausgabe: Funktion für Meldungen über Ratenänderungen (None = still)
+        """
+        super().__init__(min(max(rate, rate_min), rate_max), burst)
+        self.rate_min = rate_min
+        self.rate_max = rate_max
+        self.schritt = schritt
+        self.faktor = faktor
+        self.ziel_latenz = ziel_latenz
+        self.ausgabe = ausgabe
+        self.latenz = None
+        self._letzte_senkung = 0.0
+        self._gemeldet = self.rate
+        self.statistik = {"erhoeht": 0, "gesenkt": 0, "drosselsignale": 0}
+
+    def _setze_rate(self, rate, grund=None):
+        """Neue Rate übernehmen (Lock muss gehalten werden); liefert Meldetext oder None"""
+        alt = self.rate
+        self._refill()
+        self.rate = min(max(rate, self.rate_min), self.rate_max)
+        if self.rate < alt:
+            self.statistik["gesenkt"] += 1
+            self._letzte_senkung = time.monotonic()
+            self._gemeldet = self.rate
+            return f"🐢 Rate {alt:.2f} → {self.rate:.2f} Req/s ({grund})"
+        if self.rate > alt:
+            self.statistik["erhoeht"] += 1
+            # Erhöhungen nur in größeren Sprüngen melden
+            if self.rate >= self._gemeldet * 1.25 or (self.rate == self.rate_max and self._gemeldet < self.rate):
+                self._gemeldet = self.rate
+                return f"🚀 Rate {self.rate:.2f} Req/s"
+        return None
+
+    def _abgeklungen(self):
+        # Ungefähr ein Request-Abstand plus Antwortzeit, bis ein neues Signal zählt
+        return time.monotonic() - self._letzte_senkung > 1 / self.rate + (self.latenz or 0)
+
+    def erfolg(self, latenz: float):
+        with self.lock:
+            self.latenz = latenz if self.latenz is None else 0.8 * self.latenz + 0.2 * latenz
+            if self.latenz <= self.ziel_latenz:
+                meldung = self._setze_rate(self.rate + self.schritt)
+            elif self._abgeklungen():
+                meldung = self._setze_rate(self.rate * 0.9, f"Antwortzeit {self.latenz:.1f}s")
+            else:
+                meldung = None
+        if meldung and self.ausgabe:
+            self.ausgabe(meldung)
+
+    def gedrosselt(self, grund: str = None):
+        with self.lock:
+            self.statistik["drosselsignale"] += 1
+            meldung = None
+            if self._abgeklungen():
+                meldung = self._setze_rate(self.rate * self.faktor, grund or "gedrosselt")
+                # Angesparte Tokens verfallen, sonst folgt sofort der nächste Burst
+                self.tokens = 0.0
+        if meldung and self.ausgabe:
+            self.ausgabe(meldung)
+
+
+class DownloadPool:
+    """Worker-Pool, der Bestellungen parallel herunterlädt und Ergebnisse sammelt"""
+
+    def __init__(self, worker, concurrency: int = 4, limiter: TokenBucket = None,
+                 max_retries: int = 4, backoff_seconds: float = 2.0):
+        """
+        Args:
+            worker: Funktion(order) -> "ok" | "vorhanden" | "fehler",
+                    wirft ThrottledError bei 429/503
+            concurrency: Anzahl paralleler Downloads
+            limiter: Gemeinsamer Token-Bucket für alle Worker (bekommt
+                     Antwortzeiten und Drosselungen zurückgemeldet)
+            max_retries: Wiederholungen bei Drosselung
+            backoff_seconds: Basis für exponentielles Backoff
+        """
+        self.worker = worker
+        self.concurrency = max(1, concurrency)
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+    def _run_one(self, order):
+        """Lade eine Bestellung mit Retry und liefere das Ergebnis"""
+        result = {'id': order['id'], 'status': 'fehler', 'versuche': 0, 'fehler': None}
+        start = time.monotonic()
+
+        for versuch in range(self.max_retries + 1):
+            result['versuche'] = versuch + 1
+            if self.limiter:
+                self.limiter.acquire()
+            try:
+                versuch_start = time.monotonic()
+                result['status'] = self.worker(order)
+                result['fehler'] = None
+                # Nur echte Downloads zählen (vorhanden = kein Request, fehler = kein Erfolg)
+                if self.limiter and result['status'] == 'ok':
+                    self.limiter.erfolg(time.monotonic() - versuch_start)
+                break
+            except ThrottledError as e:
+                result['fehler'] = str(e)
+                if self.limiter:
+                    self.limiter.gedrosselt(e.grund)
+                if versuch == self.max_retries:
+                    break
+                # Exponentielles Backoff mit Jitter, Retry-After hat Vorrang
+                wartezeit = e.retry_after or self.backoff_seconds * (2 ** versuch)
+                time.sleep(wartezeit + random.uniform(0, self.backoff_seconds))
+            except Exception as e:
+                result['fehler'] = str(e)
+                break
+
+        result['dauer'] = time.monotonic() - start
+        return result
+
+    def run(self, orders):
+        """
+        Lade alle Bestellungen und liefere die Ergebnisse in Eingabereihenfolge
+
+        `orders` darf ein Generator sein (z.B. die laufende Suche in der
+        Bestellübersicht): Downloads starten sofort, weitergelesen wird erst,
+        wenn weniger als 2 Downloads pro Worker ausstehen.
+        """
+        gesamt = len(orders) if hasattr(orders, '__len__') else None
+        results = []
+        laufend = {}
+        fertig = 0
+
+        def ernten(blockieren):
+            nonlocal fertig
+            done, _ = wait(laufend, timeout=None if blockieren else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results[laufend.pop(future)] = result
+                fertig += 1
+                print(f"[{fertig}/{gesamt or '?'}] {result['id']}: {self._status_text(result)}")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for order in orders:
+                laufend[executor.submit(self._run_one, order)] = len(results)
+                results.append(None)
+                ernten(blockieren=len(laufend) >= 2 * self.concurrency)
+
+            while laufend:
+                ernten(blockieren=True)
+
+        return results
+
+    @staticmethod
+    def _status_text(result):
+        if result['status'] == 'ok':
+            return "✓ Heruntergeladen"
+        if result['status'] == 'vorhanden':
+            return "⏭ Bereits vorhanden"
+        return f"❌ Fehlgeschlagen ({result['fehler'] or 'unbekannt'})"
+
+
+def zusammenfassung(results):
+    """Zähle Ergebnisse pro Status"""
+    counts = {'ok': 0, 'vorhanden': 0, 'fehler': 0}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return counts
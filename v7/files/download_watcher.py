@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Download-Watcher
+Erkennt fertig heruntergeladene Dateien ohne feste Wartezeiten
+(inotify unter Linux, sonst Abgleich mit einem Verzeichnis-Snapshot)
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from pathlib import Path
+from collections import deque
+
+# Unvollständige Downloads (Chrome/Brave, Firefox, eigene Teildateien)
+TEMP_SUFFIXES = ('.crdownload', '.part', '.partial', '.tmp', '.download')
+
+# inotify-Konstanten aus <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimaler inotify-Zugriff über ctypes (keine Zusatzabhängigkeit)"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 fehlgeschlagen")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(str(directory)),
+                                    IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch fehlgeschlagen")
+
+    @classmethod
+    def create(cls, directory):
+        """Liefere inotify-Instanz oder None falls nicht verfügbar"""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            return cls(directory)
+        except (OSError, AttributeError, TypeError):
+            return None
+
+    def read(self, timeout):
+        """Warte bis zu `timeout` Sekunden und liefere die Namen fertiger Dateien"""
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+
+        names = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DownloadWatcher:
+    """Meldet neue, vollständig geschriebene Dateien in einem Verzeichnis"""
+
+    def __init__(self, directory, suffix='.pdf', poll_interval=0.2):
+        self.directory = Path(directory)
+        self.suffix = suffix
+        self.poll_interval = poll_interval
+        self._inotify = _Inotify.create(self.directory)
+        # Snapshot einmalig, danach nur noch inkrementell gepflegt
+        self.known = {entry.name for entry in os.scandir(self.directory)}
+        # Fertige Dateien aus demselben Ereignis-Block, noch nicht abgeholt
+        self._ready = deque()
+
+    @property
+    def uses_inotify(self):
+        return self._inotify is not None
+
+    def _is_candidate(self, name):
+        return (
+            name not in self.known
+            and name.lower().endswith(self.suffix)
+            and not name.lower().endswith(TEMP_SUFFIXES)
+        )
+
+    def mark_known(self, *names):
+        """Dateien als bekannt markieren (z.B. nach dem Umbenennen)"""
+        self.known.update(names)
+
+    def forget_missing(self):
+        """Nicht mehr vorhandene Dateien vergessen, damit ein neuer Download gleichen Namens auffällt"""
+        self.known.intersection_update(entry.name for entry in os.scandir(self.directory))
+
+    def drain(self):
+        """Verwerfe bereits aufgelaufene Ereignisse (Dateien gelten als bekannt)"""
+        self._ready.clear()
+        if self._inotify:
+            self.known.update(self._inotify.read(0))
+        else:
+            self.known.update(entry.name for entry in os.scandir(self.directory))
+
+    def wait_for_new(self, timeout):
+        """
+        Warte auf die nächste neue, fertige Datei
+
+        Returns:
+            Pfad der Datei oder None nach Timeout
+        """
+        if self._ready:
+            return self._ready.popleft()
+
+        deadline = time.monotonic() + timeout
+
+        if self._inotify:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                for name in self._inotify.read(remaining):
+                    if self._is_candidate(name):
+                        self._ready.append(self.directory / name)
+                    self.known.add(name)
+                if self._ready:
+                    return self._ready.popleft()
+
+        # Fallback: Snapshot-Vergleich, Datei muss zweimal dieselbe Größe haben
+        sizes = {}
+        while time.monotonic() < deadline:
+            for entry in os.scandir(self.directory):
+                if not self._is_candidate(entry.name):
+                    continue
+                size = entry.stat().st_size
+                if size > 0 and sizes.get(entry.name) == size:
+                    self.known.add(entry.name)
+                    return self.directory / entry.name
+                sizes[entry.name] = size
+            time.sleep(self.poll_interval)
+        return None
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
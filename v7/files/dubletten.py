@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Duplikaterkennung
+Bereits abgelegte Rechnungen (gleicher Inhalt oder gleiche Bestellnummer)
+vor der Extraktion erkennen und Duplikate im Archiv aufräumen
+"""
+
+import os
+import re
+from pathlib import Path
+
+# Dateiname des Amazon Downloaders → Bestellnummer
+RECHNUNG_MUSTER = re.compile(r"Amazon_Rechnung_(.+)\.pdf$")
+
+# Ordner, in den Duplikate verschoben statt gelöscht werden
+DUPLIKAT_ORDNER = "_Duplikate"
+
+
+class DoppelteRechnung(Exception):
+    """Rechnung ist bereits abgelegt"""
+
+
+def bestellnummer(pdf_path):
+    """Bestellnummer aus dem Dateinamen oder None"""
+    treffer = RECHNUNG_MUSTER.match(Path(pdf_path).name)
+    return treffer.group(1) if treffer else None
+
+
+def beiseitelegen(pfad, ordner):
+    """Datei nach `ordner` verschieben (bei Namenskollision mit Zähler)"""
+    pfad = Path(pfad)
+    ordner = Path(ordner)
+    ordner.mkdir(parents=True, exist_ok=True)
+    ziel = ordner / pfad.name
+    zaehler = 1
+    while ziel.exists():
+        ziel = ordner / f"{pfad.stem}_{zaehler}{pfad.suffix}"
+        zaehler += 1
+    os.replace(pfad, ziel)
+    return ziel
+
+
+class DublettenFilter:
+    """
+    Hash- und Bestellnummern-Menge aller abgelegten Rechnungen im Speicher
+
+    Geladen aus Steuer-Manifest und Bestell-Index; ein Treffer zählt nur,
+    wenn die bekannte Datei noch existiert.
+    """
+
+    def __init__(self, manifest, bestell_index=None):
+        # Manifeste aus der Zeit vor der Duplikaterkennung einmalig nachhashen
+        manifest.ergaenze_hashes()
+        self.hashes = manifest.hashes()
+        self.bestellungen = manifest.bestellungen()
+        if bestell_index is not None:
+            for order_id, pfad in bestell_index.filed().items():
+                self.bestellungen.setdefault(order_id, pfad)
+        # In diesem Lauf angenommene, noch nicht abgelegte Dateien
+        self.reserviert = {}
+
+    def pruefe(self, pdf_path, sha256):
+        """
+        Grund als Text falls `pdf_path` ein Duplikat ist, sonst None
+
+        Die erste Kopie wird reserviert, damit weitere Kopien im selben
+        Lauf ebenfalls als Duplikat erkannt werden.
+        """
+        order_id = bestellnummer(pdf_path)
+        if order_id:
+            bekannt = self.bestellungen.get(order_id)
+            if bekannt is not None and Path(bekannt).exists():
+                return f"Bestellung {order_id} bereits abgelegt als {Path(bekannt).name}"
+
+        bekannt = self.hashes.get(sha256)
+        if bekannt is not None and Path(bekannt).exists():
+            return f"Inhalt identisch mit {Path(bekannt).name}"
+
+        for anderer, (sha, bestellung) in self.reserviert.items():
+            if sha == sha256 or (order_id and bestellung == order_id):
+                return f"Doppelt in diesem Lauf ({Path(anderer).name})"
+
+        self.reserviert[Path(pdf_path)] = (sha256, order_id)
+        return None
+
+    def merke(self, pdf_path, ziel):
+        """Abgelegte Datei übernehmen; liefert den Hash für das Manifest"""
+        sha256, order_id = self.reserviert.pop(Path(pdf_path), (None, None))
+        if sha256:
+            self.hashes[sha256] = Path(ziel)
+        if order_id:
+            self.bestellungen[order_id] = Path(ziel)
+        return sha256
+
+    def freigeben(self, pdf_path):
+        """Reservierung aufheben (Ablage fehlgeschlagen)"""
+        self.reserviert.pop(Path(pdf_path), None)
+
+
+def bereinige_archiv(manifest, ziel_dir=None):
+    """
+    Inhaltsgleiche Dateien im Archiv aufräumen (--dedup)
+
+    Die älteste Ablage bleibt liegen, alle weiteren Kopien werden nach
+    `ziel_dir` (Standard: steuer_dir/_Duplikate) verschoben und aus dem
+    Manifest ausgetragen. Gleiche Bestellnummer mit anderem Inhalt wird
+    nur gemeldet, da es sich um eine korrigierte Rechnung handeln kann.
+
+    Returns:
+        (verschoben, nur_gemeldet) als Listen von (Duplikat, Original)
+    """
+    ziel_dir = Path(ziel_dir) if ziel_dir else manifest.steuer_dir / DUPLIKAT_ORDNER
+    manifest.ergaenze_hashes()
+
+    verschoben = []
+    for gruppe in manifest.doppelte("sha256"):
+        original, *kopien = [e for e in gruppe if e["pfad"].exists()] or [None]
+        for kopie in kopien:
+            neu = beiseitelegen(kopie["pfad"], ziel_dir / str(kopie["jahr"]))
+            manifest.entferne(kopie["pfad"])
+            verschoben.append((neu, original["pfad"]))
+
+    nur_gemeldet = []
+    for gruppe in manifest.doppelte("order_id"):
+        original, *andere = gruppe
+        for eintrag in andere:
+            if eintrag["sha256"] != original["sha256"]:
+                nur_gemeldet.append((eintrag["pfad"], original["pfad"]))
+
+    return verschoben, nur_gemeldet
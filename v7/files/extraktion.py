@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Parallele Betragsextraktion
+Verteilt PDFProcessor.extrahiere_betrag auf mehrere Prozesse
+"""
+
+import os
+import time
+import signal
+import threading
+from pathlib import Path
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from order_index import file_sha256
+from betrag_extraktor import StufenExtraktor, stufe
+from dubletten import DoppelteRechnung
+
+# Bei jeder Änderung an der Extraktionslogik erhöhen (macht den Cache ungültig)
+EXTRAKTOR_VERSION = "2"
+
+# So viele Ergebnisse merkt sich ein Lauf für doppelte Inhalte (Dauerbetrieb)
+MAX_ERLEDIGT = 10000
+
+# PDFProcessor pro Worker-Prozess (einmal im Initializer erstellt)
+_processor = None
+
+
+class ExtraktionsTimeout(BaseException):
+    """
+    Extraktion einer PDF hat das Zeitlimit überschritten
+
+    Wie KeyboardInterrupt kein Exception-Subtyp, damit ein `except Exception`
+    im Textlayer oder im PDFProcessor das Zeitlimit nicht verschluckt.
+    """
+
+
+def _timeout_handler(signum, frame):
+    raise ExtraktionsTimeout("Zeitlimit überschritten")
+
+
+def _init_worker(config_path: str, schnellpfad: bool):
+    """Initialisiere PDFProcessor im Worker-Prozess"""
+    global _processor
+    from src.config import Config
+    from src.pdf_processor import PDFProcessor
+
+    _processor = PDFProcessor(Config(config_path))
+    if schnellpfad:
+        _processor = StufenExtraktor(_processor)
+
+    # Strg+C nur im Hauptprozess behandeln
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _extrahiere_mit(processor, pdf_path: Path):
+    """Liefere (betrag, methode, zeiten); Methode und Teilzeiten meldet der Processor falls er kann"""
+    start = time.perf_counter()
+    betrag = processor.extrahiere_betrag(pdf_path)
+    zeiten = dict(getattr(processor, "letzte_zeiten", None) or {})
+    zeiten["extraktion"] = time.perf_counter() - start
+    return betrag, getattr(processor, "letzte_methode", None), zeiten
+
+
+def _mit_zeitlimit(processor, pdf_path: Path, timeout: float):
+    """
+    _extrahiere_mit, abgebrochen nach `timeout` Sekunden
+
+    Das Zeitlimit braucht SIGALRM und den Hauptthread des Prozesses; ohne
+    beides (Windows, Aufruf aus einem anderen Thread) läuft die PDF ohne Limit.
+    """
+    alarm = (hasattr(signal, "SIGALRM") and timeout > 0
+             and threading.current_thread() is threading.main_thread())
+    if alarm:
+        vorher = signal.signal(signal.SIGALRM, _timeout_handler)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return _extrahiere_mit(processor, pdf_path)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, vorher)
+
+
+def _extrahiere(pdf_path: Path, timeout: float):
+    """Extrahiere Betrag im Worker, abgebrochen nach `timeout` Sekunden"""
+    return _mit_zeitlimit(_processor, pdf_path, timeout)
+
+
+class ParalleleExtraktion:
+    """Prozess-Pool für die CPU-lastige Betragsextraktion"""
+
+    def __init__(self, config_path: str, processor=None, worker: int = None,
+                 timeout: float = 60, cache=None, schnellpfad: bool = True, messung=None,
+                 duplikat=None):
+        """
+        Args:
+            config_path: Pfad zur config.yaml (Worker laden sie selbst)
+            processor: PDFProcessor des Hauptprozesses (für worker=1)
+            worker: Anzahl Prozesse (None = alle Kerne, 1 = ohne Pool)
+            timeout: Zeitlimit pro PDF in Sekunden (0 = keins); gilt mit worker=1
+                     nur, wenn verarbeite() im Hauptthread läuft
+            cache: Optionaler BetragCache (Inhalts-Hash → Betrag)
+            schnellpfad: Erst Textlayer-Regex, Layoutanalyse nur als Fallback
+            messung: Optionale Messung für die Teilzeiten aus den Workern
+            duplikat: Optional (pdf_path, sha256) → Grund oder None; Treffer
+                      werden ohne Extraktion mit DoppelteRechnung gemeldet
+        """
+        self.config_path = config_path
+        self.schnellpfad = schnellpfad
+        if schnellpfad and processor is not None:
+            processor = StufenExtraktor(processor)
+        self.processor = processor
+        self.worker = worker
+        self.timeout = timeout
+        self.cache = cache
+        self.messung = messung
+        self.duplikat = duplikat
+        self.statistik = {"cache_treffer": 0, "duplikate": 0, "bereits_abgelegt": 0, "extrahiert": 0}
+        # Treffer pro Stufe (text / layout / keiner) der tatsächlich geparsten PDFs
+        self.stufen = Counter()
+
+    def verarbeite(self, pdfs):
+        """
+        Extrahiere Beträge parallel; gleicher Inhalt wird nur einmal geparst
+
+        `pdfs` darf auch ein laufender Strom sein (z.B. aus einer Queue): jede
+        PDF wird sofort verteilt, höchstens 2 pro Worker gleichzeitig, danach
+        blockiert die Annahme (Backpressure). Ein `None` im Strom bedeutet
+        "nichts Neues" und gibt nur fertige Ergebnisse aus.
+
+        Yields:
+            (pdf_path, betrag, methode, fehler) in Eingabereihenfolge, jeweils
+            sobald alle vorherigen PDFs fertig sind
+        """
+        executor = None
+        if self.worker != 1:
+            executor = ProcessPoolExecutor(
+                max_workers=self.worker,
+                initializer=_init_worker,
+                initargs=(str(self.config_path), self.schnellpfad)
+            )
+        max_in_arbeit = 2 * (self.worker or os.cpu_count() or 1)
+
+        fertig = {}      # Eingabeindex → Ergebnis
+        gruppen = {}     # SHA-256 → [(Index, Pfad)] die auf dieses Ergebnis warten
+        erledigt = OrderedDict()    # SHA-256 → (betrag, methode, fehler), die letzten MAX_ERLEDIGT
+        laufend = {}     # Future → SHA-256
+        naechster = 0
+        anzahl = 0
+
+        def abschliessen(sha256, betrag, methode, zeiten, fehler):
+            if zeiten and self.messung:
+                self.messung.erfasse_alle(zeiten)
+            if fehler is None:
+                self.statistik["extrahiert"] += 1
+                self.stufen[stufe(methode)] += 1
+                if self.cache:
+                    self.cache.speichere(sha256, betrag, methode)
+            erledigt[sha256] = (betrag, methode, fehler)
+            if len(erledigt) > MAX_ERLEDIGT:
+                # Ältere Inhalte findet der Cache bzw. die Duplikaterkennung
+                erledigt.popitem(last=False)
+            for i, pdf_path in gruppen.pop(sha256):
+                fertig[i] = (pdf_path, betrag, methode, fehler)
+
+        def ernten(blockieren):
+            if not laufend:
+                return
+            done, _ = wait(laufend, timeout=None if blockieren else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                sha256 = laufend.pop(future)
+                try:
+                    abschliessen(sha256, *future.result(), None)
+                except (Exception, ExtraktionsTimeout) as e:
+                    abschliessen(sha256, None, None, None, e)
+
+        def ausgeben():
+            # Reihenfolge der Ablage bleibt deterministisch
+            nonlocal naechster
+            while naechster in fertig:
+                yield fertig.pop(naechster)
+                naechster += 1
+
+        try:
+            for pdf_path in pdfs:
+                if pdf_path is not None:
+                    i = anzahl
+                    anzahl += 1
+                    try:
+                        sha256 = file_sha256(pdf_path)
+                    except OSError as e:
+                        sha256 = None
+                        fertig[i] = (pdf_path, None, None, e)
+
+                    grund = self.duplikat(pdf_path, sha256) if sha256 and self.duplikat else None
+                    if sha256 is None:
+                        pass
+                    elif grund:
+                        self.statistik["bereits_abgelegt"] += 1
+                        fertig[i] = (pdf_path, None, None, DoppelteRechnung(grund))
+                    elif sha256 in erledigt:
+                        self.statistik["duplikate"] += 1
+                        fertig[i] = (pdf_path, *erledigt[sha256])
+                    elif sha256 in gruppen:
+                        self.statistik["duplikate"] += 1
+                        gruppen[sha256].append((i, pdf_path))
+                    else:
+                        treffer = self.cache.hole(sha256) if self.cache else None
+                        if treffer is not None:
+                            self.statistik["cache_treffer"] += 1
+                            fertig[i] = (pdf_path, treffer[0], treffer[1], None)
+                        elif executor is None:
+                            gruppen[sha256] = [(i, pdf_path)]
+                            try:
+                                abschliessen(sha256, *_mit_zeitlimit(self.processor, pdf_path, self.timeout), None)
+                            except (Exception, ExtraktionsTimeout) as e:
+                                abschliessen(sha256, None, None, None, e)
+                        else:
+                            gruppen[sha256] = [(i, pdf_path)]
+                            laufend[executor.submit(_extrahiere, pdf_path, self.timeout)] = sha256
+
+                ernten(blockieren=len(laufend) >= max_in_arbeit)
+                yield from ausgeben()
+
+            while laufend:
+                ernten(blockieren=True)
+                yield from ausgeben()
+            yield from ausgeben()
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
+    def trefferquote(self):
+        """Anteil der geparsten PDFs pro Stufe, z.B. {'text': 0.9, 'layout': 0.08, ...}"""
+        gesamt = sum(self.stufen.values())
+        if not gesamt:
+            return {}
+        return {name: anzahl / gesamt for name, anzahl in self.stufen.items()}
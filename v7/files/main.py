@@ -8,21 +8,121 @@ Verwendung:
     python main.py --only-download    # Nur Amazon Download
     python main.py --only-process     # Nur PDF Verarbeitung
     python main.py --check            # Nur Prüfung ohne Betrag
+    python main.py --reindex          # Steuer-Manifest aus dem Dateisystem neu aufbauen
+    python main.py --dedup            # Doppelte Rechnungen im Archiv aufräumen
+    python main.py --bericht          # Wochen-/Jahressummen als CSV für den Steuerberater
+    python main.py --pipeline         # Download und Verarbeitung überlappend
+    python main.py --profile cprofile # Mit Profiling (Ergebnis im log_dir)
+    python main.py --resume           # Abgebrochenen Lauf fortsetzen
+    python main.py --watch            # Dauerbetrieb: Download-Ordner beobachten
 """
 
-import argparse
+import time
+import queue
 import logging
+import signal
+import argparse
+import threading
+import importlib.util
+import yaml
 from pathlib import Path
 from datetime import datetime
 import sys
 
-# Module importieren
+# Module importieren (nur was jeder Modus braucht; Selenium, pdfplumber,
+# Extraktion und Benachrichtigung erst dort, wo sie verwendet werden)
 from src.config import Config
-from src.amazon_downloader import AmazonDownloader
-from src.pdf_processor import PDFProcessor
-from src.file_manager import FileManager
-from src.notification import Notification
 from src.logger import setup_logging
+from order_index import OrderIndex
+from messung import Messung, Profiler
+from manifest import SteuerManifest
+from protokoll import asynchron_loggen
+
+# Bis setup_logging den konfigurierten Logger liefert (SteuerAutomation, main)
+logger = logging.getLogger(__name__)
+
+
+def oeffne_manifest(config, year: int = None):
+    """Steuer-Manifest öffnen; fehlende Jahre einmalig aus dem Dateisystem erstellen"""
+    manifest = SteuerManifest(config.steuer_base_dir)
+    for jahr in ([year] if year else manifest.jahre()):
+        if not manifest.hat_manifest(jahr) and (manifest.steuer_dir / f"Steuer-{jahr}").is_dir():
+            print(f"🔧 Erstelle Manifest für {jahr}...")
+            manifest.oeffne(jahr)
+    return manifest
+
+
+def zeige_ohne_betrag(config, year: int = None):
+    """--check: Dateien ohne Betrag und Jahressummen aus dem Manifest"""
+    manifest = oeffne_manifest(config, year)
+    try:
+        dateien = manifest.ohne_betrag(year)
+        if dateien:
+            print(f"\n⚠ {len(dateien)} Dateien ohne Betrag:")
+            for datei in dateien:
+                print(f"  {datei['jahr']} KW{datei['kw']:02d}  {datei['pfad']}")
+        else:
+            print("\n✓ Alle Dateien haben einen Betrag")
+        
+        print()
+        for summe in manifest.summen_pro_jahr():
+            if year and summe['jahr'] != year:
+                continue
+            print(f"📊 {summe['jahr']}: {summe['anzahl']} Rechnungen, "
+                  f"{summe['summe']:.2f} EUR, {summe['ohne_betrag']} ohne Betrag")
+    finally:
+        manifest.close()
+
+
+def erstelle_berichte(config, year: int = None, formate=("csv",), ausgabe=None):
+    """--bericht: Wochen- und Jahressummen pro Steuerjahr exportieren"""
+    import bericht
+    
+    manifest = oeffne_manifest(config, year)
+    try:
+        jahre = [year] if year else [j for j in manifest.jahre() if manifest.hat_manifest(j)]
+        if not jahre:
+            print("⚠ Keine abgelegten Rechnungen gefunden")
+            return
+        
+        for eintrag, pfade in bericht.exportiere(manifest, jahre, ausgabe or config.steuer_base_dir, formate):
+            print(f"📊 {eintrag['jahr']}: {eintrag['anzahl']} Rechnungen in {len(eintrag['wochen'])} Wochen, "
+                  f"{eintrag['summe']:.2f} EUR ({eintrag['ohne_betrag']} ohne Betrag)")
+            for pfad in pfade:
+                print(f"  ✓ {pfad}")
+    finally:
+        manifest.close()
+
+
+def manifest_neu_aufbauen(config, year: int = None):
+    """--reindex: Manifest(e) aus dem Steuer-Ordner neu erstellen"""
+    manifest = SteuerManifest(config.steuer_base_dir)
+    try:
+        start = time.perf_counter()
+        for jahr, anzahl in manifest.neu_aufbauen(year).items():
+            print(f"✓ Steuer-{jahr}: {anzahl} Dateien")
+        print(f"✓ Manifest neu aufgebaut in {time.perf_counter() - start:.2f}s")
+    finally:
+        manifest.close()
+
+
+def archiv_bereinigen(config):
+    """--dedup: inhaltsgleiche Rechnungen im Steuer-Ordner beiseitelegen"""
+    from dubletten import DUPLIKAT_ORDNER, bereinige_archiv
+    
+    manifest = oeffne_manifest(config)
+    try:
+        verschoben, nur_gemeldet = bereinige_archiv(manifest)
+        for duplikat, original in verschoben:
+            print(f"  🗂 {original.name} doppelt → {duplikat}")
+        for anderer, original in nur_gemeldet:
+            print(f"  ⚠ Gleiche Bestellung, anderer Inhalt: {anderer} / {original.name}")
+        if verschoben:
+            print(f"✓ {len(verschoben)} Duplikate nach {manifest.steuer_dir / DUPLIKAT_ORDNER} verschoben")
+        else:
+            print("✓ Keine Duplikate im Archiv")
+    finally:
+        manifest.close()
 
 
 class SteuerAutomation:
@@ -30,6 +130,7 @@ class SteuerAutomation:
     
     def __init__(self, config_path: str = "config.yaml"):
         """Initialisiere mit Konfiguration"""
+        self.config_path = config_path
         try:
             self.config = Config(config_path)
         except FileNotFoundError as e:
@@ -43,26 +144,91 @@ class SteuerAutomation:
         global logger
         logger = setup_logging(self.config.log_dir, self.config.log_level)
         
+        # Zusätzliche Optionen (Abschnitte, die Config nicht kennt)
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.optionen = yaml.safe_load(f) or {}
+        
+        # Konsole und Logdatei aus einem Hintergrund-Thread schreiben
+        self._protokoll = None
+        if self.option('logging', 'asynchron', True):
+            self._protokoll = asynchron_loggen(logger)
+        
+        # Telegram asynchron (Alarme während des Laufs, Zusammenfassung am Ende)
+        telegram = self.option('notifications', 'telegram') or {}
+        self.versand = None
+        self.alarme = set(telegram.get('alarme') or [])
+        if telegram.get('enabled') and telegram.get('asynchron', True):
+            from telegram_versand import TelegramVersand
+            self.versand = TelegramVersand.aus_config(telegram)
+        
         self.stats = {
             "amazon_downloads": 0,
             "pdfs_verarbeitet": 0,
             "betraege_erkannt": 0,
             "fehler": 0,
             "ohne_betrag": 0,
+            "duplikate": 0,
             "start_zeit": datetime.now()
         }
+        # Monotone Uhr für Dauer und Stufen (unabhängig von Zeitumstellungen)
+        self.start_monoton = time.perf_counter()
+        self.messung = Messung()
+        # Export der Messwerte (.json oder .prom), None = kein Export
+        self.metriken_pfad = self.option('messung', 'export_pfad')
+        
+        # Einmal erstellt und in allen Schritten (und im Dauerbetrieb) weiterverwendet
+        self._processor = None
+        self._file_mgr = None
+        self._downloader_modul = None
         
         logger.info("Steuer-Automatisierung initialisiert")
     
-    def schritt_1_amazon_download(self, year: int = None) -> bool:
+    def option(self, bereich: str, schluessel: str, standard=None):
+        """Lies eine Option aus config.yaml (z.B. option('verarbeitung', 'worker'))"""
+        return (self.optionen.get(bereich) or {}).get(schluessel, standard)
+    
+    def _alarm(self, art: str, text: str):
+        """Sofortmeldung per Telegram, falls `art` in notifications.telegram.alarme steht"""
+        if self.versand and art in self.alarme:
+            self.versand.sende(text)
+    
+    def beenden(self):
+        """Ausstehende Benachrichtigungen senden und Logs vollständig schreiben"""
+        if self.versand:
+            self.versand.close()
+            self.versand = None
+        if self._protokoll:
+            self._protokoll.stop()
+            self._protokoll = None
+    
+    def _pdf_werkzeuge(self):
+        """PDFProcessor und FileManager (nur beim ersten Aufruf erstellt und importiert)"""
+        if self._processor is None:
+            from src.pdf_processor import PDFProcessor
+
+            self._processor = PDFProcessor(self.config)
+        if self._file_mgr is None:
+            from src.file_manager import FileManager
+            self._file_mgr = FileManager(self.config)
+        return self._processor, self._file_mgr
+    
+    def schritt_1_amazon_download(self, year: int = None, resume: bool = False) -> bool:
         """Schritt 1: Amazon Rechnungen herunterladen"""
         logger.info("=" * 60)
         logger.info("SCHRITT 1: Amazon Rechnungen herunterladen")
         logger.info("=" * 60)
         
         try:
-            downloader = AmazonDownloader(self.config)
-            anzahl = downloader.download_invoices(year)
+            if resume:
+                # Fortsetzen braucht den Checkpoint des Downloaders, daher im selben Prozess
+                downloader = self._erstelle_downloader()
+                downloader.messung = self.messung
+                ergebnisse = downloader.download_all(year, resume=True) or []
+                anzahl = sum(1 for r in ergebnisse if r['status'] == 'ok')
+            else:
+                from src.amazon_downloader import AmazonDownloader
+                downloader = AmazonDownloader(self.config)
+                anzahl = downloader.download_invoices(year)
             
             self.stats["amazon_downloads"] = anzahl
             logger.info(f"✓ {anzahl} Rechnungen heruntergeladen")
@@ -70,6 +236,7 @@ class SteuerAutomation:
             
         except Exception as e:
             logger.error(f"✗ Amazon Download fehlgeschlagen: {e}")
+            self._alarm("fehler", f"❌ Amazon Download fehlgeschlagen: {e}")
             self.stats["fehler"] += 1
             return False
     
@@ -80,8 +247,7 @@ class SteuerAutomation:
         logger.info("=" * 60)
         
         try:
-            processor = PDFProcessor(self.config)
-            file_mgr = FileManager(self.config)
+            processor, file_mgr = self._pdf_werkzeuge()
             
             # Finde alle Amazon PDFs
             pdfs = file_mgr.finde_neue_pdfs()
@@ -92,33 +258,370 @@ class SteuerAutomation:
             
             logger.info(f"Gefunden: {len(pdfs)} PDFs")
             
-            # Verarbeite jede PDF
-            for pdf_path in pdfs:
+            self._verarbeite_pdfs(pdfs, processor, file_mgr)
+            return True
+            
+        except Exception as e:
+            logger.error(f"✗ PDF-Verarbeitung fehlgeschlagen: {e}")
+            return False
+    
+    def _verarbeite_pdfs(self, pdfs, processor, file_mgr, stapel: int = None):
+        """
+        Extrahiere Beträge und lege ab (pdfs darf ein laufender Strom sein)
+        
+        Args:
+            stapel: Ergebnisse sammeln und je `stapel` PDFs gemeinsam ablegen
+                    (None = verarbeitung.ablage_stapel, 1 = sofort ablegen)
+        """
+        from extraktion import ParalleleExtraktion, EXTRAKTOR_VERSION
+        from betrag_cache import BetragCache, CACHE_FILENAME
+        from dubletten import DublettenFilter, DoppelteRechnung, DUPLIKAT_ORDNER, bestellnummer, beiseitelegen
+        from ablage import StapelAblage, AblageFehler
+        
+        bestell_index = OrderIndex.for_directory(self.config.download_dir)
+        manifest = SteuerManifest(self.config.steuer_base_dir)
+        
+        # Bereits abgelegte Rechnungen vor der Extraktion aussortieren
+        dubletten = None
+        if self.option('verarbeitung', 'duplikate_erkennen', True):
+            dubletten = DublettenFilter(manifest, bestell_index)
+        
+        cache = None
+        if self.option('verarbeitung', 'cache', True):
+            cache = BetragCache(
+                Path(self.config.download_dir) / CACHE_FILENAME,
+                version=EXTRAKTOR_VERSION,
+                max_eintraege=self.option('verarbeitung', 'cache_max_eintraege', 50000)
+            )
+        
+        # Beträge parallel extrahieren, Ablage nur im Hauptprozess
+        extraktion = ParalleleExtraktion(
+            self.config_path,
+            processor=processor,
+            worker=self.option('verarbeitung', 'worker'),
+            timeout=self.option('verarbeitung', 'timeout_pro_datei', 60),
+            cache=cache,
+            schnellpfad=self.option('verarbeitung', 'schnellpfad', True),
+            messung=self.messung,
+            duplikat=dubletten.pruefe if dubletten else None
+        )
+        
+        # Ziele im Speicher planen statt pro PDF Ordner zu lesen (Standard: FileManager pro PDF)
+        ablage = None
+        if self.option('verarbeitung', 'stapel_ablage', False):
+            ablage = StapelAblage(
+                self.config.steuer_base_dir,
+                dateien_pro_ordner=self.option('steuer', 'dateien_pro_ordner', 100),
+                max_alter=None if stapel is None else 30
+            )
+        if stapel is None:
+            stapel = self.option('verarbeitung', 'ablage_stapel', 200)
+        wartend = []
+        
+        def abgelegt(pdf_path, betrag, ziel):
+            sha256 = dubletten.merke(pdf_path, ziel) if dubletten else None
+            
+            # Betrag und Ablageort im Bestell-Index vermerken
+            order_id = bestellnummer(pdf_path)
+            if order_id:
+                bestell_index.mark_filed(order_id, betrag, ziel)
+            
+            # Manifest des Steuerjahres für --check, Summen und Duplikate
+            if not manifest.erfasse(ziel, betrag, order_id, sha256):
+                logger.warning(f"⚠ {ziel} liegt nicht in Steuer-YYYY/KWXX, nicht im Manifest")
+            
+            # Statistik
+            self.stats["pdfs_verarbeitet"] += 1
+            if betrag is not None and betrag > 0:
+                self.stats["betraege_erkannt"] += 1
+                self._alarm("rechnung", f"🧾 {ziel.name}")
+            else:
+                self.stats["ohne_betrag"] += 1
+                self._alarm("ohne_betrag", f"⚠ Ohne Betrag: {ziel.name}")
+            
+            logger.info(f"✓ Verarbeitet: {pdf_path.name} → {ziel.name}")
+        
+        def fehlgeschlagen(pdf_path, e):
+            logger.error(f"✗ Fehler bei {pdf_path.name}: {e}")
+            self._alarm("fehler", f"❌ Fehler bei {pdf_path.name}: {e}")
+            self.stats["fehler"] += 1
+            if dubletten:
+                dubletten.freigeben(pdf_path)
+        
+        def ablegen():
+            if not wartend:
+                return
+            ergebnisse = list(wartend)
+            wartend.clear()
+            
+            if ablage is None:
+                for pdf_path, betrag in ergebnisse:
+                    try:
+                        # Verschiebe und benenne um
+                        with self.messung.span('ablage'):
+                            ziel = file_mgr.verarbeite_pdf(pdf_path, betrag)
+                        abgelegt(pdf_path, betrag, ziel)
+                    except Exception as e:
+                        fehlgeschlagen(pdf_path, e)
+                return
+            
+            try:
+                with self.messung.span('ablage'):
+                    plan = ablage.lege_ab(ergebnisse)
+            except AblageFehler as e:
+                # Stapel ist zurückgerollt: einzeln wiederholen, damit nur die defekte PDF fehlt
+                logger.warning(f"⚠ {e}, lege einzeln ab")
+                plan = []
+                for pdf_path, betrag in ergebnisse:
+                    try:
+                        plan += ablage.lege_ab([(pdf_path, betrag)])
+                    except AblageFehler as einzeln:
+                        fehlgeschlagen(pdf_path, einzeln.__cause__ or einzeln)
+            
+            betraege = dict(ergebnisse)
+            for pdf_path, ziel in plan:
                 try:
-                    # Extrahiere Betrag
-                    betrag = processor.extrahiere_betrag(pdf_path)
-                    
-                    # Verschiebe und benenne um
-                    ziel = file_mgr.verarbeite_pdf(pdf_path, betrag)
-                    
-                    # Statistik
-                    self.stats["pdfs_verarbeitet"] += 1
-                    if betrag is not None and betrag > 0:
-                        self.stats["betraege_erkannt"] += 1
-                    else:
-                        self.stats["ohne_betrag"] += 1
-                    
-                    logger.info(f"✓ Verarbeitet: {pdf_path.name} → {ziel.name}")
-                    
+                    abgelegt(pdf_path, betraege[pdf_path], ziel)
                 except Exception as e:
-                    logger.error(f"✗ Fehler bei {pdf_path.name}: {e}")
-                    self.stats["fehler"] += 1
-            
-            return True
+                    fehlgeschlagen(pdf_path, e)
+        
+        try:
+            for pdf_path, betrag, methode, fehler in extraktion.verarbeite(pdfs):
+                if isinstance(fehler, DoppelteRechnung):
+                    # Nicht löschen, nur aus dem Download-Ordner nehmen
+                    logger.warning(f"⚠ Duplikat übersprungen: {pdf_path.name} ({fehler})")
+                    self._alarm("duplikat", f"🗂 Duplikat übersprungen: {pdf_path.name} ({fehler})")
+                    self.stats["duplikate"] += 1
+                    try:
+                        beiseitelegen(pdf_path, Path(self.config.download_dir) / DUPLIKAT_ORDNER)
+                    except OSError as e:
+                        logger.error(f"✗ Duplikat {pdf_path.name} nicht verschiebbar: {e}")
+                    continue
+                
+                if fehler is not None:
+                    fehlgeschlagen(pdf_path, fehler)
+                    continue
+                
+                wartend.append((pdf_path, betrag))
+                if len(wartend) >= stapel:
+                    ablegen()
+        finally:
+            # Auch bei Strg+C das bereits Extrahierte noch ablegen
+            try:
+                ablegen()
+            finally:
+                bestell_index.close()
+                manifest.close()
+                if cache:
+                    cache.close()
+        
+        logger.info(
+            f"Extraktion: {extraktion.statistik['extrahiert']} geparst, "
+            f"{extraktion.statistik['cache_treffer']} aus Cache, "
+            f"{extraktion.statistik['duplikate']} doppelte Inhalte, "
+            f"{extraktion.statistik['bereits_abgelegt']} bereits abgelegt"
+        )
+        if ablage:
+            logger.info(
+                f"Ablage: {ablage.statistik['abgelegt']} Dateien, "
+                f"{ablage.statistik['ordner_gelesen']} Ordner gelesen"
+            )
+        for name, quote in sorted(extraktion.trefferquote().items()):
+            logger.info(f"  Stufe {name:<8} {quote:6.1%} ({extraktion.stufen[name]} PDFs)")
+    
+    def schritt_pipeline(self, year: int = None, resume: bool = False) -> bool:
+        """Schritt 1+2 als Pipeline: jede Rechnung wird direkt nach dem Download verarbeitet"""
+        logger.info("=" * 60)
+        logger.info("SCHRITT 1+2: Download und Verarbeitung (Pipeline)")
+        logger.info("=" * 60)
+        
+        try:
+            processor, file_mgr = self._pdf_werkzeuge()
+            downloader = self._erstelle_downloader()
+        except Exception as e:
+            logger.error(f"✗ Pipeline konnte nicht starten: {e}")
+            self.stats["fehler"] += 1
+            return False
+        
+        # Begrenzte Queue: ist die Extraktion im Rückstand, warten die Downloads
+        puffer = self.option('verarbeitung', 'pipeline_puffer', 8)
+        warteschlange = queue.Queue(maxsize=puffer)
+        ende = object()
+        erfolg = {"download": True}
+        abbruch = threading.Event()
+        
+        def uebergeben(order, pfad):
+            # Blockiert solange die Queue voll ist, außer die Verarbeitung ist abgebrochen
+            while not abbruch.is_set():
+                try:
+                    warteschlange.put(pfad, timeout=1)
+                    return
+                except queue.Full:
+                    continue
+        
+        downloader.on_downloaded = uebergeben
+        downloader.messung = self.messung
+        
+        def produzent():
+            try:
+                ergebnisse = downloader.download_all(year, resume=resume) or []
+                self.stats["amazon_downloads"] = sum(1 for r in ergebnisse if r['status'] == 'ok')
+                logger.info(f"✓ {self.stats['amazon_downloads']} Rechnungen heruntergeladen")
+            except Exception as e:
+                logger.error(f"✗ Amazon Download fehlgeschlagen: {e}")
+                self._alarm("fehler", f"❌ Amazon Download fehlgeschlagen: {e}")
+                self.stats["fehler"] += 1
+                erfolg["download"] = False
+            finally:
+                uebergeben(None, ende)
+        
+        def strom():
+            gesehen = set()
+            while True:
+                try:
+                    pfad = warteschlange.get(timeout=0.5)
+                except queue.Empty:
+                    # Nichts Neues: fertige Ergebnisse trotzdem ablegen
+                    yield None
+                    continue
+                if pfad is ende:
+                    break
+                gesehen.add(pfad)
+                yield pfad
             
+            # Übrige PDFs (z.B. aus abgebrochenen Läufen) im selben Durchgang
+            for pfad in file_mgr.finde_neue_pdfs() or []:
+                if pfad not in gesehen:
+                    yield pfad
+        
+        thread = threading.Thread(target=produzent, name="amazon-download", daemon=True)
+        thread.start()
+        try:
+            self._verarbeite_pdfs(strom(), processor, file_mgr, stapel=1)
         except Exception as e:
             logger.error(f"✗ PDF-Verarbeitung fehlgeschlagen: {e}")
             return False
+        finally:
+            abbruch.set()
+            if thread.is_alive():
+                # Laufende Downloads noch fertig laden, aber keine neuen beginnen
+                logger.info("⏳ Warte auf laufende Downloads...")
+                downloader.stopp.set()
+            thread.join()
+        
+        return erfolg["download"]
+    
+    def _erstelle_downloader(self):
+        """Lade amazon_invoice_downloader.py (amazon.script_path) im selben Prozess"""
+        if self._downloader_modul is None:
+            script_path = Path(self.option('amazon', 'script_path', './amazon_invoice_downloader.py'))
+            sys.path.insert(0, str(script_path.resolve().parent))
+            
+            spec = importlib.util.spec_from_file_location("amazon_invoice_downloader", script_path)
+            self._downloader_modul = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._downloader_modul)
+        
+        return self._downloader_modul.AmazonInvoiceDownloader(
+            self.option('amazon', 'config_path', './amazon_config.yaml')
+        )
+    
+    def beobachten(self, year: int = None):
+        """
+        Dauerbetrieb: neue PDFs im download_dir sofort verarbeiten und
+        Amazon nach Zeitplan crawlen, ohne die Objekte neu aufzubauen
+        """
+        logger.info("=" * 60)
+        logger.info("DAUERBETRIEB: Download-Ordner beobachten")
+        logger.info("=" * 60)
+        
+        from download_watcher import DownloadWatcher
+        from dubletten import RECHNUNG_MUSTER
+        
+        processor, file_mgr = self._pdf_werkzeuge()
+        watcher = DownloadWatcher(self.config.download_dir)
+        stopp = threading.Event()
+        crawl_laeuft = threading.Event()
+        # Downloader des laufenden Crawls, damit das Beenden ihn anhalten kann
+        aktuell = {"downloader": None}
+        intervall = self.option('watch', 'crawl_intervall_minuten', 60) * 60
+        
+        # SIGTERM (systemd, docker stop) beendet wie Strg+C sauber
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopp.set())
+        
+        def crawler():
+            # Downloads landen im download_dir und werden dort vom Watcher erkannt
+            while not stopp.is_set():
+                try:
+                    downloader = self._erstelle_downloader()
+                    downloader.messung = self.messung
+                    aktuell["downloader"] = downloader
+                    if stopp.is_set():
+                        downloader.close()
+                        break
+                    crawl_laeuft.set()
+                    try:
+                        with self.messung.span('crawl'):
+                            ergebnisse = downloader.download_all(year) or []
+                    finally:
+                        crawl_laeuft.clear()
+                        aktuell["downloader"] = None
+                    neu = sum(1 for r in ergebnisse if r['status'] == 'ok')
+                    self.stats["amazon_downloads"] += neu
+                    logger.info(f"✓ Crawl: {neu} neue Rechnungen")
+                except Exception as e:
+                    logger.error(f"✗ Amazon Download fehlgeschlagen: {e}")
+                    self._alarm("fehler", f"❌ Amazon Download fehlgeschlagen: {e}")
+                    self.stats["fehler"] += 1
+                self._exportiere_messwerte()
+                stopp.wait(intervall)
+        
+        def strom():
+            # Liegengebliebene PDFs zuerst, danach jede neue Datei sofort
+            for pfad in file_mgr.finde_neue_pdfs() or []:
+                yield pfad
+            zurueckgestellt = []
+            while not stopp.is_set():
+                pfad = watcher.wait_for_new(0.5)
+                if pfad is not None and crawl_laeuft.is_set() and not RECHNUNG_MUSTER.match(pfad.name):
+                    # Im Browser-Modus benennt der Downloader Chromes Datei gleich
+                    # noch in Amazon_Rechnung_<id>.pdf um; erst danach ablegen
+                    zurueckgestellt.append(pfad)
+                    continue
+                if pfad is None:
+                    # Verschobene PDFs vergessen, damit ein erneuter Download auffällt
+                    watcher.forget_missing()
+                    self.messung.kuerzen()
+                    if zurueckgestellt and not crawl_laeuft.is_set():
+                        # Was nach dem Crawl noch unter fremdem Namen liegt, kam von außen
+                        yield from [p for p in zurueckgestellt if p.exists()]
+                        zurueckgestellt.clear()
+                yield pfad
+        
+        crawl_thread = None
+        if intervall > 0:
+            crawl_thread = threading.Thread(target=crawler, name="amazon-crawl", daemon=True)
+            crawl_thread.start()
+            logger.info(f"Amazon-Crawl alle {intervall / 60:g} Minuten")
+        logger.info(f"Beobachte {self.config.download_dir} "
+                    f"({'inotify' if watcher.uses_inotify else 'Polling'})")
+        
+        try:
+            self._verarbeite_pdfs(strom(), processor, file_mgr, stapel=1)
+        except KeyboardInterrupt:
+            logger.info("⚠ Dauerbetrieb durch Benutzer beendet")
+        finally:
+            stopp.set()
+            downloader = aktuell["downloader"]
+            if downloader is not None:
+                # Laufende Downloads fertig laden, Browser und Index sauber schließen
+                logger.info("⏳ Warte auf laufenden Crawl...")
+                downloader.stopp.set()
+            if crawl_thread:
+                crawl_thread.join()
+            watcher.close()
+        
+        self.schritt_3_aufraeumen()
+        self.zeige_zusammenfassung()
     
     def schritt_3_aufraeumen(self):
         """Schritt 3: Aufräumen (temporäre Dateien)"""
@@ -127,7 +630,7 @@ class SteuerAutomation:
         logger.info("=" * 60)
         
         try:
-            file_mgr = FileManager(self.config)
+            _, file_mgr = self._pdf_werkzeuge()
             file_mgr.cleanup()
             logger.info("✓ Aufräumen abgeschlossen")
         except Exception as e:
@@ -140,6 +643,14 @@ class SteuerAutomation:
         logger.info("=" * 60)
         
         try:
+            if self.versand:
+                # Versand im Hintergrund, beenden() wartet am Ende darauf
+                from telegram_versand import formatiere_zusammenfassung
+                self.versand.sende(formatiere_zusammenfassung(self.stats))
+                logger.info("✓ Benachrichtigung eingereiht")
+                return
+            
+            from src.notification import Notification
             notifier = Notification(self.config)
             notifier.sende_zusammenfassung(self.stats)
             logger.info("✓ Benachrichtigung gesendet")
@@ -149,7 +660,9 @@ class SteuerAutomation:
     def zeige_zusammenfassung(self):
         """Zeige finale Zusammenfassung"""
         self.stats["end_zeit"] = datetime.now()
-        dauer = (self.stats["end_zeit"] - self.stats["start_zeit"]).seconds
+        dauer = time.perf_counter() - self.start_monoton
+        self.stats["dauer_s"] = round(dauer, 3)
+        self.stats["stufen"] = self.messung.zusammenfassung()
         
         logger.info("=" * 60)
         logger.info("ZUSAMMENFASSUNG")
@@ -158,44 +671,83 @@ class SteuerAutomation:
         logger.info(f"PDFs verarbeitet:     {self.stats['pdfs_verarbeitet']}")
         logger.info(f"Beträge erkannt:      {self.stats['betraege_erkannt']}")
         logger.info(f"Ohne Betrag:          {self.stats['ohne_betrag']}")
+        logger.info(f"Duplikate:            {self.stats['duplikate']}")
         logger.info(f"Fehler:               {self.stats['fehler']}")
-        logger.info(f"Dauer:                {dauer}s")
+        logger.info(f"Dauer:                {dauer:.1f}s")
         logger.info("=" * 60)
         
+        if self.stats["stufen"]:
+            logger.info(f"{'Stufe':<28}{'Anzahl':>8}{'Summe':>10}{'p50':>11}{'p95':>11}")
+            for stufe, werte in sorted(self.stats["stufen"].items()):
+                logger.info(
+                    f"{stufe:<28}{werte['anzahl']:>8}{werte['summe_s']:>9.1f}s"
+                    f"{werte['p50_ms']:>9.1f}ms{werte['p95_ms']:>9.1f}ms"
+                )
+            logger.info("=" * 60)
+        
+        self._exportiere_messwerte()
+        
         if self.stats['ohne_betrag'] > 0:
             logger.warning(f"{self.stats['ohne_betrag']} Dateien erfordern manuelle Prüfung!")
         
         return self.stats
     
-    def ausfuehren(self, nur_download: bool = False, nur_verarbeitung: bool = False):
+    def _exportiere_messwerte(self):
+        """Messwerte nach messung.export_pfad / --metriken schreiben (falls gesetzt)"""
+        if not self.metriken_pfad:
+            return
+        try:
+            self.messung.exportiere(self.metriken_pfad, extra={
+                schluessel: wert for schluessel, wert in self.stats.items() if schluessel != "stufen"
+            })
+            logger.info(f"Messwerte gespeichert: {self.metriken_pfad}")
+        except OSError as e:
+            logger.warning(f"Messwerte konnten nicht gespeichert werden: {e}")
+    
+    def ausfuehren(self, nur_download: bool = False, nur_verarbeitung: bool = False,
+                   pipeline: bool = False, year: int = None, resume: bool = False):
         """
         Führe komplette Automatisierung aus
         
         Args:
             nur_download: Nur Amazon Download ausführen
             nur_verarbeitung: Nur PDF Verarbeitung ausführen
+            pipeline: Download und Verarbeitung überlappend statt nacheinander
+            year: Nur Rechnungen aus diesem Jahr herunterladen
+            resume: Abgebrochenen Download-Lauf aus dem Checkpoint fortsetzen
+                    (bereits abgelegte PDFs werden ohnehin nicht erneut verarbeitet)
         """
         logger.info("🚀 Steuer-Automatisierung gestartet")
         
         erfolg = True
         
-        # Schritt 1: Amazon Download
-        if not nur_verarbeitung:
-            if not self.schritt_1_amazon_download():
-                erfolg = False
-        
-        # Schritt 2: PDF Verarbeitung
-        if not nur_download:
-            if not self.schritt_2_pdfs_verarbeiten():
-                erfolg = False
+        if pipeline and not nur_download and not nur_verarbeitung:
+            # Schritt 1+2 überlappend
+            with self.messung.span('schritt_pipeline'):
+                if not self.schritt_pipeline(year, resume):
+                    erfolg = False
+        else:
+            # Schritt 1: Amazon Download
+            if not nur_verarbeitung:
+                with self.messung.span('schritt_1_amazon_download'):
+                    if not self.schritt_1_amazon_download(year, resume):
+                        erfolg = False
+            
+            # Schritt 2: PDF Verarbeitung
+            if not nur_download:
+                with self.messung.span('schritt_2_pdfs_verarbeiten'):
+                    if not self.schritt_2_pdfs_verarbeiten():
+                        erfolg = False
         
         # Schritt 3: Aufräumen
         if not nur_download and not nur_verarbeitung:
-            self.schritt_3_aufraeumen()
+            with self.messung.span('schritt_3_aufraeumen'):
+                self.schritt_3_aufraeumen()
         
         # Schritt 4: Benachrichtigung
         if not nur_download and not nur_verarbeitung:
-            self.schritt_4_benachrichtigung()
+            with self.messung.span('schritt_4_benachrichtigung'):
+                self.schritt_4_benachrichtigung()
         
         # Zusammenfassung
         self.zeige_zusammenfassung()
@@ -217,6 +769,14 @@ Beispiele:
   python main.py --only-download     # Nur Download
   python main.py --only-process      # Nur Verarbeitung
   python main.py --check             # Nur Prüfung ohne Betrag
+  python main.py --reindex           # Manifest aus dem Steuer-Ordner neu aufbauen
+  python main.py --dedup             # Doppelte Rechnungen im Archiv aufräumen
+  python main.py --bericht --year 2025 --format csv json
+  python main.py --pipeline          # Download + Verarbeitung überlappend
+  python main.py --profile sampling  # Mit Sampling-Profiler
+  python main.py --metriken lauf.prom  # Messwerte als Prometheus-Textfile
+  python main.py --resume            # Abgebrochenen Lauf fortsetzen
+  python main.py --watch             # Dauerbetrieb mit Crawl nach Zeitplan
         """
     )
     
@@ -238,12 +798,72 @@ Beispiele:
         help='Nur PDF Verarbeitung ausführen'
     )
     
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='Download und Verarbeitung überlappend ausführen'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Dauerbetrieb: neue PDFs sofort verarbeiten, Amazon nach Zeitplan crawlen'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Abgebrochenen Download-Lauf aus dem Checkpoint fortsetzen'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        choices=['cprofile', 'sampling'],
+        help='Profiling aktivieren (Ergebnis im log_dir)'
+    )
+    
+    parser.add_argument(
+        '--metriken',
+        help='Messwerte pro Stufe speichern (.json oder .prom für Prometheus)'
+    )
+    
     parser.add_argument(
         '--check',
         action='store_true',
         help='Nur Dateien ohne Betrag prüfen'
     )
     
+    parser.add_argument(
+        '--reindex',
+        action='store_true',
+        help='Steuer-Manifest aus dem Dateisystem neu aufbauen (mit --year nur dieses Jahr)'
+    )
+    
+    parser.add_argument(
+        '--dedup',
+        action='store_true',
+        help='Inhaltsgleiche Rechnungen im Steuer-Ordner nach _Duplikate verschieben'
+    )
+    
+    parser.add_argument(
+        '--bericht',
+        action='store_true',
+        help='Wochen- und Jahressummen exportieren (mit --year nur dieses Jahr)'
+    )
+    
+    parser.add_argument(
+        '--format',
+        nargs='+',
+        choices=['csv', 'json'],
+        default=['csv'],
+        help='Format(e) für --bericht (Standard: csv)'
+    )
+    
+    parser.add_argument(
+        '--ausgabe',
+        help='Zielordner für --bericht (Standard: steuer_dir)'
+    )
+    
     parser.add_argument(
         '--config',
         default='config.yaml',
@@ -251,24 +871,70 @@ Beispiele:
     )
     
     args = parser.parse_args()
+    global logger
     
     # Nur Prüfung
     if args.check:
-        from src.file_manager import FileManager
         config = Config(args.config)
         logger = setup_logging(config.log_dir, config.log_level)
-        file_mgr = FileManager(config)
-        file_mgr.zeige_dateien_ohne_betrag()
+        zeige_ohne_betrag(config, args.year)
+        return
+    
+    # Manifest reparieren
+    if args.reindex:
+        config = Config(args.config)
+        logger = setup_logging(config.log_dir, config.log_level)
+        manifest_neu_aufbauen(config, args.year)
+        return
+    
+    # Archiv von Duplikaten befreien
+    if args.dedup:
+        config = Config(args.config)
+        logger = setup_logging(config.log_dir, config.log_level)
+        archiv_bereinigen(config)
+        return
+    
+    # Bericht für den Steuerberater
+    if args.bericht:
+        config = Config(args.config)
+        logger = setup_logging(config.log_dir, config.log_level)
+        erstelle_berichte(config, args.year, args.format, args.ausgabe)
         return
     
     # Hauptausführung
     try:
         app = SteuerAutomation(args.config)
+        if args.metriken:
+            app.metriken_pfad = args.metriken
         
-        erfolg = app.ausfuehren(
-            nur_download=args.only_download,
-            nur_verarbeitung=args.only_process
-        )
+        profiler = None
+        if args.profile:
+            endung = "prof" if args.profile == "cprofile" else "collapsed"
+            profiler = Profiler(
+                args.profile,
+                Path(app.config.log_dir) / f"profil_{datetime.now():%Y%m%d_%H%M%S}.{endung}"
+            )
+            profiler.start()
+        
+        try:
+            if args.watch:
+                app.beobachten(year=args.year)
+                erfolg = True
+            else:
+                erfolg = app.ausfuehren(
+                    nur_download=args.only_download,
+                    nur_verarbeitung=args.only_process,
+                    pipeline=args.pipeline or app.option('verarbeitung', 'pipeline', False),
+                    year=args.year,
+                    resume=args.resume
+                )
+        finally:
+            try:
+                if profiler:
+                    pfad = profiler.stop()
+                    logger.info(f"Profil gespeichert: {pfad}")
+            finally:
+                app.beenden()
         
         sys.exit(0 if erfolg else 1)
         
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Steuer-Manifest
+SQLite-Index pro Steuerjahr (Steuer-YYYY/.manifest.sqlite3) aller abgelegten
+Rechnungen mit Kalenderwoche, Betrag und Status, damit --check und Summen
+nicht den ganzen Steuer-Ordner durchsuchen müssen
+"""
+
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from collections import defaultdict
+
+from order_index import file_sha256
+
+MANIFEST_FILENAME = ".manifest.sqlite3"
+
+# Status einer abgelegten Datei
+OK = "ok"
+OHNE_BETRAG = "ohne_betrag"
+
+ORDNER_JAHR = re.compile(r"^Steuer-(\d{4})$")
+# KWXX, bei vollen Ordnern (steuer.dateien_pro_ordner) weiter in KWXX_2, KWXX_3, ...
+ORDNER_KW = re.compile(r"^KW(\d{2})(?:_\d+)?$")
+# YYYY_KWXX_BETRAG_EUR.pdf, z.B. 2024_KW01_0042,50_EUR.pdf
+DATEINAME = re.compile(r"^(\d{4})_KW(\d{2})_(\d+(?:\.\d{3})*,\d{2})_EUR", re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dateien (
+    pfad     TEXT PRIMARY KEY,
+    kw       INTEGER NOT NULL,
+    betrag   REAL,
+    status   TEXT NOT NULL,
+    order_id TEXT,
+    groesse  INTEGER,
+    erfasst  TEXT NOT NULL,
+    sha256   TEXT
+);
+CREATE INDEX IF NOT EXISTS dateien_status ON dateien(status);
+CREATE INDEX IF NOT EXISTS dateien_kw ON dateien(kw);
+
+-- Laufende Summen pro KW (in Cent, damit Addieren/Abziehen exakt bleibt)
+CREATE TABLE IF NOT EXISTS wochen (
+    kw          INTEGER PRIMARY KEY,
+    anzahl      INTEGER NOT NULL DEFAULT 0,
+    ohne_betrag INTEGER NOT NULL DEFAULT 0,
+    summe_cent  INTEGER NOT NULL DEFAULT 0
+);
+CREATE TRIGGER IF NOT EXISTS wochen_plus AFTER INSERT ON dateien BEGIN
+    INSERT INTO wochen (kw) SELECT NEW.kw WHERE NOT EXISTS (SELECT 1 FROM wochen WHERE kw = NEW.kw);
+    UPDATE wochen SET
+        anzahl = anzahl + 1,
+        ohne_betrag = ohne_betrag + (NEW.status = 'ohne_betrag'),
+        summe_cent = summe_cent + CASE WHEN NEW.status = 'ok'
+                                       THEN CAST(ROUND(NEW.betrag * 100) AS INTEGER) ELSE 0 END
+    WHERE kw = NEW.kw;
+END;
+CREATE TRIGGER IF NOT EXISTS wochen_minus AFTER DELETE ON dateien BEGIN
+    UPDATE wochen SET
+        anzahl = anzahl - 1,
+        ohne_betrag = ohne_betrag - (OLD.status = 'ohne_betrag'),
+        summe_cent = summe_cent - CASE WHEN OLD.status = 'ok'
+                                       THEN CAST(ROUND(OLD.betrag * 100) AS INTEGER) ELSE 0 END
+    WHERE kw = OLD.kw;
+    DELETE FROM wochen WHERE kw = OLD.kw AND anzahl = 0;
+END;
+
+-- Zustand des Manifests, z.B. ob vorhandene Dateien eingelesen wurden
+CREATE TABLE IF NOT EXISTS meta (
+    schluessel TEXT PRIMARY KEY,
+    wert       TEXT
+);
+"""
+
+# Manifeste ohne wochen-Tabelle (ältere Version) einmalig nachrechnen
+WOCHEN_NACHRECHNEN = """
+INSERT INTO wochen (kw, anzahl, ohne_betrag, summe_cent)
+SELECT kw, COUNT(*), SUM(status = 'ohne_betrag'),
+       SUM(CASE WHEN status = 'ok' THEN CAST(ROUND(betrag * 100) AS INTEGER) ELSE 0 END)
+FROM dateien GROUP BY kw
+"""
+
+
+def betrag_aus_dateiname(name: str):
+    """Betrag aus 'YYYY_KWXX_0042,50_EUR.pdf' (None falls keiner im Namen steht)"""
+    treffer = DATEINAME.match(name)
+    if not treffer:
+        return None
+    return float(treffer.group(3).replace(".", "").replace(",", "."))
+
+
+def status_fuer(betrag) -> str:
+    return OK if betrag is not None and betrag > 0 else OHNE_BETRAG
+
+
+class SteuerManifest:
+    """Manifeste aller Steuerjahre unter `steuer_dir` (Verbindungen werden bei Bedarf geöffnet)"""
+
+    def __init__(self, steuer_dir):
+        self.steuer_dir = Path(steuer_dir).expanduser()
+        self.lock = threading.Lock()
+        self._verbindungen = {}
+
+    def _jahr_dir(self, jahr: int) -> Path:
+        return self.steuer_dir / f"Steuer-{jahr}"
+
+    def _conn(self, jahr: int):
+        conn = self._verbindungen.get(jahr)
+        if conn is None:
+            pfad = self._jahr_dir(jahr) / MANIFEST_FILENAME
+            pfad.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(pfad), timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            spalten = {row['name'] for row in conn.execute("PRAGMA table_info(dateien)")}
+            if 'sha256' not in spalten:
+                conn.execute("ALTER TABLE dateien ADD COLUMN sha256 TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS dateien_sha256 ON dateien(sha256)")
+            if (conn.execute("SELECT COUNT(*) FROM wochen").fetchone()[0] == 0
+                    and conn.execute("SELECT COUNT(*) FROM dateien").fetchone()[0] > 0):
+                conn.execute(WOCHEN_NACHRECHNEN)
+            conn.commit()
+            self._nachfuellen(conn, jahr)
+            self._verbindungen[jahr] = conn
+        return conn
+
+    def _nachfuellen(self, conn, jahr: int):
+        """
+        Dateien, die schon vor dem Manifest im Jahresordner lagen, einmalig eintragen
+
+        Ohne diesen Schritt würde das erste erfasse() ein Manifest anlegen,
+        das nur die neue Datei kennt. Vorhandene Einträge bleiben erhalten,
+        Hashes trägt ergaenze_hashes() bei Bedarf nach.
+        """
+        if conn.execute("SELECT 1 FROM meta WHERE schluessel = 'nachgefuellt'").fetchone():
+            return
+        with conn:
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO dateien (pfad, kw, betrag, status, groesse, erfasst)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                list(self._eintraege_von_disk(jahr))
+            )
+            conn.execute("INSERT INTO meta (schluessel, wert) VALUES ('nachgefuellt', ?)",
+                         (datetime.now().isoformat(timespec="seconds"),))
+
+    def oeffne(self, jahr: int):
+        """Manifest eines Jahres öffnen; ein neues liest vorhandene Dateien ein"""
+        with self.lock:
+            self._conn(jahr)
+
+    def jahre(self):
+        """Alle Steuerjahre mit Ordner (aufsteigend)"""
+        if not self.steuer_dir.exists():
+            return []
+        return sorted(
+            int(treffer.group(1))
+            for eintrag in self.steuer_dir.iterdir()
+            if eintrag.is_dir() and (treffer := ORDNER_JAHR.match(eintrag.name))
+        )
+
+    def hat_manifest(self, jahr: int) -> bool:
+        return (self._jahr_dir(jahr) / MANIFEST_FILENAME).exists()
+
+    def einordnen(self, pfad):
+        """(jahr, kw) einer Datei aus Steuer-YYYY/KWXX/ bzw. dem Dateinamen, sonst None"""
+        pfad = Path(pfad)
+        jahr = ORDNER_JAHR.match(pfad.parent.parent.name)
+        kw = ORDNER_KW.match(pfad.parent.name)
+        if jahr and kw:
+            return int(jahr.group(1)), int(kw.group(1))
+        treffer = DATEINAME.match(pfad.name)
+        if treffer:
+            return int(treffer.group(1)), int(treffer.group(2))
+        return None
+
+    def erfasse(self, pfad, betrag, order_id=None, sha256=None):
+        """
+        Abgelegte Datei eintragen (nach FileManager.verarbeite_pdf)
+
+        Returns:
+            True falls eingetragen, False falls die Datei keinem Jahr/KW zuzuordnen ist
+        """
+        pfad = Path(pfad)
+        einordnung = self.einordnen(pfad)
+        if einordnung is None:
+            return False
+        jahr, kw = einordnung
+
+        relativ = self._relativ(jahr, pfad)
+        with self.lock:
+            conn = self._conn(jahr)
+            with conn:
+                # DELETE + INSERT statt REPLACE, damit beide Summen-Trigger laufen
+                conn.execute("DELETE FROM dateien WHERE pfad = ?", (relativ,))
+                conn.execute(
+                    """
+                    INSERT INTO dateien (pfad, kw, betrag, status, order_id, groesse, erfasst, sha256)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        relativ, kw, betrag, status_fuer(betrag), order_id,
+                        pfad.stat().st_size if pfad.exists() else None,
+                        datetime.now().isoformat(timespec="seconds"), sha256
+                    )
+                )
+        return True
+
+    def entferne(self, pfad):
+        """Datei austragen (z.B. nach manuellem Löschen oder Verschieben)"""
+        einordnung = self.einordnen(pfad)
+        if einordnung is None:
+            return
+        jahr = einordnung[0]
+        with self.lock:
+            conn = self._conn(jahr)
+            with conn:
+                conn.execute("DELETE FROM dateien WHERE pfad = ?", (self._relativ(jahr, Path(pfad)),))
+
+    def _relativ(self, jahr, pfad: Path) -> str:
+        try:
+            return str(pfad.resolve().relative_to(self._jahr_dir(jahr).resolve()))
+        except ValueError:
+            return str(pfad)
+
+    def _eintraege_von_disk(self, jahr: int, ordner=None):
+        """Einträge aus dem Dateisystem (alle KW-Ordner oder nur `ordner`)"""
+        jahr_dir = self._jahr_dir(jahr)
+        if ordner is None:
+            ordner = [d for d in jahr_dir.iterdir() if d.is_dir() and ORDNER_KW.match(d.name)]
+        jetzt = datetime.now().isoformat(timespec="seconds")
+        for kw_dir in ordner:
+            kw = int(ORDNER_KW.match(kw_dir.name).group(1))
+            for datei in kw_dir.iterdir():
+                if datei.suffix.lower() != ".pdf" or not datei.is_file():
+                    continue
+                betrag = betrag_aus_dateiname(datei.name)
+                yield (
+                    f"{kw_dir.name}/{datei.name}", kw, betrag, status_fuer(betrag),
+                    datei.stat().st_size, jetzt
+                )
+
+    def _ersetze(self, jahr: int, eintraege, kw=None):
+        """Einträge eines Jahres (oder einer KW) durch den Stand auf der Platte ersetzen"""
+        bedingung, params = ("WHERE kw = ?", (kw,)) if kw is not None else ("", ())
+        with self.lock:
+            # Bestellnummer und Hash stehen nicht im Dateinamen, daher übernehmen
+            bekannt = {
+                row['pfad']: (row['order_id'], row['sha256'])
+                for row in self._conn(jahr).execute(
+                    f"SELECT pfad, order_id, sha256 FROM dateien {bedingung}", params
+                )
+            }
+
+        # Nur neue Dateien hashen (außerhalb der Transaktion)
+        zeilen = []
+        for p, k, b, s, g, e in eintraege:
+            order_id, sha256 = bekannt.get(p, (None, None))
+            if sha256 is None:
+                sha256 = file_sha256(self._jahr_dir(jahr) / p)
+            zeilen.append((p, k, b, s, order_id, g, e, sha256))
+
+        with self.lock:
+            conn = self._conn(jahr)
+            with conn:
+                conn.execute(f"DELETE FROM dateien {bedingung}", params)
+                conn.executemany(
+                    """
+                    INSERT INTO dateien (pfad, kw, betrag, status, order_id, groesse, erfasst, sha256)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    zeilen
+                )
+                return conn.execute(
+                    f"SELECT COUNT(*) FROM dateien {bedingung}", params
+                ).fetchone()[0]
+
+    def neu_aufbauen(self, jahr: int = None):
+        """
+        Reparatur: Manifest(e) aus dem Dateisystem neu erstellen
+
+        Returns:
+            {jahr: anzahl_dateien}
+        """
+        jahre = [jahr] if jahr else self.jahre()
+        return {j: self._ersetze(j, list(self._eintraege_von_disk(j))) for j in jahre}
+
+    def aktualisiere_kw(self, jahr: int, kw: int):
+        """Nur die Ordner einer KW (samt Überlauf-Ordnern) neu einlesen"""
+        jahr_dir = self._jahr_dir(jahr)
+        ordner = [
+            d for d in (jahr_dir.glob(f"KW{kw:02d}*") if jahr_dir.is_dir() else [])
+            if d.is_dir() and ORDNER_KW.match(d.name) and int(ORDNER_KW.match(d.name).group(1)) == kw
+        ]
+        return self._ersetze(jahr, list(self._eintraege_von_disk(jahr, ordner)), kw=kw)
+
+    def ohne_betrag(self, jahr: int = None, pruefen: bool = True):
+        """
+        Dateien ohne erkannten Betrag
+
+        Mit `pruefen` werden KW-Ordner, deren Einträge nicht mehr zur Platte
+        passen (z.B. manuell umbenannt), neu eingelesen.
+
+        Returns:
+            Liste von dicts (jahr, kw, pfad) nach Jahr und KW sortiert
+        """
+        ergebnis = []
+        for j in ([jahr] if jahr else self.jahre()):
+            if not self.hat_manifest(j):
+                continue
+            with self.lock:
+                zeilen = self._conn(j).execute(
+                    "SELECT pfad, kw FROM dateien WHERE status = ? ORDER BY kw, pfad", (OHNE_BETRAG,)
+                ).fetchall()
+
+            if pruefen:
+                veraltet = {z['kw'] for z in zeilen if not (self._jahr_dir(j) / z['pfad']).exists()}
+                if veraltet:
+                    for kw in veraltet:
+                        self.aktualisiere_kw(j, kw)
+                    with self.lock:
+                        zeilen = self._conn(j).execute(
+                            "SELECT pfad, kw FROM dateien WHERE status = ? ORDER BY kw, pfad",
+                            (OHNE_BETRAG,)
+                        ).fetchall()
+
+            ergebnis.extend(
+                {"jahr": j, "kw": z["kw"], "pfad": self._jahr_dir(j) / z["pfad"]} for z in zeilen
+            )
+        return ergebnis
+
+    def _alle(self, spalte: str):
+        """{wert: absoluter Pfad} einer Spalte über alle Jahre mit Manifest"""
+        ergebnis = {}
+        for jahr in self.jahre():
+            if not self.hat_manifest(jahr):
+                continue
+            with self.lock:
+                zeilen = self._conn(jahr).execute(
+                    f"SELECT {spalte}, pfad FROM dateien WHERE {spalte} IS NOT NULL"
+                ).fetchall()
+            for wert, pfad in zeilen:
+                ergebnis.setdefault(wert, self._jahr_dir(jahr) / pfad)
+        return ergebnis
+
+    def hashes(self):
+        """{sha256: Pfad} aller abgelegten Dateien"""
+        return self._alle("sha256")
+
+    def bestellungen(self):
+        """{Bestellnummer: Pfad} aller abgelegten Dateien mit bekannter Bestellung"""
+        return self._alle("order_id")
+
+    def ergaenze_hashes(self):
+        """Fehlende Hashes (z.B. aus Manifesten vor der Duplikaterkennung) nachtragen"""
+        anzahl = 0
+        for jahr in self.jahre():
+            if not self.hat_manifest(jahr):
+                continue
+            with self.lock:
+                offen = [row[0] for row in self._conn(jahr).execute(
+                    "SELECT pfad FROM dateien WHERE sha256 IS NULL"
+                )]
+            werte = []
+            for pfad in offen:
+                datei = self._jahr_dir(jahr) / pfad
+                if datei.exists():
+                    werte.append((file_sha256(datei), pfad))
+            with self.lock:
+                conn = self._conn(jahr)
+                with conn:
+                    conn.executemany("UPDATE dateien SET sha256 = ? WHERE pfad = ?", werte)
+            anzahl += len(werte)
+        return anzahl
+
+    def doppelte(self, spalte: str = "sha256"):
+        """
+        Gruppen von Dateien mit gleichem Hash (bzw. gleicher Bestellnummer) über alle Jahre
+
+        Returns:
+            Liste von Listen mit dicts (jahr, pfad, erfasst, order_id, betrag, sha256),
+            älteste Ablage zuerst
+        """
+        gruppen = defaultdict(list)
+        for jahr in self.jahre():
+            if not self.hat_manifest(jahr):
+                continue
+            with self.lock:
+                zeilen = self._conn(jahr).execute(
+                    f"SELECT {spalte} AS schluessel, pfad, erfasst, order_id, betrag, sha256 "
+                    f"FROM dateien WHERE {spalte} IS NOT NULL"
+                ).fetchall()
+            for z in zeilen:
+                gruppen[z["schluessel"]].append({
+                    "jahr": jahr, "pfad": self._jahr_dir(jahr) / z["pfad"],
+                    "erfasst": z["erfasst"], "order_id": z["order_id"], "betrag": z["betrag"],
+                    "sha256": z["sha256"],
+                })
+        return [
+            sorted(eintraege, key=lambda e: (e["erfasst"], e["order_id"] is None, str(e["pfad"])))
+            for eintraege in gruppen.values() if len(eintraege) > 1
+        ]
+
+    def summen_pro_kw(self, jahr: int):
+        """[{kw, anzahl, ohne_betrag, summe}] eines Jahres aus den laufenden Summen (O(Wochen))"""
+        if not self.hat_manifest(jahr):
+            return []
+        with self.lock:
+            zeilen = self._conn(jahr).execute(
+                "SELECT kw, anzahl, ohne_betrag, summe_cent FROM wochen ORDER BY kw"
+            ).fetchall()
+        return [
+            {"kw": z["kw"], "anzahl": z["anzahl"], "ohne_betrag": z["ohne_betrag"],
+             "summe": z["summe_cent"] / 100}
+            for z in zeilen
+        ]
+
+    def summen_pro_jahr(self):
+        """[{jahr, anzahl, ohne_betrag, summe}] aller Jahre mit Manifest"""
+        ergebnis = []
+        for jahr in self.jahre():
+            wochen = self.summen_pro_kw(jahr)
+            if wochen:
+                ergebnis.append({
+                    "jahr": jahr,
+                    "anzahl": sum(w["anzahl"] for w in wochen),
+                    "ohne_betrag": sum(w["ohne_betrag"] for w in wochen),
+                    "summe": round(sum(w["summe"] for w in wochen), 2),
+                })
+        return ergebnis
+
+    def close(self):
+        with self.lock:
+            for conn in self._verbindungen.values():
+                conn.close()
+            self._verbindungen.clear()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Messung
+Hochauflösende Zeitmessung pro Stufe (Spans), Export als JSON oder
+Prometheus-Textfile und optionales Profiling (cProfile / Sampling)
+"""
+
+import sys
+import json
+import time
+import threading
+import collections
+from pathlib import Path
+from contextlib import contextmanager
+
+
+def perzentil(werte, p):
+    """p-Perzentil (Nearest-Rank) einer unsortierten Liste, None falls leer"""
+    if not werte:
+        return None
+    werte = sorted(werte)
+    rang = max(1, int(round(p / 100 * len(werte) + 0.5)))
+    return werte[min(rang, len(werte)) - 1]
+
+
+class Messung:
+    """Thread-sichere Sammlung von Dauern (Sekunden) pro Stufe"""
+
+    def __init__(self):
+        self.dauern = collections.defaultdict(list)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stufe: str):
+        """Miss die Dauer des with-Blocks (monotone Uhr)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.erfasse(stufe, time.perf_counter() - start)
+
+    def erfasse(self, stufe: str, sekunden: float):
+        with self.lock:
+            self.dauern[stufe].append(sekunden)
+
+    def erfasse_alle(self, zeiten: dict):
+        """Mehrere Messwerte auf einmal (z.B. aus einem Worker-Prozess)"""
+        for stufe, sekunden in (zeiten or {}).items():
+            self.erfasse(stufe, sekunden)
+
+    def kuerzen(self, behalten: int = 10000):
+        """Pro Stufe nur die letzten `behalten` Werte aufheben (Dauerbetrieb)"""
+        with self.lock:
+            for werte in self.dauern.values():
+                if len(werte) > behalten:
+                    del werte[:-behalten]
+
+    def zusammenfassung(self):
+        """{stufe: {anzahl, summe_s, p50_ms, p95_ms, max_ms}}"""
+        with self.lock:
+            kopie = {stufe: list(werte) for stufe, werte in self.dauern.items()}
+        return {
+            stufe: {
+                "anzahl": len(werte),
+                "summe_s": round(sum(werte), 4),
+                "p50_ms": round(perzentil(werte, 50) * 1000, 2),
+                "p95_ms": round(perzentil(werte, 95) * 1000, 2),
+                "max_ms": round(max(werte) * 1000, 2),
+            }
+            for stufe, werte in kopie.items()
+        }
+
+    def schreibe_json(self, pfad, extra=None):
+        daten = {"stufen": self.zusammenfassung()}
+        daten.update(extra or {})
+        Path(pfad).write_text(json.dumps(daten, indent=2, ensure_ascii=False, default=str),
+                              encoding="utf-8")
+
+    def schreibe_prometheus(self, pfad, extra=None):
+        """Prometheus-Textfile (für den node_exporter textfile collector)"""
+        zeilen = [
+            "# HELP steuer_stufe_sekunden Dauer pro Stufe",
+            "# TYPE steuer_stufe_sekunden summary",
+        ]
+        for stufe, werte in sorted(self.zusammenfassung().items()):
+            label = f'stufe="{stufe}"'
+            zeilen.append(f'steuer_stufe_sekunden{{{label},quantile="0.5"}} {round(werte["p50_ms"] / 1000, 6)}')
+            zeilen.append(f'steuer_stufe_sekunden{{{label},quantile="0.95"}} {round(werte["p95_ms"] / 1000, 6)}')
+            zeilen.append(f'steuer_stufe_sekunden_sum{{{label}}} {werte["summe_s"]}')
+            zeilen.append(f'steuer_stufe_sekunden_count{{{label}}} {werte["anzahl"]}')
+        for name, wert in (extra or {}).items():
+            if isinstance(wert, (int, float)) and not isinstance(wert, bool):
+                zeilen.append(f"# TYPE steuer_{name} gauge")
+                zeilen.append(f"steuer_{name} {wert}")
+
+        # Atomar ersetzen, damit der Collector nie eine halbe Datei liest
+        pfad = Path(pfad)
+        temp = pfad.with_name(pfad.name + ".tmp")
+        temp.write_text("\n".join(zeilen) + "\n", encoding="utf-8")
+        temp.replace(pfad)
+
+    def exportiere(self, pfad, extra=None):
+        """Export nach Dateiendung: .prom → Prometheus, sonst JSON"""
+        if str(pfad).endswith(".prom"):
+            self.schreibe_prometheus(pfad, extra)
+        else:
+            self.schreibe_json(pfad, extra)
+
+
+class Profiler:
+    """
+    Optionales Profiling des gesamten Laufs
+
+    art="cprofile": deterministisch (nur Hauptthread), Ausgabe als .prof (pstats/snakeviz)
+    art="sampling": leichtgewichtig, Stacks alle `intervall` Sekunden aus allen
+                    Threads, Ausgabe im Collapsed-Format (flamegraph.pl/speedscope)
+    """
+
+    def __init__(self, art: str, pfad, intervall: float = 0.01):
+        self.art = art
+        self.pfad = Path(pfad)
+        self.intervall = intervall
+        self._profil = None
+        self._stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.art == "cprofile":
+            import cProfile
+
+            self._profil = cProfile.Profile()
+            self._profil.enable()
+        elif self.art == "sampling":
+            self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+            self._thread.start()
+        else:
+            raise ValueError(f"Unbekannter Profiler: {self.art}")
+
+    def _sample(self):
+        eigener = threading.get_ident()
+        while not self._stop.wait(self.intervall):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == eigener:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        """Profiling beenden und Ergebnis schreiben"""
+        if self._profil:
+            self._profil.disable()
+            self._profil.dump_stats(str(self.pfad))
+        elif self._thread:
+            self._stop.set()
+            self._thread.join()
+            with open(self.pfad, "w", encoding="utf-8") as f:
+                for stack, anzahl in self._stacks.most_common():
+                    f.write(f"{stack} {anzahl}\n")
+        return self.pfad
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Bestell-Index
+Lokaler SQLite-Index aller bekannten Bestellungen, damit Folgeläufe
+nur noch neue Bestellungen anfassen
+"""
+
+import re
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+
+INDEX_FILENAME = ".bestellungen.sqlite3"
+
+# Status-Werte einer Bestellung
+NEU = "neu"
+HERUNTERGELADEN = "heruntergeladen"
+FEHLER = "fehler"
+ABGELEGT = "abgelegt"
+
+MONATE = {
+    "januar": 1, "februar": 2, "märz": 3, "april": 4, "mai": 5, "juni": 6,
+    "juli": 7, "august": 8, "september": 9, "oktober": 10, "november": 11, "dezember": 12
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id    TEXT PRIMARY KEY,
+    account     TEXT,
+    order_date  TEXT,
+    invoice_url TEXT,
+    status      TEXT NOT NULL DEFAULT 'neu',
+    file_hash   TEXT,
+    amount      REAL,
+    filed_path  TEXT,
+    updated_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_status ON orders(status);
+CREATE INDEX IF NOT EXISTS orders_file_hash ON orders(file_hash);
+CREATE TABLE IF NOT EXISTS scans (
+    account     TEXT NOT NULL,
+    jahr        TEXT NOT NULL,
+    fertig_at   TEXT NOT NULL,
+    PRIMARY KEY (account, jahr)
+);
+"""
+
+
+def parse_order_date(text):
+    """Wandle '3. Januar 2024' in '2024-01-03' um (None falls unbekannt)"""
+    if not text:
+        return None
+    match = re.search(r'(\d{1,2})\.\s*([A-Za-zäÄ]+)\s+(\d{4})', text)
+    if not match:
+        return None
+    monat = MONATE.get(match.group(2).lower())
+    if not monat:
+        return None
+    return f"{match.group(3)}-{monat:02d}-{int(match.group(1)):02d}"
+
+
+def file_sha256(path):
+    """SHA-256 einer Datei (blockweise gelesen)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class OrderIndex:
+    """Thread-sicherer Index: Bestellnummer → Datum, URL, Status, Hash, Betrag, Ablage"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        # Mehrere Downloader (Session-Pool) teilen sich die Datei
+        self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(orders)")}
+        if 'account' not in columns:
+            self.conn.execute("ALTER TABLE orders ADD COLUMN account TEXT")
+        self.conn.commit()
+
+    @classmethod
+    def for_directory(cls, download_dir):
+        """Index im Download-Verzeichnis öffnen"""
+        return cls(Path(download_dir).expanduser() / INDEX_FILENAME)
+
+    def _now(self):
+        return datetime.now().isoformat(timespec='seconds')
+
+    def knows(self, order_id):
+        """Ist die Bestellung bereits im Index?"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM orders WHERE order_id = ?", (order_id,)
+            ).fetchone()
+        return row is not None
+
+    def get(self, order_id):
+        """Eintrag als dict oder None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM orders WHERE order_id = ?", (order_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def add_orders(self, orders, account=None):
+        """Neue Bestellungen eintragen (Status bekannter Bestellungen bleibt erhalten)"""
+        now = self._now()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO orders (order_id, account, order_date, invoice_url, status, updated_at)
+                VALUES (?, ?, ?, ?, 'neu', ?)
+                ON CONFLICT(order_id) DO UPDATE SET
+                    invoice_url = excluded.invoice_url,
+                    account = COALESCE(excluded.account, orders.account),
+                    order_date = COALESCE(excluded.order_date, orders.order_date)
+                """,
+                [(o['id'], account, o.get('date'), o['invoice_url'], now) for o in orders]
+            )
+
+    def set_status(self, order_id, status, file_hash=None):
+        """
+        Download-Status (und ggf. Datei-Hash) setzen
+
+        Eine bereits abgelegte Bestellung bleibt abgelegt: im Dauerbetrieb kann
+        die Ablage schneller sein als die Rückmeldung des Downloaders.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                UPDATE orders SET status = ?, file_hash = COALESCE(?, file_hash), updated_at = ?
+                WHERE order_id = ? AND (status != 'abgelegt' OR ? = 'abgelegt')
+                """,
+                (status, file_hash, self._now(), order_id, status)
+            )
+
+    def mark_filed(self, order_id, amount, filed_path):
+        """Erkannten Betrag und finalen Ablageort eintragen"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                UPDATE orders SET status = 'abgelegt', amount = ?, filed_path = ?, updated_at = ?
+                WHERE order_id = ?
+                """,
+                (amount, str(filed_path), self._now(), order_id)
+            )
+
+    def filed(self):
+        """{Bestellnummer: Ablageort} aller bereits abgelegten Rechnungen"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT order_id, filed_path FROM orders WHERE status = 'abgelegt' AND filed_path IS NOT NULL"
+            ).fetchall()
+        return {row['order_id']: Path(row['filed_path']) for row in rows}
+
+    def pending(self, year=None, account=None):
+        """Bestellungen, deren Rechnung noch nicht heruntergeladen wurde"""
+        query = "SELECT order_id, order_date, invoice_url FROM orders WHERE status IN ('neu', 'fehler')"
+        params = ()
+        if year:
+            query += " AND (order_date IS NULL OR order_date LIKE ?)"
+            params += (f"{year}-%",)
+        if account:
+            query += " AND (account IS NULL OR account = ?)"
+            params += (account,)
+        query += " ORDER BY order_date DESC"
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [
+            {'id': row['order_id'], 'date': row['order_date'], 'invoice_url': row['invoice_url']}
+            for row in rows
+        ]
+
+    def voll_gescannt(self, account=None, year=None):
+        """
+        Wurde die Bestellübersicht (Konto, Jahr) schon einmal bis zur letzten Seite gescannt?
+
+        Erst dann darf ein inkrementeller Lauf bei der ersten bekannten
+        Bestellung aufhören; sonst fehlen die Seiten eines abgebrochenen Erstlaufs.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM scans WHERE account = ? AND jahr = ?",
+                (account or '', str(year or ''))
+            ).fetchone()
+        return row is not None
+
+    def scan_vollstaendig(self, account=None, year=None):
+        """Vollständigen Scan der Bestellübersicht (Konto, Jahr) vermerken"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO scans (account, jahr, fertig_at) VALUES (?, ?, ?)",
+                (account or '', str(year or ''), self._now())
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
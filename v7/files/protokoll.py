@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Asynchrones Logging
+Log-Einträge landen über einen QueueHandler in einer Queue; ein
+Hintergrund-Thread schreibt sie stapelweise in Konsole und Logdatei und
+flusht einmal pro Stapel statt nach jeder Zeile
+"""
+
+import os
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler
+
+# Markiert das Ende der Queue
+_ENDE = object()
+
+
+def _kein_flush():
+    pass
+
+
+class LogSchreiber:
+    """Hintergrund-Thread, der die eigentlichen Handler bedient"""
+
+    def __init__(self, warteschlange, handlers, stapel: int = 500):
+        self.warteschlange = warteschlange
+        self.handlers = list(handlers)
+        self.stapel = stapel
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._schreibe_laufend, name="log-schreiber", daemon=True)
+        self._thread.start()
+
+    def _schreibe_laufend(self):
+        while True:
+            # Blockierend auf den ersten Eintrag warten, dann alles Vorhandene mitnehmen
+            eintraege = [self.warteschlange.get()]
+            while len(eintraege) < self.stapel:
+                try:
+                    eintraege.append(self.warteschlange.get_nowait())
+                except queue.Empty:
+                    break
+
+            ende = _ENDE in eintraege
+            self._schreibe([e for e in eintraege if e is not _ENDE])
+            if ende:
+                return
+
+    def _schreibe(self, records):
+        if not records:
+            return
+        for handler in self.handlers:
+            # StreamHandler flusht nach jeder Zeile - im Stapel nur einmal am Ende
+            flush = handler.flush
+            handler.flush = _kein_flush
+            try:
+                for record in records:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            finally:
+                del handler.flush
+            flush()
+
+    def stop(self):
+        """Restliche Einträge schreiben und den Thread beenden"""
+        if self._thread and self._thread.is_alive():
+            self.warteschlange.put(_ENDE)
+            self._thread.join()
+        self._thread = None
+
+
+class AsynchronesLogging:
+    """Handler eines Loggers hinter eine Queue verlegen (rückgängig mit stop())"""
+
+    def __init__(self, logger, stapel: int = 500):
+        # setup_logging hängt die Handler entweder an den Logger selbst oder an root
+        self.logger = logger if logger.handlers else logging.getLogger()
+        self.handlers = list(self.logger.handlers)
+        self.warteschlange = queue.SimpleQueue()
+        self.queue_handler = QueueHandler(self.warteschlange)
+        self.schreiber = LogSchreiber(self.warteschlange, self.handlers, stapel)
+
+    def start(self):
+        for handler in self.handlers:
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self.queue_handler)
+        self.schreiber.start()
+        # Auch bei sys.exit() geht nichts verloren
+        atexit.register(self.stop)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._nach_fork)
+        return self
+
+    def _nach_fork(self):
+        """
+        Im geforkten Kind (z.B. Extraktions-Worker) direkt schreiben
+
+        Der Schreiber-Thread existiert dort nicht; ohne Umbau bliebe alles
+        ungelesen in der geerbten Queue liegen.
+        """
+        if self.queue_handler not in self.logger.handlers:
+            return
+        self.logger.removeHandler(self.queue_handler)
+        for handler in self.handlers:
+            self.logger.addHandler(handler)
+        self.schreiber._thread = None
+
+    def stop(self):
+        """Queue leeren und die ursprünglichen Handler wieder direkt anhängen"""
+        if self.queue_handler not in self.logger.handlers:
+            return
+        self.logger.removeHandler(self.queue_handler)
+        self.schreiber.stop()
+        for handler in self.handlers:
+            self.logger.addHandler(handler)
+        atexit.unregister(self.stop)
+
+
+def asynchron_loggen(logger, stapel: int = 500):
+    """Logger auf asynchrones Schreiben umstellen; liefert das Objekt für stop()"""
+    return AsynchronesLogging(logger, stapel).start()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Session-Pool
+Paralleles Nachladen mehrerer Steuerjahre und Amazon-Konten mit
+N isolierten Browser-Profilen
+"""
+
+import time
+import queue
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from amazon_invoice_downloader import AmazonInvoiceDownloader, resolve_driver_path
+from download_pool import zusammenfassung
+
+# Dateien, die für eine eingeloggte Session aus dem Profil reichen
+PROFILE_FILES = (
+    "Cookies",
+    "Network/Cookies",
+    "Login Data",
+    "Preferences",
+    "Secure Preferences",
+)
+
+
+def clone_profile(profile_path, profile_name, target_dir, files=PROFILE_FILES):
+    """
+    Kopiere die Login-relevanten Dateien eines Browser-Profils in ein
+    eigenes user-data-dir (Chrome erlaubt pro Profil nur eine Instanz)
+    """
+    source_root = Path(profile_path).expanduser()
+    target_root = Path(target_dir)
+    (target_root / profile_name).mkdir(parents=True, exist_ok=True)
+
+    # "Local State" enthält den Schlüssel für verschlüsselte Cookies
+    if (source_root / "Local State").exists():
+        shutil.copy2(source_root / "Local State", target_root / "Local State")
+
+    for name in files:
+        source = source_root / profile_name / name
+        if source.exists():
+            target = target_root / profile_name / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source, target)
+
+    return target_root
+
+
+def load_accounts(config):
+    """Konten aus der Konfiguration (Standard: Profil aus `browser:`)"""
+    browser = config['browser']
+    accounts = config.get('accounts') or [{'name': 'default'}]
+    return [
+        {
+            'name': account['name'],
+            'profile_path': account.get('profile_path', browser.get('profile_path')),
+            'profile_name': account.get('profile_name', browser.get('profile_name', 'Default'))
+        }
+        for account in accounts
+    ]
+
+
+class SessionPool:
+    """Verteilt (Konto, Jahr)-Shards auf N parallele Browser-Sessions"""
+
+    def __init__(self, config_path, sessions: int = 2, full_scan: bool = False, resume: bool = False):
+        self.config_path = config_path
+        self.sessions = max(1, sessions)
+        self.full_scan = full_scan
+        # Abgebrochene Shards aus ihrem Checkpoint fortsetzen
+        self.resume = resume
+        self.progress = {}
+        self.progress_lock = threading.Lock()
+
+    def _report(self, shard, status):
+        """Fortschritt eines Shards setzen und Gesamtstand ausgeben"""
+        with self.progress_lock:
+            self.progress[shard] = status
+            fertig = sum(1 for s in self.progress.values() if s.startswith('✓'))
+            print(f"  [{shard[0]}/{shard[1]}] {status}  ({fertig}/{len(self.progress)} Shards fertig)")
+
+    def _open(self, account, workdir):
+        """Starte eine Browser-Session mit isolierter Profilkopie und eigenem Download-Ordner"""
+        downloader = AmazonInvoiceDownloader(self.config_path, account=account)
+        # Ein warmer Browser auf dem Debug-Port wäre für alle Sessions derselbe
+        downloader.warm_erlaubt = False
+        # Sonst greift der DownloadWatcher einer Session die Datei einer anderen ab
+        # und benennt sie nach der falschen Bestellung (gleiches Dateisystem für os.replace)
+        downloader.browser_download_dir = Path(tempfile.mkdtemp(
+            prefix=f".session-{account['name']}-", dir=downloader.download_dir
+        ))
+        if downloader.config['browser']['use_profile']:
+            downloader.user_data_dir = clone_profile(
+                account['profile_path'],
+                account['profile_name'],
+                tempfile.mkdtemp(prefix=f"{account['name']}-", dir=workdir)
+            )
+        downloader.start_session()
+        return downloader
+
+    @staticmethod
+    def _close(downloader):
+        """Session beenden und ihren Download-Ordner entfernen"""
+        downloader.close()
+        if downloader.browser_download_dir != downloader.download_dir:
+            shutil.rmtree(downloader.browser_download_dir, ignore_errors=True)
+
+    def _worker(self, shards, merged, merged_lock, limiter, workdir):
+        """Arbeite Shards ab; eine Session wird für Shards desselben Kontos weiterverwendet"""
+        downloader = None
+        try:
+            while True:
+                try:
+                    account, year = shards.get_nowait()
+                except queue.Empty:
+                    return
+
+                shard = (account['name'], year)
+                start = time.monotonic()
+                try:
+                    if downloader is None or downloader.account['name'] != account['name']:
+                        if downloader:
+                            self._close(downloader)
+                        self._report(shard, "🌐 Starte Browser...")
+                        downloader = self._open(account, workdir)
+
+                    self._report(shard, "🔍 Suche Bestellungen und lade Rechnungen...")
+                    neue, results = downloader.sync(
+                        year, incremental=not self.full_scan, resume=self.resume, limiter=limiter
+                    )
+
+                    with merged_lock:
+                        for result in results:
+                            merged.setdefault(result['id'], result)
+
+                    counts = zusammenfassung(results)
+                    self._report(
+                        shard,
+                        f"✓ fertig in {time.monotonic() - start:.1f}s "
+                        f"({neue} Bestellungen, {counts['ok']} neu, {counts['fehler']} Fehler)"
+                    )
+                except Exception as e:
+                    self._report(shard, f"❌ Fehler: {e}")
+                finally:
+                    shards.task_done()
+        finally:
+            if downloader:
+                self._close(downloader)
+
+    def run(self, years, account_names=None):
+        """
+        Crawle alle (Konto, Jahr)-Shards parallel
+
+        Returns:
+            Deduplizierte Ergebnisliste (ein Eintrag pro Bestellnummer)
+        """
+        probe = AmazonInvoiceDownloader(self.config_path)
+        accounts = load_accounts(probe.config)
+        limiter = probe.create_limiter()
+        # Driver einmal auflösen statt in jeder Session
+        resolve_driver_path(probe.config)
+        probe.close()
+
+        if account_names:
+            accounts = [a for a in accounts if a['name'] in account_names]
+
+        # Nach Konto sortiert, damit Sessions möglichst wiederverwendet werden
+        shards = queue.Queue()
+        for account in accounts:
+            for year in years:
+                shards.put((account, year))
+                self.progress[(account['name'], year)] = "⏳ wartet"
+
+        print(f"\n🚀 {shards.qsize()} Shards auf {self.sessions} Sessions")
+
+        merged = {}
+        merged_lock = threading.Lock()
+        workdir = tempfile.mkdtemp(prefix="amazon-sessions-")
+        try:
+            threads = [
+                threading.Thread(
+                    target=self._worker,
+                    args=(shards, merged, merged_lock, limiter, workdir),
+                    daemon=True
+                )
+                for _ in range(min(self.sessions, shards.qsize()))
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        return list(merged.values())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Telegram-Versand
+Nachrichten landen in einer Queue; ein Hintergrund-Thread fasst sie zu
+Stapeln zusammen und schickt sie über eine wiederverwendete HTTPS-Verbindung
+an die Bot-API, damit Alarme pro Rechnung oder Fehler die Verarbeitung
+nicht ausbremsen
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import http.client
+from urllib.parse import urlparse, urlencode
+
+logger = logging.getLogger(__name__)
+
+# Telegram kürzt nicht, sondern lehnt längere Nachrichten ab
+MAX_ZEICHEN = 4096
+
+# Markiert das Ende der Queue
+_ENDE = object()
+
+
+def formatiere_zusammenfassung(stats):
+    """Text der Abschlussmeldung eines Laufs"""
+    zeilen = [
+        "🧾 Steuer-Automatisierung abgeschlossen",
+        f"📥 Amazon Downloads: {stats.get('amazon_downloads', 0)}",
+        f"📄 PDFs verarbeitet: {stats.get('pdfs_verarbeitet', 0)}",
+        f"💶 Beträge erkannt: {stats.get('betraege_erkannt', 0)}",
+        f"⚠ Ohne Betrag: {stats.get('ohne_betrag', 0)}",
+        f"🗂 Duplikate: {stats.get('duplikate', 0)}",
+        f"❌ Fehler: {stats.get('fehler', 0)}",
+    ]
+    if stats.get('dauer_s') is not None:
+        zeilen.append(f"⏱ Dauer: {stats['dauer_s']:.1f}s")
+    return "\n".join(zeilen)
+
+
+def stapel_bilden(nachrichten, max_zeichen: int = MAX_ZEICHEN):
+    """Nachrichten zu möglichst wenigen Texten bis `max_zeichen` zusammenfassen"""
+    stapel, aktuell = [], ""
+    for text in nachrichten:
+        text = text[:max_zeichen]
+        if aktuell and len(aktuell) + 1 + len(text) > max_zeichen:
+            stapel.append(aktuell)
+            aktuell = ""
+        aktuell = f"{aktuell}\n{text}" if aktuell else text
+    if aktuell:
+        stapel.append(aktuell)
+    return stapel
+
+
+class TelegramVersand:
+    """Asynchroner Versand an einen Telegram-Chat"""
+
+    def __init__(self, token, chat_id, base_url: str = "https://api.telegram.org",
+                 sammeln_sekunden: float = 2.0, timeout: float = 10, max_versuche: int = 3):
+        """
+        Args:
+            token: Bot-Token von @BotFather
+            chat_id: Ziel-Chat
+            base_url: Bot-API (für Tests auf einen lokalen Stub umstellbar)
+            sammeln_sekunden: So lange werden weitere Nachrichten für einen Stapel gesammelt
+            timeout: Zeitlimit pro HTTP-Request
+            max_versuche: Versuche pro Stapel (429 mit retry_after, Netzwerkfehler)
+        """
+        self.token = token
+        self.chat_id = chat_id
+        self.url = urlparse(base_url.rstrip('/'))
+        self.sammeln_sekunden = sammeln_sekunden
+        self.timeout = timeout
+        self.max_versuche = max_versuche
+        self.warteschlange = queue.SimpleQueue()
+        self.statistik = {"nachrichten": 0, "requests": 0, "fehler": 0}
+        self._verbindung = None
+        self._thread = threading.Thread(target=self._versende_laufend, name="telegram", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def aus_config(cls, telegram_config):
+        """Versand aus notifications.telegram (None falls deaktiviert oder unvollständig)"""
+        telegram_config = telegram_config or {}
+        if not telegram_config.get('enabled', False):
+            return None
+        token = telegram_config.get('token') or os.environ.get('TELEGRAM_BOT_TOKEN')
+        chat_id = telegram_config.get('chat_id') or os.environ.get('TELEGRAM_CHAT_ID')
+        if not token or not chat_id:
+            logger.warning("Telegram aktiviert, aber Token oder Chat-ID fehlt")
+            return None
+        return cls(
+            token,
+            chat_id,
+            base_url=telegram_config.get('base_url') or "https://api.telegram.org",
+            sammeln_sekunden=telegram_config.get('sammeln_sekunden', 2.0)
+        )
+
+    def sende(self, text: str):
+        """Nachricht einreihen (kehrt sofort zurück)"""
+        self.warteschlange.put(text)
+
+    def _versende_laufend(self):
+        while True:
+            eintrag = self.warteschlange.get()
+            nachrichten = [] if eintrag is _ENDE else [eintrag]
+            ende = eintrag is _ENDE
+
+            # Weitere Nachrichten eine Weile sammeln, z.B. mehrere Fehler kurz hintereinander
+            frist = time.monotonic() + self.sammeln_sekunden
+            while not ende:
+                try:
+                    eintrag = self.warteschlange.get(timeout=max(0, frist - time.monotonic()))
+                except queue.Empty:
+                    break
+                if eintrag is _ENDE:
+                    ende = True
+                else:
+                    nachrichten.append(eintrag)
+
+            for text in stapel_bilden(nachrichten):
+                self._sende_stapel(text)
+            self.statistik["nachrichten"] += len(nachrichten)
+
+            if ende:
+                if self._verbindung:
+                    self._verbindung.close()
+                return
+
+    def _verbinde(self):
+        if self._verbindung is None:
+            klasse = http.client.HTTPSConnection if self.url.scheme == "https" else http.client.HTTPConnection
+            self._verbindung = klasse(self.url.netloc, timeout=self.timeout)
+        return self._verbindung
+
+    def _sende_stapel(self, text: str):
+        """sendMessage mit Wiederholung; Fehler werden nur geloggt"""
+        body = urlencode({"chat_id": self.chat_id, "text": text})
+        pfad = f"{self.url.path}/bot{self.token}/sendMessage"
+
+        for versuch in range(1, self.max_versuche + 1):
+            try:
+                verbindung = self._verbinde()
+                verbindung.request("POST", pfad, body, {
+                    "Content-Type": "application/x-www-form-urlencoded",
+                    "Connection": "keep-alive",
+                })
+                antwort = verbindung.getresponse()
+                daten = antwort.read()
+                self.statistik["requests"] += 1
+            except (OSError, http.client.HTTPException) as e:
+                # Verbindung verworfen, beim nächsten Versuch neu aufbauen
+                if self._verbindung:
+                    self._verbindung.close()
+                self._verbindung = None
+                logger.debug(f"Telegram: Verbindungsfehler ({e}), Versuch {versuch}")
+                time.sleep(versuch)
+                continue
+
+            if antwort.status == 200:
+                return True
+            if antwort.status == 429:
+                try:
+                    warten = json.loads(daten)["parameters"]["retry_after"]
+                except (ValueError, KeyError, TypeError):
+                    warten = versuch
+                time.sleep(warten)
+                continue
+            logger.warning(f"Telegram: HTTP {antwort.status} {daten[:200]!r}")
+            break
+
+        self.statistik["fehler"] += 1
+        return False
+
+    def close(self, timeout: float = 15):
+        """Ausstehende Nachrichten noch senden (höchstens `timeout` Sekunden warten)"""
+        if self._thread.is_alive():
+            self.warteschlange.put(_ENDE)
+            self._thread.join(timeout)